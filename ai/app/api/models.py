@@ -47,6 +47,7 @@ class AnalyzeRequest(BaseModel):
     beforeImages: Dict[str, str]  # 식전 이미지 URL (key: side_1, side_2, side_3, rice, soup)
     afterImages: Dict[str, str]   # 식후 이미지 URL (key: side_1, side_2, side_3, rice, soup)
     studentInfo: StudentInfo      # 학생 정보
+    kioskId: Optional[str] = None # 촬영 키오스크(카메라) ID (슬롯 ROI 번들 선택, 없으면 기본 키오스크)
 
     class Config:
         populate_by_name = True
@@ -59,6 +60,13 @@ class AnalyzeResponse(BaseModel):
     # beforeDetails: Dict[str, dict]
     # afterDetails: Dict[str, dict]
     studentInfo: StudentInfo
+    timing: Optional[Dict[str, Any]] = None  # X-Debug-Timing 헤더 요청 시 단계별 소요 시간 (span 목록 포함)
+
+# 분석 워커 풀 크기 변경 요청
+class PoolResizeRequest(BaseModel):
+    """워커 프로세스 수와 워커당 연산 스레드 수를 변경합니다. (0이면 사용 가능한 코어 수로 자동 결정)"""
+    workers: int = Field(0, ge=0, le=64)  # 실제 값은 ANALYZE_MAX_WORKERS와 코어 예산으로 다시 제한
+    threads: int = Field(0, ge=0, le=256)
 
 # 리포트 데이터 요청
 class ReportRequest(BaseModel):
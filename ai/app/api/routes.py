@@ -1,7 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
+import hmac
+import logging
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Header
 from ..config import settings
+from ..core import tracing
+import contextlib
 import time
-from fastapi import Request
+from fastapi import Request, Response
 
 from .models import (
     PlanRequest,
@@ -9,7 +14,8 @@ from .models import (
     AnalyzeRequest,           
     AnalyzeResponse,
     ReportRequest,
-    ReportResponse
+    ReportResponse,
+    PoolResizeRequest
 )
 
 from ..services.menu_service import MenuService
@@ -17,6 +23,8 @@ from ..services.analyze_service import AnalyzeService
 from ..workflows.graph import MenuPlanningWorkflow
 from ..services.report_service import ReportService
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/ai")
 
 
@@ -34,9 +42,11 @@ def get_report_service():
     return ReportService()
 
 
-@router.post("/analyze-leftover", response_model=AnalyzeResponse)
+@router.post("/analyze-leftover", response_model=AnalyzeResponse, response_model_exclude_none=True)
 async def analyze_leftover_endpoint(
     request: AnalyzeRequest,
+    http_request: Request,
+    response: Response,
     analyze_service: AnalyzeService = Depends(get_analyze_service)
 ):
     """
@@ -75,27 +85,73 @@ async def analyze_leftover_endpoint(
         "number": 17
       }
     }
+
+    DEBUG_TIMING_HEADER=True로 기동한 경우에만 X-Debug-Timing: 1 헤더를 보내면
+    응답에 단계별 소요 시간(timing)과 Server-Timing 헤더 추가 (기본값 False, 디버그 전용)
+    (store, download, decode, crop, backproj, inference, depth, volume, resnet, fusion, request)
+
+    RESULT_STORE_PATH를 설정한 경우 같은 요청(학생, 식전/식후 이미지 내용, 키오스크)을 다시 보내면
+    결과 저장소의 결과를 바로 반환하고, 분석 중에 재시도가 오면 진행 중인 분석 결과를 함께 받음
     """
+    debug_timing = (settings.DEBUG_TIMING_HEADER
+                    and http_request.headers.get("X-Debug-Timing", "").lower() not in ("", "0", "false"))
     try:
-        result = await analyze_service.analyze_leftover_images(
-            before_images=request.beforeImages,
-            after_images=request.afterImages,
-            student_info=request.studentInfo.model_dump(by_alias=True)
-        )
+        with (tracing.collect() if debug_timing else contextlib.nullcontext()) as trace:
+            result = await analyze_service.analyze_leftover_images(
+                before_images=request.beforeImages,
+                after_images=request.afterImages,
+                student_info=request.studentInfo.model_dump(by_alias=True),
+                kiosk_id=request.kioskId
+            )
+        if trace is not None:
+            result["timing"] = tracing.breakdown(trace)
+            response.headers["Server-Timing"] = tracing.server_timing(result["timing"])
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"이미지 분석 중 오류: {str(e)}")
 
+@router.get("/analyze-metrics")
+async def analyze_metrics_endpoint(analyze_service: AnalyzeService = Depends(get_analyze_service)):
+    """
+    GET /ai/analyze-metrics
+    잔반 분석 파이프라인 지표 (워커 풀/워밍업, 역투영·신경망 단계별 큐 길이/대기·실행 시간,
+    마이크로 배치 큐 길이/배치 크기 분포/대기 시간, 참조 저장소, 이미지 캐시)
+    """
+    return analyze_service.metrics()
+
+def require_pool_admin(x_admin_token: Optional[str] = Header(None)):
+    """운영자 전용 API 확인 (ANALYZE_POOL_ADMIN_TOKEN이 비어 있으면 API 자체를 숨김)"""
+    if not settings.ANALYZE_POOL_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), settings.ANALYZE_POOL_ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="운영자 토큰이 올바르지 않습니다")
+
+@router.post("/analyze-pool", dependencies=[Depends(require_pool_admin)])
+async def resize_analyze_pool_endpoint(
+    request: PoolResizeRequest,
+    analyze_service: AnalyzeService = Depends(get_analyze_service)
+):
+    """
+    POST /ai/analyze-pool {"workers": 4, "threads": 2} (X-Admin-Token: <ANALYZE_POOL_ADMIN_TOKEN>)
+    분석 워커 풀 크기 변경 (0이면 자동 결정, 진행 중인 분석은 이전 풀에서 완료)
+    풀 전체를 재시작하므로 운영자 전용: ANALYZE_POOL_ADMIN_TOKEN을 설정한 경우에만 열리며 토큰이 다르면 403
+    → {"workers": 4, "threads_per_worker": 2, "available_cpus": 8.0, "resizes": 1}
+    """
+    try:
+        return analyze_service.resize_pool(request.workers, request.threads)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("/menu-plan", response_model=PlanResponse)
 async def generate_menu_plan(
     request: PlanRequest,
     menu_service: MenuService = Depends(get_menu_service),
     workflow: MenuPlanningWorkflow = Depends(get_workflow_service)
 ):
-    if settings.DEBUG:
-        print(f"[ROUTE][generate_menu_plan] Request Received with {len(request.menuData)} menu data items")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("[ROUTE][generate_menu_plan] Request Received with %s menu data items", len(request.menuData))
         if request.menuPool:
-            print(f"[ROUTE][generate_menu_plan] Menu Pool provided with {len(request.menuPool)} items")
+            logger.debug("[ROUTE][generate_menu_plan] Menu Pool provided with %s items", len(request.menuPool))
         start_time = time.time()
     """
     통합 식단 계획 생성 엔드포인트
@@ -108,23 +164,20 @@ async def generate_menu_plan(
         holidays = request.holidays
         holidays = request.holidays
 
-        if settings.DEBUG:
-            print(f"[ROUTE][generate_menu_plan] Preparing data for LLM")
+        logger.debug("[ROUTE][generate_menu_plan] Preparing data for LLM")
 
         # 메뉴 데이터 추출 및 LLM 입력용으로 변환(토큰 절약)
         processed_data = menu_service.prepare_for_llm(menu_data, menu_pool)
 
-        if settings.DEBUG:
-            print(f"[ROUTE][generate_menu_plan] Data prepared, running workflow")
+        logger.debug("[ROUTE][generate_menu_plan] Data prepared, running workflow")
 
         # 워크 플로우 실행
-        if settings.DEBUG:
-            print(f"[ROUTE][generate_menu_plan] Before awaiting workflow")
+        logger.debug("[ROUTE][generate_menu_plan] Before awaiting workflow")
         result = await workflow.run_workflow(processed_data, holidays)
 
-        if settings.DEBUG:
-            print("[ROUTE][generate_menu_plan] After awaiting workflow, result : ", result)
-            print("[ROUTE][generate_menu_plan] working flow process time :", time.time() - start_time)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[ROUTE][generate_menu_plan] After awaiting workflow, result : %s", result)
+            logger.debug("[ROUTE][generate_menu_plan] working flow process time : %s", time.time() - start_time)
 
         
         integrated_plan = result["integrated_plan"]
@@ -160,8 +213,7 @@ async def generate_menu_plan(
                 }
             menu_based_plan[date] = menu_map
 
-        if settings.DEBUG:
-            print("menu_based_plan : ", menu_based_plan)
+        logger.debug("menu_based_plan : %s", menu_based_plan)
 
         return PlanResponse(
             plan=menu_based_plan
@@ -175,9 +227,8 @@ async def create_health_report(
     request: ReportRequest,
     report_service:ReportService = Depends(get_report_service)
 ):
-    if settings.DEBUG:
-        print("[ROUTE][create_health_report] start create report")
-        print(f"요청 데이터: {request}")
+    logger.debug("[ROUTE][create_health_report] start create report")
+    logger.debug("요청 데이터: %s", request)
     try:
         report = await report_service.create_health_report(
             bmi=request.bmi,
@@ -186,8 +237,7 @@ async def create_health_report(
             leftover_least=request.leftoverLeast,
             nutrient=request.nutrient
         )
-        if settings.DEBUG:
-            print("생성결과 : ",report)
+        logger.debug("생성결과 : %s", report)
         # 리포트 응답 반환
         return ReportResponse(
             analyzeReport=report["analyzeReport"],
@@ -196,6 +246,5 @@ async def create_health_report(
         )
     except Exception as e:
         error_msg = f"리포트 생성 중 오류: {str(e)}"
-        if settings.DEBUG:
-            print(f"[ERROR] {error_msg}")
+        logger.error("[ROUTE] %s", error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
\ No newline at end of file
@@ -0,0 +1,130 @@
+# decode_reduction.py – 축소 JPEG 디코딩 배율별 디코딩 시간 vs 잔반율 변화 벤치마크
+# ---------------------------------------------------------------
+# 식전/식후 JPEG 쌍을 DECODE_REDUCTION(1/2/4/8) 배율로 디코딩해 분석하고,
+# 전체 해상도(1) 결과 대비 슬롯별 잔반율(final) 차이와 디코딩 시간을 비교합니다.
+# --before-dir/--after-dir 는 같은 파일명(예: 3_rice.jpg)의 식전/식후 이미지 폴더이며,
+# 없으면 키오스크 업로드와 같은 2배 업스케일 quality 100 합성 JPEG을 사용합니다.
+# --weights 를 주면 ResNet/MiDaS까지 포함한 서비스와 같은 잔반율을, 없으면 역투영 성분만 비교합니다.
+#
+# Usage example (ai/ 폴더에서 실행)
+#   python -m app.benchmarks.decode_reduction --before-dir ./pairs/before --after-dir ./pairs/after \
+#       --weights ./app/weights/new_opencv_ckpt_b84_e200.pth --backproj-max-side 0 480
+# ---------------------------------------------------------------
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+from ..services.analyze_service import DECODE_FLAGS, compute_leftover_rate, crop_center, decode_image
+from ..services.custom_model import analyze_food_images_batch, seed_everything
+
+
+def synthetic_pairs(count=5, seed=0):
+    """합성 식판 (640x480 원본을 2배 업스케일, quality 100 JPEG)"""
+    rng = np.random.default_rng(seed)
+    names = ["x_side_1.jpg", "x_side_2.jpg", "x_main.jpg", "x_rice.jpg", "x_soup.jpg"]
+    pairs = []
+    for i in range(count):
+        h, w = 480, 640
+        before = np.full((h, w, 3), (200, 200, 200), np.uint8)
+        color = tuple(int(c) for c in rng.integers(20, 180, 3))
+        cv2.ellipse(before, (w // 2, h // 2), (w // 3, h // 3), 0, 0, 360, color, -1)
+        after = before.copy()
+        cv2.rectangle(after, (0, 0), (w, int(h * rng.uniform(0.3, 0.8))), (200, 200, 200), -1)
+        encoded = []
+        for img in (before, after):
+            # 음식 질감 (부드러운 노이즈)
+            img = cv2.add(img, cv2.GaussianBlur(rng.integers(0, 50, img.shape, dtype=np.uint8), (0, 0), 2))
+            img = cv2.resize(img, (w * 2, h * 2), interpolation=cv2.INTER_CUBIC)
+            encoded.append(cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 100])[1].tobytes())
+        pairs.append((names[i % len(names)], encoded[0], encoded[1]))
+    return pairs
+
+
+def folder_pairs(before_dir, after_dir):
+    pairs = []
+    for path in sorted(glob.glob(os.path.join(before_dir, "*.jpg")) + glob.glob(os.path.join(before_dir, "*.png"))):
+        name = os.path.basename(path)
+        after_path = os.path.join(after_dir, name)
+        if not os.path.exists(after_path):
+            continue
+        with open(path, "rb") as f, open(after_path, "rb") as g:
+            pairs.append((name, f.read(), g.read()))
+    return pairs
+
+
+def timed_decode(content, reduction, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        img = decode_image(content, reduction)
+        times.append(time.perf_counter() - start)
+    return img, float(np.median(times)) * 1000
+
+
+def run(pairs, reduction, backproj_max_side, models, repeat):
+    """배율 하나로 모든 쌍 분석 → (슬롯별 final 잔반율, 이미지당 디코딩 ms, 슬롯당 분석 ms)"""
+    resnet_model, midas_model, midas_transform = models
+    finals, decode_ms, analyze_s = {}, [], 0.0
+    for name, before_bytes, after_bytes in pairs:
+        before, t_before = timed_decode(before_bytes, reduction, repeat)
+        after, t_after = timed_decode(after_bytes, reduction, repeat)
+        decode_ms += [t_before, t_after]
+        reference = crop_center(before)
+        start = time.perf_counter()
+        before_result, after_result = analyze_food_images_batch(
+            [(before, reference, name), (after, reference, name)],
+            resnet_model, midas_model, midas_transform,
+            pixel_scale=reduction, backproj_max_side=backproj_max_side,
+        )
+        analyze_s += time.perf_counter() - start
+        finals[name] = compute_leftover_rate(before_result, after_result)[2]['final']
+    return finals, float(np.mean(decode_ms)), analyze_s / len(pairs) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="축소 디코딩 배율별 디코딩 시간과 잔반율 변화 측정",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--before-dir", type=str, default=None, help="식전 이미지 폴더 (없으면 합성 JPEG)")
+    parser.add_argument("--after-dir", type=str, default=None, help="식후 이미지 폴더 (식전과 같은 파일명)")
+    parser.add_argument("--weights", type=str, default=None, help="ResNet 가중치 (주면 MiDaS 포함 전체 분석)")
+    parser.add_argument("--reductions", type=int, nargs="+", default=sorted(DECODE_FLAGS))
+    parser.add_argument("--backproj-max-side", type=int, nargs="+", default=[0],
+                        help="역투영 작업 해상도 후보 (0이면 디코딩 해상도)")
+    parser.add_argument("--repeat", type=int, default=5, help="디코딩 시간 측정 반복 횟수")
+    args = parser.parse_args()
+    seed_everything()
+
+    if args.before_dir and args.after_dir:
+        pairs = folder_pairs(args.before_dir, args.after_dir)
+    else:
+        pairs = synthetic_pairs()
+    if not pairs:
+        print("[WARN] No image pairs to benchmark.")
+        return
+
+    models = (None, None, None)
+    if args.weights:
+        from ..services.custom_model import load_midas_model, load_resnet_model
+        models = (load_resnet_model(args.weights, device="cpu"), *load_midas_model(device="cpu"))
+
+    baseline, base_decode_ms, _ = run(pairs, 1, 0, models, args.repeat)
+    print(f"pairs: {len(pairs)}  components: {'backproj+midas+resnet' if args.weights else 'backproj only'}")
+    print(f"{'reduction':>9s} {'bp side':>7s} {'decode ms':>10s} {'analyze ms':>11s} "
+          f"{'mean |dfinal|':>14s} {'max |dfinal|':>13s}")
+    for reduction in args.reductions:
+        for max_side in args.backproj_max_side:
+            finals, decode_ms, analyze_ms = run(pairs, reduction, max_side, models, args.repeat)
+            drift = [abs(finals[name] - baseline[name]) for name in baseline]
+            print(f"{reduction:9d} {max_side or '-':>7} {decode_ms:10.2f} {analyze_ms:11.2f} "
+                  f"{np.mean(drift):14.2f} {np.max(drift):13.2f}")
+    print(f"(decode ms at reduction 1: {base_decode_ms:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# depth_backends.py – 깊이 백엔드(DPT_Large / DPT_Hybrid / MiDaS_small) 지연시간·정확도 벤치마크
+# ---------------------------------------------------------------
+# 슬롯별로 가장 빠르면서 기준 백엔드(DPT_Large) 대비 오차가 허용치 이내인 백엔드를 선택해
+# DEPTH_BACKEND_SELECTION 으로 사용할 JSON 파일을 생성합니다.
+#
+# Usage example (ai/ 폴더에서 실행)
+#   python -m app.benchmarks.depth_backends \
+#       --crop-dir ./crops \
+#       --output ./depth_backends.json \
+#       --tolerance 1.0
+# ---------------------------------------------------------------
+import argparse
+import glob
+import json
+import os
+import time
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+from ..services.analyze_service import _load_depth_backend
+from ..services.custom_model import (
+    DEFAULT_DEPTH_BACKEND,
+    DEPTH_BACKENDS,
+    back_projection,
+    extract_slot_name,
+    has_z_plane,
+    predict_depth,
+    seed_everything,
+)
+
+# 최종 잔반율 융합에서 부피(volume) 항목의 가중치 (analyze_leftover_images 기본 가중치)
+VOLUME_FUSION_WEIGHT = 0.3
+
+
+def center_reference(img, crop_ratio=0.2):
+    """서비스와 동일한 중앙 crop 참조 이미지"""
+    h, w = img.shape[:2]
+    ch, cw = int(h * crop_ratio), int(w * crop_ratio)
+    return img[h//2 - ch//2:h//2 - ch//2 + ch, w//2 - cw//2:w//2 - cw//2 + cw]
+
+
+def run_backend(backend, model, transform, samples, repeat):
+    """백엔드 하나로 모든 샘플의 깊이/부피를 추정하고 지연시간을 측정"""
+    rows = []
+    for name, slot, img, food_mask in samples:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            _, volume_pct, _, volume_cm3, _, _ = predict_depth(
+                img, model, transform, roi_mask=food_mask, slot_name=slot, backend=backend
+            )
+            times.append(time.perf_counter() - start)
+        rows.append({
+            'image': name,
+            'slot': slot,
+            'latency_ms': float(np.median(times) * 1000),
+            'volume_pct': float(volume_pct),
+            'food_volume_cm3': float(volume_cm3),
+        })
+    return rows
+
+
+def select_backends(results, reference_backend, tolerance):
+    """
+    슬롯별로 허용 오차 이내에서 가장 빠른 백엔드 선택
+    기준 백엔드가 아니면 해당 슬롯의 z_plane 캘리브레이션이 있는 백엔드만 후보 (서버가 없는 선택을 거부)
+    오차 = 기준 백엔드 대비 부피(%) 평균 절대 차이 x 융합 가중치 (최종 잔반율 %p 영향)
+    """
+    per_slot = defaultdict(dict)
+    reference = {row['image']: row for row in results[reference_backend]}
+    for backend, rows in results.items():
+        by_slot = defaultdict(list)
+        for row in rows:
+            by_slot[row['slot']].append(row)
+        for slot, slot_rows in by_slot.items():
+            deltas = [abs(row['volume_pct'] - reference[row['image']]['volume_pct']) for row in slot_rows]
+            per_slot[slot][backend] = {
+                'latency_ms_p50': float(np.median([row['latency_ms'] for row in slot_rows])),
+                'volume_pct_mae': float(np.mean(deltas)),
+                'final_drift_pp': float(np.mean(deltas) * VOLUME_FUSION_WEIGHT),
+            }
+
+    selection = {}
+    for slot, stats in per_slot.items():
+        candidates = [
+            (s['latency_ms_p50'], backend) for backend, s in stats.items()
+            if backend == reference_backend or (s['final_drift_pp'] <= tolerance and has_z_plane(backend, slot))
+        ]
+        selection[slot] = min(candidates)[1]
+    return selection, per_slot
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="깊이 백엔드별 지연시간/정확도를 측정하고 슬롯별 백엔드를 선택합니다.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--crop-dir", type=str, required=True,
+                        help="슬롯 crop 이미지 폴더 (파일명에 side_1, main, rice 등 슬롯명 포함)")
+    parser.add_argument("--onnx-dir", type=str, default="./app/weights/onnx", help="ONNX 모델 폴더")
+    parser.add_argument("--backends", type=str, nargs="+", default=list(DEPTH_BACKENDS),
+                        choices=list(DEPTH_BACKENDS))
+    parser.add_argument("--reference", type=str, default=DEFAULT_DEPTH_BACKEND, help="기준 백엔드")
+    parser.add_argument("--tolerance", type=float, default=1.0,
+                        help="허용 최종 잔반율 변화량(%%p) = 부피 오차 x 융합 가중치")
+    parser.add_argument("--repeat", type=int, default=3, help="이미지당 반복 측정 횟수")
+    parser.add_argument("--output", type=str, default="./depth_backends.json", help="선택 결과 JSON 경로")
+    args = parser.parse_args()
+    seed_everything()
+
+    backends = list(dict.fromkeys([args.reference] + args.backends))
+    os.makedirs(args.onnx_dir, exist_ok=True)
+
+    # 샘플 준비 (역투영 food_mask는 백엔드와 무관하므로 한 번만 계산)
+    paths = sorted(
+        glob.glob(os.path.join(args.crop_dir, "*.jpg")) +
+        glob.glob(os.path.join(args.crop_dir, "*.png"))
+    )
+    samples = []
+    for path in paths:
+        img = cv2.imread(path)
+        slot = extract_slot_name(path)
+        if img is None or slot is None:
+            print(f"[SKIP] {path}")
+            continue
+        _, _, food_mask = back_projection(img, center_reference(img))
+        samples.append((os.path.basename(path), slot, img, food_mask))
+    if not samples:
+        print("[WARN] No slot crop images found – check the --crop-dir path.")
+        return
+
+    results = {}
+    for backend in backends:
+        print(f"[INFO] {backend} 측정 중 …")
+        model, transform = _load_depth_backend(backend, args.onnx_dir)
+        if model is None:
+            print(f"[SKIP] {backend} 로드 실패")
+            continue
+        results[backend] = run_backend(backend, model, transform, samples, args.repeat)
+
+    selection, per_slot = select_backends(results, args.reference, args.tolerance)
+    for slot, stats in sorted(per_slot.items()):
+        for backend, s in stats.items():
+            mark = "*" if selection[slot] == backend else " "
+            print(f"{mark} {slot:<6} {backend:<12} p50 {s['latency_ms_p50']:8.1f} ms  "
+                  f"volume MAE {s['volume_pct_mae']:6.2f}%  drift {s['final_drift_pp']:5.2f}%p")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            'selection': selection,
+            'reference': args.reference,
+            'tolerance_pp': args.tolerance,
+            'per_slot': per_slot,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\n[DONE] selection saved to {args.output} → DEPTH_BACKEND_SELECTION={args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# depth_fallback.py – estimate_volume_from_depth_with_weight_old 회귀 벤치마크
+# ---------------------------------------------------------------
+# ROI 마스크가 없을 때 쓰는 2-클러스터 깊이 분할 fallback의
+# 기존 cv2.kmeans(10회 시도, KMEANS_RANDOM_CENTERS) 구현과 현재 Otsu 히스토그램 구현을 비교합니다.
+# 기존 구현은 종료 조건이 EPS 1.0(정규화 깊이 범위 전체)이라 1~2회 반복 후 멈추므로
+# 결과가 OpenCV RNG 시드에 따라 크게 달라집니다. 그래서 기준값은 같은 K-means를 수렴할 때까지
+# 반복한 결과(= 1차원 2-클러스터의 최적 분할, Otsu와 같은 기준)로 두고,
+# 기존 구현(시드 42)과의 차이와 시드별 결과 범위를 함께 출력합니다.
+# 기준값과의 volume_estimate 차이가 --tolerance 를 넘으면 실패합니다.
+# --depth-dir 를 주면 저장된 깊이 맵(.npy)을, 없으면 합성 깊이 맵을 회귀 세트로 사용합니다.
+#
+# Usage example (ai/ 폴더에서 실행)
+#   python -m app.benchmarks.depth_fallback --depth-dir ./depth_maps --tolerance 1.0
+# ---------------------------------------------------------------
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+from ..services.custom_model import estimate_volume_from_depth_with_weight_old
+
+
+LEGACY_CRITERIA = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
+CONVERGED_CRITERIA = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 100, 1e-6)
+
+
+def estimate_volume_kmeans(depth_map, criteria=LEGACY_CRITERIA):
+    """기존 구현 (전체 픽셀 cv2.kmeans, 전역 OpenCV RNG 시드에 의존)"""
+    depth_flat = depth_map.flatten().reshape(-1, 1).astype(np.float32)
+    _, labels, centers = cv2.kmeans(depth_flat, 2, None, criteria, 10, cv2.KMEANS_RANDOM_CENTERS)
+    center_0 = centers[0][0]
+    center_1 = centers[1][0]
+    cluster_0_ratio = np.sum(labels == 0) / len(labels)
+    cluster_1_ratio = np.sum(labels == 1) / len(labels)
+    MIN_CLUSTER_RATIO = 0.05
+    if center_0 < center_1:
+        food_cluster = 0 if cluster_0_ratio > MIN_CLUSTER_RATIO else 1
+    else:
+        food_cluster = 1 if cluster_1_ratio > MIN_CLUSTER_RATIO else 0
+    food_mask = labels.reshape(depth_map.shape) == food_cluster
+    kernel = np.ones((5, 5), np.uint8)
+    food_mask = food_mask.astype(np.uint8) * 255
+    food_mask = cv2.morphologyEx(food_mask, cv2.MORPH_CLOSE, kernel)
+    food_mask = cv2.morphologyEx(food_mask, cv2.MORPH_OPEN, kernel)
+    food_mask = food_mask > 0
+    food_ratio = np.sum(food_mask) / depth_map.size
+    volume_estimate = min(100, food_ratio * 100)
+    return volume_estimate, food_mask, volume_estimate, 0, np.nanmean(depth_map), 'fallback'
+
+
+def synthetic_depth_maps(count=12, seed=0):
+    """정규화된 합성 깊이 맵 (식판 바닥 + 음식 더미, 음식 양/노이즈/크기를 다양하게)"""
+    rng = np.random.default_rng(seed)
+    maps = []
+    for i in range(count):
+        h, w = [(365, 362), (365, 427), (499, 612), (499, 540)][i % 4]
+        yy, xx = np.mgrid[0:h, 0:w]
+        depth = 0.3 + 0.1 * (yy / h)  # 카메라 기울기
+        for _ in range(rng.integers(1, 4)):
+            cy, cx = rng.uniform(0.2, 0.8) * h, rng.uniform(0.2, 0.8) * w
+            radius = rng.uniform(0.1, 0.35) * min(h, w)
+            r = np.hypot(yy - cy, xx - cx) / radius
+            depth = depth + rng.uniform(0.1, 0.4) * np.clip(1 - r ** 2, 0, None)
+        noise = cv2.GaussianBlur(rng.standard_normal((h, w)).astype(np.float32), (0, 0), 2)
+        depth = depth.astype(np.float32) + rng.uniform(0.005, 0.03) * noise
+        maps.append((depth - depth.min()) / (depth.max() - depth.min()))
+    return maps
+
+
+def folder_depth_maps(depth_dir):
+    maps = []
+    for path in sorted(glob.glob(os.path.join(depth_dir, "*.npy"))):
+        depth = np.load(path)
+        if depth.ndim == 2:
+            maps.append(depth.astype(np.float32))
+    return maps
+
+
+def iou(a, b):
+    union = np.count_nonzero(a | b)
+    return np.count_nonzero(a & b) / union if union else 1.0
+
+
+def bench(fn, maps, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for depth in maps:
+            fn(depth)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) / len(maps) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="깊이 fallback: 기존 K-means 대비 Otsu 결과 차이/속도/결정성 측정",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--depth-dir", type=str, default=None, help="깊이 맵(.npy) 폴더 (없으면 합성 깊이 맵)")
+    parser.add_argument("--tolerance", type=float, default=2.0, help="허용 volume_estimate 차이 (%%p)")
+    parser.add_argument("--seeds", type=int, default=5, help="기존 K-means 시드별 결과 범위 확인용 OpenCV RNG 시드 수")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    maps = folder_depth_maps(args.depth_dir) if args.depth_dir else synthetic_depth_maps()
+    if not maps:
+        print("[WARN] No depth maps to benchmark.")
+        return
+
+    diffs, legacy_diffs, ious, spread, inside = [], [], [], [], 0
+    for depth in maps:
+        actual = estimate_volume_from_depth_with_weight_old(depth)
+        if actual[0] != estimate_volume_from_depth_with_weight_old(depth)[0]:
+            raise AssertionError("Otsu fallback 결과가 실행마다 다릅니다")
+        cv2.setRNGSeed(42)
+        converged = estimate_volume_kmeans(depth, CONVERGED_CRITERIA)
+        diffs.append(abs(actual[0] - converged[0]))
+        ious.append(iou(actual[1], converged[1]))
+        seeded = []
+        for seed in [42] + list(range(args.seeds)):
+            cv2.setRNGSeed(seed)
+            seeded.append(estimate_volume_kmeans(depth)[0])
+        legacy_diffs.append(abs(actual[0] - seeded[0]))
+        spread.append(max(seeded) - min(seeded))
+        inside += min(seeded) <= actual[0] <= max(seeded)
+
+    kmeans_ms = bench(estimate_volume_kmeans, maps, args.repeat)
+    otsu_ms = bench(estimate_volume_from_depth_with_weight_old, maps, args.repeat)
+    print(f"depth maps: {len(maps)}")
+    print(f"vs converged kmeans : |dvolume| mean {np.mean(diffs):.3f}  max {np.max(diffs):.3f} %p  "
+          f"mask IoU min {np.min(ious):.3f}")
+    print(f"vs legacy (seed 42) : |dvolume| mean {np.mean(legacy_diffs):.3f}  max {np.max(legacy_diffs):.3f} %p")
+    print(f"legacy spread over {args.seeds + 1} RNG seeds: mean {np.mean(spread):.3f}  max {np.max(spread):.3f} %p  "
+          f"(otsu inside legacy range: {inside}/{len(maps)}, otsu is deterministic)")
+    print(f"kmeans : {kmeans_ms:8.2f} ms/map")
+    print(f"otsu   : {otsu_ms:8.2f} ms/map  (x{kmeans_ms / otsu_ms:.1f})")
+    if np.max(diffs) > args.tolerance:
+        raise AssertionError(f"volume_estimate 차이 {np.max(diffs):.3f}%p가 허용치 {args.tolerance}%p를 넘습니다")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# image_download.py – 이미지 다운로드 HTTP 클라이언트 벤치마크 (로컬 JPEG 서버 사용)
+# ---------------------------------------------------------------
+# S3 대신 로컬 aiohttp 서버가 합성 식판 JPEG을 제공하고,
+# 트레이(10장)마다 새 ClientSession을 만드는 기존 방식과
+# 애플리케이션 수명의 ImageHttpClient(커넥션 풀 + 재시도)를 비교합니다.
+# --fail-every N 이면 N번째 요청마다 503을 반환해 재시도 동작도 확인합니다.
+#
+# Usage example (ai/ 폴더에서 실행)
+#   python -m app.benchmarks.image_download --trays 20 --fail-every 7
+# ---------------------------------------------------------------
+import argparse
+import asyncio
+import itertools
+import time
+
+import aiohttp
+import cv2
+import numpy as np
+from aiohttp import web
+
+from ..services.http_client import ImageHttpClient
+
+
+def make_jpeg(seed: int, shape=(480, 640, 3)) -> bytes:
+    rng = np.random.default_rng(seed)
+    img = cv2.GaussianBlur(rng.integers(0, 255, shape, dtype=np.uint8), (0, 0), 5)
+    return cv2.imencode(".jpg", img)[1].tobytes()
+
+
+async def start_stand_in(port: int, images: list, fail_every: int, latency: float):
+    """로컬 JPEG 서버 (새 TCP 연결 수를 함께 집계)"""
+    counter = itertools.count(1)
+    peers = set()
+
+    async def handle(request):
+        peers.add(request.transport.get_extra_info("peername"))
+        await asyncio.sleep(latency)
+        if fail_every and next(counter) % fail_every == 0:
+            return web.Response(status=503)
+        return web.Response(body=images[int(request.match_info["idx"]) % len(images)], content_type="image/jpeg")
+
+    app = web.Application()
+    app.router.add_get("/tray/{idx}.jpg", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner, peers
+
+
+async def fresh_session_tray(urls):
+    """기존 방식: 호출마다 새 세션, 재시도 없음"""
+    async with aiohttp.ClientSession() as session:
+        async def get(url):
+            async with session.get(url) as response:
+                if response.status != 200:
+                    raise Exception(f"HTTP {response.status}")
+                return await response.read()
+        return await asyncio.gather(*[get(url) for url in urls], return_exceptions=True)
+
+
+async def pooled_tray(client: ImageHttpClient, urls):
+    return await asyncio.gather(*[client.fetch(url) for url in urls], return_exceptions=True)
+
+
+async def run(args):
+    images = [make_jpeg(i) for i in range(10)]
+    runner, peers = await start_stand_in(args.port, images, args.fail_every, args.latency)
+    urls = [f"http://127.0.0.1:{args.port}/tray/{i}.jpg" for i in range(10)]
+    try:
+        report = {}
+        for name in ("fresh", "pooled"):
+            peers.clear()
+            client = ImageHttpClient(retry_backoff=0.01)
+            await client.start()
+            start = time.perf_counter()
+            failures = 0
+            for _ in range(args.trays):
+                if name == "fresh":
+                    results = await fresh_session_tray(urls)
+                else:
+                    results = await pooled_tray(client, urls)
+                failures += sum(isinstance(r, Exception) for r in results)
+            elapsed = time.perf_counter() - start
+            await client.close()
+            report[name] = (elapsed / args.trays * 1000, len(peers), failures)
+    finally:
+        await runner.cleanup()
+
+    print(f"trays: {args.trays} x 10 images  fail-every: {args.fail_every or '-'}")
+    for name, (ms, connections, failures) in report.items():
+        print(f"{name:7s}: {ms:8.2f} ms/tray  connections: {connections:4d}  failed downloads: {failures}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="트레이 이미지 다운로드: 요청별 세션 vs 공유 커넥션 풀",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--trays", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fail-every", type=int, default=0, help="N번째 요청마다 503 반환 (0이면 비활성)")
+    parser.add_argument("--latency", type=float, default=0.0, help="서버 응답 지연(초)")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+# leftover_suite.py – 잔반율 회귀(정확도) + 단계별 지연·처리량 벤치마크
+# ---------------------------------------------------------------
+# 고정 코퍼스(식전/식후 슬롯 이미지 + 정답 잔반율)로
+#   - 단계별 지연 p50/p95: decode, backproj (이미지당), MiDaS, ResNet, fusion (식판 배치당)
+#   - 풀 크기별 처리량(img/s)과 워커별 최대 RSS (pool_sizing 과 같은 측정)
+#   - API leftoverRate 의 정답 대비 MAE (전체/슬롯별)
+# 를 측정하고 실행 기록을 JSON 히스토리 파일에 누적합니다. 같은 코퍼스의 직전 기록과 비교해
+# 단계별 지연 변화와 예측값 변화(drift)를 함께 출력하므로, custom_model.py 성능 변경 전후로
+# 실행하면 속도와 정확도 변화를 한 번에 확인할 수 있습니다.
+#
+# 식판 하나는 서비스와 같은 순서로 분석합니다: 축소 디코딩 → 식전(중앙 crop 참조, 생략 없음)
+# → 식후(식전 역투영 참조 모델, 역투영으로 확정되는 슬롯은 신경망 생략) → compute_leftover_rate.
+#
+# 코퍼스 형식 (<corpus>/labels.json, 경로는 corpus 기준, leftover 는 API leftoverRate 와 같은 단위)
+#   {"trays": [{"id": "t001",
+#               "before":   {"side_1": "t001/before_side_1.jpg", ...},
+#               "after":    {"side_1": "t001/after_side_1.jpg", ...},
+#               "leftover": {"side_1": 35.0, ...}}]}
+#
+# Usage example (ai/ 폴더에서 실행)
+#   python -m app.benchmarks.leftover_suite --corpus ./bench_corpus --label "baseline"
+#   python -m app.benchmarks.leftover_suite --corpus ./bench_corpus --pools 1x1,2x1,4x1 \
+#       --history ./bench_history.json --label "otsu depth fallback"
+# ---------------------------------------------------------------
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+
+from ..config import settings
+from ..services import analyze_service
+from ..services.analyze_service import (
+    _init_worker,
+    compute_leftover_rate,
+    crop_center,
+    decode_image,
+    final_leftover_rate,
+)
+from ..services.custom_model import backproj_stages, fuse_stages, model_stages
+from .pool_sizing import WEIGHTS_PATH, parse_combos, run_combo
+
+STAGES = ('decode', 'backproj', 'midas', 'resnet', 'fusion')
+
+
+def load_corpus(corpus_dir):
+    """labels.json 의 식판 목록과 이미지 원본 바이트 (디스크 읽기는 측정에서 제외)"""
+    with open(os.path.join(corpus_dir, "labels.json"), encoding="utf-8") as f:
+        spec = json.load(f)
+
+    def read(path):
+        with open(os.path.join(corpus_dir, path), "rb") as f:
+            return f.read()
+
+    return [{
+        'id': str(tray['id']),
+        'before': {category: read(path) for category, path in tray['before'].items()},
+        'after': {category: read(path) for category, path in tray.get('after', {}).items()},
+        'leftover': tray.get('leftover', {}),
+    } for tray in spec['trays']]
+
+
+def run_stages(jobs, lazy, slot_rois, timings):
+    """슬롯 배치 하나를 단계별로 나눠 실행하며 단계별 소요 시간을 기록 (서비스 단계 분리 경로와 같은 순서)"""
+    pixel_scale = settings.DECODE_REDUCTION
+    stages = []
+    for job in jobs:
+        start = time.perf_counter()
+        stages += backproj_stages([job], pixel_scale, settings.BACKPROJ_MAX_SIDE, slot_rois, lazy)
+        timings['backproj'].append(time.perf_counter() - start)
+
+    pending = any(stage is not None and stage['trace'].get('midas') != 'skipped' for stage in stages)
+    common = dict(depth_backend=settings.DEPTH_BACKEND, slot_backends=analyze_service._WORKER_SLOT_BACKENDS,
+                  pixel_scale=pixel_scale, native_depth=settings.DEPTH_NATIVE_RESOLUTION)
+    resnet_model = analyze_service._WORKER_RESNET_SESSION or analyze_service._WORKER_RESNET
+
+    start = time.perf_counter()
+    depth_results, _ = model_stages(stages, None, analyze_service._WORKER_DEPTH_MODELS, **common)
+    if pending:
+        timings['midas'].append(time.perf_counter() - start)
+    start = time.perf_counter()
+    _, resnet_results = model_stages(stages, resnet_model, {}, **common)
+    if pending:
+        timings['resnet'].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    results = fuse_stages([job[2] for job in jobs], stages, depth_results, resnet_results)
+    timings['fusion'].append(time.perf_counter() - start)
+    return results
+
+
+def analyze_tray(tray, slot_rois, timings):
+    """식판 하나의 슬롯별 leftoverRate 예측"""
+    def decode(content):
+        start = time.perf_counter()
+        img = decode_image(content, settings.DECODE_REDUCTION)
+        timings['decode'].append(time.perf_counter() - start)
+        return img
+
+    categories = [category for category in tray['before'] if category in tray['after']]
+    before = {category: decode(tray['before'][category]) for category in categories}
+    after = {category: decode(tray['after'][category]) for category in categories}
+    names = {category: f"{tray['id']}_{category}.jpg" for category in categories}
+
+    before_results = run_stages(
+        [(before[c], crop_center(before[c]), names[c]) for c in categories], False, slot_rois, timings
+    )
+    # 식후는 식전 분석이 만든 역투영 참조 모델 사용 (서비스의 참조 저장소 handoff와 동일)
+    after_jobs = [
+        (after[c], result['reference_model'] if result is not None else crop_center(before[c]), names[c])
+        for c, result in zip(categories, before_results)
+    ]
+    after_results = run_stages(after_jobs, True, slot_rois, timings)
+
+    predictions = {}
+    for category, before_result, after_result in zip(categories, before_results, after_results):
+        _, _, rates = compute_leftover_rate(before_result, after_result)
+        predictions[category] = final_leftover_rate(rates)
+    return predictions
+
+
+def percentiles(samples):
+    values = np.array(samples) * 1000
+    if not values.size:
+        return None
+    return {
+        'count': int(values.size),
+        'mean': round(float(values.mean()), 2),
+        'p50': round(float(np.percentile(values, 50)), 2),
+        'p95': round(float(np.percentile(values, 95)), 2),
+    }
+
+
+def accuracy(trays, predictions):
+    """정답이 있는 슬롯의 MAE (전체/슬롯별)와 최대 오차"""
+    errors = defaultdict(list)
+    for tray in trays:
+        for category, label in tray['leftover'].items():
+            predicted = predictions.get(tray['id'], {}).get(category)
+            if predicted is not None:
+                errors[category].append(abs(predicted - float(label)))
+    flat = [e for values in errors.values() for e in values]
+    return {
+        'labeled_slots': len(flat),
+        'mae': round(float(np.mean(flat)), 3) if flat else None,
+        'max_abs_error': round(float(np.max(flat)), 3) if flat else None,
+        'per_slot_mae': {category: round(float(np.mean(values)), 3) for category, values in sorted(errors.items())},
+    }
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(previous, record):
+    """같은 코퍼스의 직전 기록 대비 단계별 p50 변화와 예측값 변화"""
+    lines = [f"vs {previous['timestamp']} ({previous.get('commit')}, {previous.get('label') or '-'})"]
+    for stage in STAGES:
+        old, new = previous['stages_ms'].get(stage), record['stages_ms'].get(stage)
+        if old and new and old['p50'] > 0:
+            lines.append(f"  {stage:9s} p50 {old['p50']:8.2f} → {new['p50']:8.2f} ms ({new['p50'] / old['p50'] - 1:+.1%})")
+    diffs = [
+        abs(value - previous['predictions'][tray_id][category])
+        for tray_id, slots in record['predictions'].items()
+        for category, value in slots.items()
+        if category in previous['predictions'].get(tray_id, {})
+    ]
+    if diffs:
+        lines.append(f"  prediction drift: mean {np.mean(diffs):.3f}  max {np.max(diffs):.3f}  "
+                     f"changed {sum(d > 0 for d in diffs)}/{len(diffs)} slots")
+    old_mae, new_mae = previous['accuracy'].get('mae'), record['accuracy'].get('mae')
+    if old_mae is not None and new_mae is not None:
+        lines.append(f"  MAE {old_mae:.3f} → {new_mae:.3f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="잔반율 정확도(MAE) + 단계별 지연/처리량 회귀 벤치마크 (JSON 히스토리 누적)",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--corpus", type=str, required=True, help="labels.json 이 있는 코퍼스 폴더")
+    parser.add_argument("--history", type=str, default="bench_history.json", help="실행 기록을 누적할 JSON 파일")
+    parser.add_argument("--label", type=str, default="", help="이번 실행 설명 (변경 내용 등)")
+    parser.add_argument("--repeat", type=int, default=3, help="단계별 지연 측정 반복 횟수 (예측은 첫 회 기준)")
+    parser.add_argument("--pools", type=str, default="", help="처리량을 측정할 풀 조합 (예: 1x1,2x1,4x1, 빈 값이면 생략)")
+    parser.add_argument("--requests", type=int, default=20, help="풀 조합별 요청 수")
+    parser.add_argument("--kiosk", type=str, default=None, help="슬롯 ROI 번들 키오스크 ID (TRAY_ROI_DIR 필요)")
+    parser.add_argument("--threads", type=int, default=1, help="단계별 지연 측정 프로세스의 연산 스레드 수")
+    args = parser.parse_args()
+
+    trays = load_corpus(args.corpus)
+    print(f"corpus: {args.corpus}  trays: {len(trays)}  "
+          f"images: {sum(len(t['before']) + len(t['after']) for t in trays)}")
+
+    # 1. 단계별 지연 + 정확도 (이 프로세스에서 워커와 같은 초기화로 모델 로드)
+    _init_worker(WEIGHTS_PATH, args.threads)
+    slot_rois = analyze_service._WORKER_TRAY_ROIS.get(args.kiosk)
+    timings = defaultdict(list)
+    predictions = {}
+    for i in range(args.repeat):
+        for tray in trays:
+            result = analyze_tray(tray, slot_rois, timings)
+            if i == 0:
+                predictions[tray['id']] = result
+    stages_ms = {stage: percentiles(timings[stage]) for stage in STAGES}
+    for stage in STAGES:
+        if stages_ms[stage]:
+            unit = "img" if stage in ('decode', 'backproj') else "batch"
+            print(f"{stage:9s}: p50 {stages_ms[stage]['p50']:8.2f} ms  p95 {stages_ms[stage]['p95']:8.2f} ms  "
+                  f"(per {unit}, n={stages_ms[stage]['count']})")
+    stage_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    acc = accuracy(trays, predictions)
+    print(f"accuracy: MAE {acc['mae']}  max {acc['max_abs_error']}  "
+          f"({acc['labeled_slots']} labeled slots)  per slot {acc['per_slot_mae']}")
+
+    # 2. 풀 크기별 처리량 (식전 이미지로 서비스 배치 경로 실행)
+    throughput = []
+    if args.pools:
+        jobs = []
+        for tray in trays:
+            for category, content in tray['before'].items():
+                img = decode_image(content, settings.DECODE_REDUCTION)
+                jobs.append((img, crop_center(img), f"{tray['id']}_{category}.jpg"))
+        sweep = argparse.Namespace(requests=args.requests, batch=5, concurrency=0)
+        for config in parse_combos(args.pools, 1, 1):
+            row = asyncio.run(run_combo(config, jobs, sweep))
+            throughput.append(row)
+            print(f"pool {row['workers']}x{row['threads']}: {row['throughput_img_s']:7.2f} img/s  "
+                  f"p95 {row['latency_p95_ms']:8.1f} ms  RSS/worker {row['peak_rss_mb']:.0f} MB")
+
+    record = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'label': args.label,
+        'corpus': os.path.abspath(args.corpus),
+        'settings': {
+            'DECODE_REDUCTION': settings.DECODE_REDUCTION,
+            'BACKPROJ_MAX_SIDE': settings.BACKPROJ_MAX_SIDE,
+            'DEPTH_BACKEND': settings.DEPTH_BACKEND,
+            'DEPTH_BACKEND_SELECTION': settings.DEPTH_BACKEND_SELECTION,
+            'DEPTH_NATIVE_RESOLUTION': bool(settings.DEPTH_NATIVE_RESOLUTION),
+            'QUANTIZE_MODE': settings.QUANTIZE_MODE,
+            'USE_MIDAS_ONNX': bool(settings.USE_MIDAS_ONNX),
+            'threads': args.threads,
+        },
+        'stages_ms': stages_ms,
+        'stage_process_peak_rss_mb': round(stage_rss, 1),
+        'throughput': throughput,
+        'accuracy': acc,
+        'predictions': predictions,
+    }
+
+    history = []
+    if os.path.exists(args.history):
+        with open(args.history, encoding="utf-8") as f:
+            history = json.load(f)
+    previous = next((r for r in reversed(history) if r.get('corpus') == record['corpus']), None)
+    if previous is not None:
+        print(compare(previous, record))
+    history.append(record)
+    # 중간에 중단되어도 기존 기록이 깨지지 않도록 임시 파일에 쓴 뒤 교체
+    tmp_path = f"{args.history}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(history, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, args.history)
+    print(f"✔  {args.history} 에 기록 추가 (총 {len(history)}회)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# micro_batching.py – 요청 간 마이크로 배치 스케줄러 시뮬레이션 벤치마크
+# ---------------------------------------------------------------
+# 점심시간처럼 요청(식판 1개 = 슬롯 job 10개)이 짧은 간격으로 몰릴 때
+# 슬롯마다 워커를 호출하는 기존 방식과 InferenceScheduler 마이크로 배치를 비교합니다.
+# 워커 호출 비용은 "호출당 고정 비용 + 이미지당 비용" 모델로 흉내 내며 (스레드에서 sleep),
+# 실제 값은 depth_backends 벤치마크의 배치 크기별 ms/img 로 맞춰 주면 됩니다.
+#
+# Usage example (ai/ 폴더에서 실행)
+#   python -m app.benchmarks.micro_batching --requests 30 --arrival-ms 100 --fixed-ms 60 --per-image-ms 25
+# ---------------------------------------------------------------
+import argparse
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ..services.inference_scheduler import InferenceScheduler
+
+
+def worker_call(batch_size, fixed_ms, per_image_ms):
+    """워커 한 번 호출 (forward pass 고정 비용 + 이미지 수에 비례하는 비용)"""
+    time.sleep((fixed_ms + per_image_ms * batch_size) / 1000)
+    return [None] * batch_size
+
+
+async def simulate(args, batching):
+    loop = asyncio.get_running_loop()
+    pool = ThreadPoolExecutor(args.workers)
+    semaphore = asyncio.Semaphore(args.workers)
+    calls = 0
+
+    async def run_batch(key, jobs, options):
+        nonlocal calls
+        calls += 1
+        return await loop.run_in_executor(pool, worker_call, len(jobs), args.fixed_ms, args.per_image_ms)
+
+    scheduler = InferenceScheduler(run_batch, args.max_batch, args.max_wait_ms / 1000, args.workers)
+
+    async def slot(job):
+        if batching:
+            return await scheduler.submit(job)
+        async with semaphore:
+            return (await run_batch(None, [job], [None]))[0]
+
+    async def request(i, delay):
+        await asyncio.sleep(delay)
+        start = time.perf_counter()
+        # 식전 5슬롯 → 식후 5슬롯 (슬롯별 체인)
+        await asyncio.gather(*[slot((i, s, 'before')) for s in range(5)])
+        await asyncio.gather(*[slot((i, s, 'after')) for s in range(5)])
+        return time.perf_counter() - start
+
+    rng = random.Random(0)
+    delays, t = [], 0.0
+    for _ in range(args.requests):
+        delays.append(t)
+        t += rng.expovariate(1000 / args.arrival_ms) if args.arrival_ms else 0.0
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*[request(i, d) for i, d in enumerate(delays)])
+    elapsed = time.perf_counter() - start
+    metrics = scheduler.metrics()
+    await scheduler.close()
+    pool.shutdown()
+    return elapsed, np.array(latencies) * 1000, calls, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="슬롯별 워커 호출 vs 요청 간 마이크로 배치 (처리량/지연 시뮬레이션)",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--requests", type=int, default=30, help="동시에 몰리는 요청(식판) 수")
+    parser.add_argument("--arrival-ms", type=float, default=100, help="요청 평균 도착 간격 (지수 분포, 0이면 동시)")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--fixed-ms", type=float, default=60, help="워커 호출당 고정 비용")
+    parser.add_argument("--per-image-ms", type=float, default=25, help="이미지당 추론 비용")
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=15)
+    args = parser.parse_args()
+
+    print(f"requests: {args.requests} x 10 slots  workers: {args.workers}  "
+          f"cost: {args.fixed_ms:.0f} ms + {args.per_image_ms:.0f} ms/img")
+    for name, batching in (("per-slot", False), ("batched", True)):
+        elapsed, latencies, calls, metrics = asyncio.run(simulate(args, batching))
+        line = (f"{name:9s}: {args.requests * 10 / elapsed:7.1f} slots/s  "
+                f"latency p50 {np.percentile(latencies, 50):7.0f} ms  p95 {np.percentile(latencies, 95):7.0f} ms  "
+                f"worker calls {calls:4d}")
+        if batching:
+            line += f"  batch sizes {metrics['batch_sizes']}  wait p95 {metrics['wait_ms_p95']:.0f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# pool_sizing.py – 분석 워커 풀 (워커 수 x 워커당 스레드 수) 조합별 처리량·지연시간 스윕
+# ---------------------------------------------------------------
+# 서비스와 같은 워커 초기화(_init_worker)와 배치 분석(analyze_images_batch)으로
+# 조합마다 새 풀을 띄워 식판 요청(슬롯 --batch 장)을 동시에 보내고
+#   처리량(img/s), 요청 지연 p50/p95, 워커 기동 시간, 워커별 최대 RSS
+# 을 기록합니다. 처리량↑·p95↓ 기준 Pareto 조합을 표시하며, 고른 값은
+# ANALYZE_WORKERS / ANALYZE_THREADS_PER_WORKER 또는 POST /ai/analyze-pool (ANALYZE_POOL_ADMIN_TOKEN 필요) 로 적용합니다.
+# 조합을 지정하지 않으면 코어 예산(affinity/cgroup 할당량) 안의 모든 조합을 측정합니다.
+#
+# Usage example (ai/ 폴더에서 실행)
+#   python -m app.benchmarks.pool_sizing --image-dir ./trays --requests 40 --output ./pool_sizing.json
+#   python -m app.benchmarks.pool_sizing --image-dir ./trays --combos 1x4,2x2,4x1
+# ---------------------------------------------------------------
+import argparse
+import asyncio
+import glob
+import json
+import math
+import os
+import resource
+import time
+
+import numpy as np
+
+from ..config import settings
+from ..services.analyze_service import _init_worker, analyze_images_batch, crop_center, decode_image
+from ..services.worker_pool import PoolConfig, ResizableProcessPool, available_cpus, cgroup_cpu_quota, plan_pool
+
+WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'weights', 'new_opencv_ckpt_b84_e200.pth')
+
+
+def load_jobs(image_dir, batch):
+    """폴더의 식판 슬롯 이미지를 서비스와 같은 축소 디코딩으로 읽어 (이미지, 중앙 crop 참조, 이름) job 생성"""
+    paths = sorted(p for ext in ("jpg", "jpeg", "png") for p in glob.glob(os.path.join(image_dir, f"*.{ext}")))
+    if not paths:
+        raise SystemExit(f"이미지가 없습니다: {image_dir}")
+    jobs = []
+    for path in paths:
+        with open(path, "rb") as f:
+            img = decode_image(f.read(), settings.DECODE_REDUCTION)
+        jobs.append((img, crop_center(img), os.path.basename(path)))
+    # 요청 하나 = batch 장 (이미지가 부족하면 반복)
+    return [jobs[i % len(jobs)] for i in range(max(batch, len(jobs)))]
+
+
+def _peak_rss(hold=0.05):
+    """워커 프로세스의 최대 RSS(MB) (hold초 대기해 다른 워커도 작업을 받도록)"""
+    time.sleep(hold)
+    return os.getpid(), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def worker_peak_rss(pool, workers, rounds=3):
+    """풀의 워커별 최대 RSS(MB) {pid: MB} (작업 분배가 보장되지 않으므로 워커 수의 rounds배 제출)"""
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*[loop.run_in_executor(pool, _peak_rss) for _ in range(workers * rounds)])
+    return dict(results)
+
+
+def parse_combos(text, cpus, oversubscribe):
+    if text:
+        combos = []
+        for item in text.split(","):
+            workers, _, threads = item.strip().partition("x")
+            combos.append(PoolConfig(int(workers), int(threads or 1)))
+        return combos
+    budget = max(1, math.floor(cpus * oversubscribe))
+    combos = {PoolConfig(w, t) for w in range(1, budget + 1) for t in range(1, budget // w + 1)}
+    combos.add(plan_pool(cpus, max_workers=settings.ANALYZE_MAX_WORKERS))
+    return sorted(combos)
+
+
+async def run_combo(config, jobs, args):
+    pool = ResizableProcessPool(config, _init_worker, (WEIGHTS_PATH,))
+    loop = asyncio.get_running_loop()
+    try:
+        # 워커 기동 + 모델 로드 (워커 수만큼 동시에 제출해 모든 워커를 띄움, 측정 제외)
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            analyze_images_batch(jobs[:1], pool, pixel_scale=settings.DECODE_REDUCTION)
+            for _ in range(config.workers)
+        ])
+        startup = time.perf_counter() - start
+
+        concurrency = args.concurrency or config.workers
+        remaining = args.requests
+        latencies = []
+        requests = [[jobs[(i * args.batch + j) % len(jobs)] for j in range(args.batch)] for i in range(args.requests)]
+
+        async def client():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                batch = requests[remaining]
+                t0 = loop.time()
+                await analyze_images_batch(batch, pool, pixel_scale=settings.DECODE_REDUCTION)
+                latencies.append(loop.time() - t0)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[client() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+        rss = await worker_peak_rss(pool, config.workers)
+    finally:
+        pool.shutdown(wait=True)
+
+    latencies = np.array(latencies) * 1000
+    images = sum(len(batch) for batch in requests)
+    return {
+        'workers': config.workers,
+        'threads': config.threads,
+        'concurrency': concurrency,
+        'startup_s': round(startup, 2),
+        'throughput_img_s': round(images / elapsed, 2),
+        'latency_p50_ms': round(float(np.percentile(latencies, 50)), 1),
+        'latency_p95_ms': round(float(np.percentile(latencies, 95)), 1),
+        'peak_rss_mb': round(max(rss.values()), 1),
+    }
+
+
+def mark_pareto(rows):
+    """처리량이 더 높고 p95가 더 낮은 다른 조합이 없으면 Pareto"""
+    for row in rows:
+        row['pareto'] = not any(
+            other is not row
+            and other['throughput_img_s'] >= row['throughput_img_s']
+            and other['latency_p95_ms'] <= row['latency_p95_ms']
+            and (other['throughput_img_s'] > row['throughput_img_s'] or other['latency_p95_ms'] < row['latency_p95_ms'])
+            for other in rows
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="분석 워커 풀 워커 수 x 스레드 수 스윕 (처리량/지연 Pareto)",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--image-dir", type=str, required=True, help="슬롯 이미지 폴더 (파일명에 슬롯 이름 포함)")
+    parser.add_argument("--combos", type=str, default="", help="측정할 조합 (예: 1x4,2x2,4x1, 빈 값이면 코어 예산 안 전체)")
+    parser.add_argument("--oversubscribe", type=float, default=1.0, help="자동 조합의 코어 예산 배수 (초과 구독 측정용)")
+    parser.add_argument("--requests", type=int, default=40, help="조합별 요청 수")
+    parser.add_argument("--batch", type=int, default=5, help="요청당 슬롯 이미지 수")
+    parser.add_argument("--concurrency", type=int, default=0, help="동시 요청 수 (0이면 워커 수)")
+    parser.add_argument("--output", type=str, default="", help="결과 JSON 경로")
+    args = parser.parse_args()
+
+    cpus = available_cpus()
+    quota = cgroup_cpu_quota()
+    combos = parse_combos(args.combos, cpus, args.oversubscribe)
+    jobs = load_jobs(args.image_dir, args.batch)
+    print(f"available CPUs: {cpus:g} (cgroup quota: {quota if quota is not None else 'none'})  "
+          f"images: {len(jobs)}  combos: {', '.join(f'{c.workers}x{c.threads}' for c in combos)}")
+
+    rows = []
+    for config in combos:
+        row = asyncio.run(run_combo(config, jobs, args))
+        rows.append(row)
+        print(f"{row['workers']}x{row['threads']:<2d}: {row['throughput_img_s']:7.2f} img/s  "
+              f"p50 {row['latency_p50_ms']:8.1f} ms  p95 {row['latency_p95_ms']:8.1f} ms  "
+              f"startup {row['startup_s']:.1f} s  RSS/worker {row['peak_rss_mb']:.0f} MB")
+
+    mark_pareto(rows)
+    default = plan_pool(cpus, max_workers=settings.ANALYZE_MAX_WORKERS)
+    print("Pareto: " + ", ".join(f"{r['workers']}x{r['threads']}" for r in rows if r['pareto'])
+          + f"  (auto default: {default.workers}x{default.threads})")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                'available_cpus': cpus,
+                'cgroup_quota': quota,
+                'batch': args.batch,
+                'requests': args.requests,
+                'decode_reduction': settings.DECODE_REDUCTION,
+                'results': rows,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"✔  {args.output} 저장 완료")
+
+
+if __name__ == "__main__":
+    main()
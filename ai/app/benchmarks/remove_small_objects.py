@@ -0,0 +1,96 @@
+# remove_small_objects.py – remove_small_objects 마이크로 벤치마크
+# ---------------------------------------------------------------
+# 기존 라벨별 루프 구현과 lookup table 구현의 결과 일치 여부와 속도를 비교합니다.
+# --crop-dir 를 주면 실제 식판 crop의 역투영 마스크를, 없으면 합성 노이즈 마스크를 사용합니다.
+#
+# Usage example (ai/ 폴더에서 실행)
+#   python -m app.benchmarks.remove_small_objects --crop-dir ./crops --repeat 20
+# ---------------------------------------------------------------
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+from ..services.custom_model import remove_small_objects
+
+
+def remove_small_objects_loop(mask, min_size=500):
+    """기존 구현 (라벨마다 전체 이미지 스캔, O(labels x pixels))"""
+    mask_uint8 = (mask.astype(np.uint8)) * 255
+    num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(mask_uint8, connectivity=8)
+    cleaned_mask = np.zeros_like(mask_uint8)
+    for i in range(1, num_labels):  # 0은 배경
+        if stats[i, cv2.CC_STAT_AREA] >= min_size:
+            cleaned_mask[labels == i] = 255
+    return cleaned_mask > 0
+
+
+def synthetic_masks(count=5, shape=(960, 1280), seed=0):
+    """질감 있는 음식의 노이즈 많은 HSV 마스크를 흉내 낸 합성 마스크"""
+    rng = np.random.default_rng(seed)
+    masks = []
+    for _ in range(count):
+        noise = rng.random(shape, dtype=np.float32)
+        noise = cv2.GaussianBlur(noise, (0, 0), 3)
+        masks.append(noise > np.percentile(noise, 55))
+    return masks
+
+
+def crop_masks(crop_dir):
+    """실제 crop 이미지에서 역투영 직전 단계의 마스크 생성"""
+    from ..services.custom_model import back_projection
+    masks = []
+    paths = sorted(glob.glob(os.path.join(crop_dir, "*.jpg")) + glob.glob(os.path.join(crop_dir, "*.png")))
+    for path in paths:
+        img = cv2.imread(path)
+        if img is None:
+            continue
+        h, w = img.shape[:2]
+        reference = img[h//2 - h//10:h//2 + h//10, w//2 - w//10:w//2 + w//10]
+        _, _, food_mask = back_projection(img, reference, min_size=0)
+        masks.append(~food_mask)
+    return masks
+
+
+def bench(fn, masks, min_size, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for mask in masks:
+            fn(mask, min_size=min_size)
+        times.append(time.perf_counter() - start)
+    return np.median(times) / len(masks) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="remove_small_objects 기존 구현 대비 속도/일치 여부 측정",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--crop-dir", type=str, default=None, help="식판 crop 이미지 폴더 (없으면 합성 마스크)")
+    parser.add_argument("--min-size", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    masks = crop_masks(args.crop_dir) if args.crop_dir else synthetic_masks()
+    if not masks:
+        print("[WARN] No masks to benchmark.")
+        return
+
+    labels = [cv2.connectedComponents(m.astype(np.uint8), connectivity=8)[0] - 1 for m in masks]
+    for mask in masks:
+        if not np.array_equal(remove_small_objects_loop(mask, args.min_size), remove_small_objects(mask, args.min_size)):
+            raise AssertionError("remove_small_objects 결과가 기존 구현과 다릅니다")
+
+    loop_ms = bench(remove_small_objects_loop, masks, args.min_size, args.repeat)
+    lut_ms = bench(remove_small_objects, masks, args.min_size, args.repeat)
+    print(f"masks: {len(masks)}  components/mask: {np.mean(labels):.0f}  (all outputs identical)")
+    print(f"loop   : {loop_ms:8.2f} ms/mask")
+    print(f"lookup : {lut_ms:8.2f} ms/mask  (x{loop_ms / lut_ms:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# shm_transport.py – 워커 이미지 전달 방식(pickle vs 공유 메모리) 마이크로 벤치마크
+# ---------------------------------------------------------------
+# 한 식판(5슬롯 x 대상/참조 이미지)을 ProcessPoolExecutor 워커에 넘겨
+# 워커가 픽셀을 한 번 읽고 돌아오는 왕복 시간을 비교합니다. (모델 추론은 포함하지 않음)
+#
+# Usage example (ai/ 폴더에서 실행)
+#   python -m app.benchmarks.shm_transport --repeat 50
+# ---------------------------------------------------------------
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ..services.shm_transport import attached_jobs, ensure_resource_tracker, share_jobs
+
+
+def _touch(jobs):
+    """워커: 전달받은 이미지를 한 번 읽기만 함"""
+    with attached_jobs(jobs) as jobs:
+        return sum(int(target[0, 0, 0]) + int(reference[0, 0, 0]) for target, reference, _ in jobs)
+
+
+def tray_jobs(slots=5, shape=(960, 1280, 3), ref_shape=(192, 256, 3), seed=0):
+    """키오스크 2배 업스케일 crop 크기의 합성 식판 작업"""
+    rng = np.random.default_rng(seed)
+    return [
+        (rng.integers(0, 255, shape, dtype=np.uint8), rng.integers(0, 255, ref_shape, dtype=np.uint8), f"slot_{i}")
+        for i in range(slots)
+    ]
+
+
+def bench(executor, jobs, shared, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if shared:
+            batch, handles = share_jobs(jobs)
+            try:
+                executor.submit(_touch, handles).result()
+            finally:
+                batch.close()
+        else:
+            executor.submit(_touch, jobs).result()
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="워커 이미지 전달 방식별 왕복 시간 측정",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--slots", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    jobs = tray_jobs(args.slots)
+    payload_mb = sum(t.nbytes + r.nbytes for t, r, _ in jobs) / 1024 / 1024
+    ensure_resource_tracker()
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        executor.submit(_touch, []).result()  # 워커 기동 시간 제외
+        pickle_ms = bench(executor, jobs, False, args.repeat)
+        shm_ms = bench(executor, jobs, True, args.repeat)
+    print(f"slots: {args.slots}  payload: {payload_mb:.1f} MB/batch")
+    print(f"pickle : {pickle_ms:8.2f} ms/batch")
+    print(f"shm    : {shm_ms:8.2f} ms/batch  (x{pickle_ms / shm_ms:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# volume_estimate.py – estimate_volume_from_depth_with_weight 마이크로 벤치마크
+# ---------------------------------------------------------------
+# 1) 기존 구현(전체 크기 NaN 복사본 2개 + dz/dz_cm 전체 배열)과
+#    음식/트레이 픽셀만 모아 계산하는 현재 구현의 결과가 비트 단위로 같은지 확인하고 속도를 비교합니다.
+#    z_plane 경로(fixed_empty, tray_mask, empty_plate/fallback)를 모두 포함합니다.
+# 2) predict_depth_batch의 원본 크기 업샘플 경로와 MiDaS 출력 해상도(native_resolution) 경로의
+#    후처리 시간과 volume_pct 차이를 비교합니다.
+#    기본은 이미지 밝기를 깊이로 쓰는 대체 모델이며, --midas 를 주면 실제 MiDaS(torch.hub)를 사용합니다.
+#
+# Usage example (ai/ 폴더에서 실행)
+#   python -m app.benchmarks.volume_estimate --reduction 2 --repeat 20
+# ---------------------------------------------------------------
+import argparse
+import contextlib
+import io
+import time
+
+import cv2
+import numpy as np
+import torch
+
+from ..services.custom_model import (
+    CALIBRATION, DEFAULT_DEPTH_BACKEND, TRAY_SLOTS, estimate_volume_from_depth_with_weight, predict_depth_batch,
+    seed_everything,
+)
+
+
+def estimate_volume_copies(depth_map, roi_mask, slot_name=None, backend=DEFAULT_DEPTH_BACKEND, pixel_scale=1.0):
+    """기존 구현 (roi_mask가 충분한 경우만, 음식/트레이 NaN 복사본과 전체 크기 dz 배열 사용)"""
+    food_mask = roi_mask.astype(np.uint8)
+    food_mask = food_mask > 0
+    tray_mask = ~food_mask.astype(bool)
+    depth_tray = depth_map.copy()
+    depth_food = depth_map.copy()
+    depth_food[~food_mask] = np.nan
+    depth_tray[food_mask] = np.nan
+
+    calibration = CALIBRATION.get(backend)
+    slots = calibration.slots
+    if slot_name in slots and slot_name in calibration.z_plane:
+        z_plane = calibration.z_plane[slot_name]
+        z_plane_source = 'fixed_empty'
+    elif np.sum(tray_mask) > 0.05 * tray_mask.size:
+        z_plane = np.nanmean(depth_tray[tray_mask])
+        z_plane_source = 'tray_mask'
+    elif calibration.empty_z_plane is not None:
+        z_plane = calibration.empty_z_plane
+        z_plane_source = 'empty_plate'
+    else:
+        z_plane = np.nanmean(depth_tray)
+        z_plane_source = 'fallback'
+
+    dz = np.maximum(0, depth_map - z_plane)
+    dz_cm = dz * calibration.scale_cm_per_unit * 2
+    food_mask_final = food_mask & ((dz_cm > 0.002) & (dz_cm < 3.0))
+    valid_h = dz_cm[food_mask_final]
+    avg_h_cm = np.nanmean(valid_h) if valid_h.size else 0
+
+    if slot_name in slots:
+        slot = slots[slot_name]
+        W_CM, L_CM = slot["w"], slot["h"]
+        NX, NY = slot["nx"], slot["ny"]
+    else:
+        W_CM, L_CM, NX, NY = 37.5, 29.0, 2592, 1944
+    PIX_AREA = (W_CM / NX) * (L_CM / NY)
+    food_pixel_count = np.sum(food_mask_final) * pixel_scale ** 2
+    food_area_cm2 = food_pixel_count * PIX_AREA
+    food_volume_cm3 = food_area_cm2 * avg_h_cm * 30
+    volume_pct = min(60, (food_pixel_count / (NX*NY)) * (avg_h_cm / 3.0) * 100)
+    return volume_pct, food_mask_final, volume_pct, food_volume_cm3, z_plane, z_plane_source
+
+
+def synthetic_slots(reduction=2, seed=0):
+    """슬롯 크기(TRAY_SLOTS / reduction)의 합성 식판 이미지, 깊이 맵, 음식 마스크"""
+    rng = np.random.default_rng(seed)
+    cases = []
+    for slot_name, slot in TRAY_SLOTS.items():
+        for fill in (0.3, 0.97):  # 0.97: 트레이 픽셀 5% 미만 (empty_plate/fallback 경로)
+            h, w = slot["ny"] // reduction, slot["nx"] // reduction
+            yy, xx = np.mgrid[0:h, 0:w]
+            r = np.hypot((yy - h / 2) / (h / 2), (xx - w / 2) / (w / 2))
+            mound = np.clip(1 - r / np.sqrt(2 * fill), 0, None)
+            noise = cv2.GaussianBlur(rng.random((h, w), dtype=np.float32), (0, 0), 4)
+            depth = (0.4 + 0.3 * mound + 0.05 * noise).astype(np.float32)
+            mask = (mound + 0.1 * (noise - 0.5)) > 0.05
+            img = np.dstack([np.clip(depth * 255, 0, 255).astype(np.uint8)] * 3)
+            cases.append((slot_name, img, depth, mask))
+    return cases
+
+
+class BrightnessDepth:
+    """이미지 밝기를 상대 깊이로 반환하는 MiDaS 대체 모델 (출력 256x256)"""
+
+    @staticmethod
+    def transform(img):
+        return torch.from_numpy(np.ascontiguousarray(img)).permute(2, 0, 1).float() / 255
+
+    def __call__(self, batch):
+        return batch.mean(dim=1)
+
+
+def results_equal(a, b):
+    return (a[0] == b[0] and np.array_equal(a[1], b[1]) and a[3] == b[3]
+            and a[4] == b[4] and a[5] == b[5])
+
+
+def bench(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="부피 추정 기존 구현 대비 일치 여부/속도, 출력 해상도 부피 계산 오차 측정",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--reduction", type=int, default=2, help="슬롯 이미지 축소 배율 (DECODE_REDUCTION)")
+    parser.add_argument("--backend", type=str, default=DEFAULT_DEPTH_BACKEND)
+    parser.add_argument("--midas", action="store_true", help="대체 모델 대신 실제 MiDaS 사용")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    seed_everything()
+
+    cases = synthetic_slots(args.reduction)
+    sources = set()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for slot_name, _, depth, mask in cases:
+            expected = estimate_volume_copies(depth, mask, slot_name, args.backend, args.reduction)
+            actual = estimate_volume_from_depth_with_weight(depth, mask, slot_name, args.backend, args.reduction)
+            if not results_equal(expected, actual):
+                raise AssertionError(f"{slot_name}: 부피 추정 결과가 기존 구현과 다릅니다")
+            sources.add(actual[5])
+
+    def run(fn):
+        return lambda: [fn(depth, mask, slot_name, args.backend, args.reduction) for slot_name, _, depth, mask in cases]
+
+    copies_ms = bench(run(estimate_volume_copies), args.repeat) / len(cases)
+    fused_ms = bench(run(estimate_volume_from_depth_with_weight), args.repeat) / len(cases)
+    print(f"slots: {len(cases)}  z_plane sources: {', '.join(sorted(sources))}  (all outputs identical)")
+    print(f"copies : {copies_ms:8.2f} ms/slot")
+    print(f"fused  : {fused_ms:8.2f} ms/slot  (x{copies_ms / fused_ms:.1f})")
+
+    if args.midas:
+        from ..services.custom_model import load_midas_model
+        model, transform = load_midas_model(backend=args.backend)
+    else:
+        model = BrightnessDepth()
+        transform = BrightnessDepth.transform
+    images = [img for _, img, _, _ in cases]
+    masks = [mask for _, _, _, mask in cases]
+    names = [slot_name for slot_name, _, _, _ in cases]
+
+    def predict(native):
+        return predict_depth_batch(images, model, transform, roi_masks=masks, slot_names=names,
+                                   backend=args.backend, pixel_scale=args.reduction, native_resolution=native)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        full, native = predict(False), predict(True)
+    drift = [abs(a[1] - b[1]) for a, b in zip(full, native)]
+    full_ms = bench(lambda: predict(False), args.repeat) / len(cases)
+    native_ms = bench(lambda: predict(True), args.repeat) / len(cases)
+    print(f"upsample: {full_ms:8.2f} ms/slot (incl. depth model)")
+    print(f"native  : {native_ms:8.2f} ms/slot  mean |dvolume_pct|: {np.mean(drift):.3f}  "
+          f"max: {np.max(drift):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
 # env 등 각종 자격 
+import logging
 import os
+import tempfile
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from .core.logger import setup_logging
 
 load_dotenv()
 
@@ -15,12 +18,73 @@ class Settings(BaseSettings):
     LLM_MODEL: str = os.getenv("LLM_MODEL", "gpt-4")
     LLM_TEMPERATURE: float = float(os.getenv("LLM_TEMPERATURE", "0.2"))
 
+    # 잔반 분석 모델 설정
+    USE_MIDAS_ONNX: bool = os.getenv("USE_MIDAS_ONNX", "True")  # MiDaS를 ONNX Runtime으로 추론
+    DEPTH_BACKEND: str = os.getenv("DEPTH_BACKEND", "DPT_Large")  # 기본 깊이 백엔드 (DPT_Large, DPT_Hybrid, MiDaS_small)
+    DEPTH_BACKEND_SELECTION: str = os.getenv("DEPTH_BACKEND_SELECTION", "")  # 슬롯별 깊이 백엔드 선택 JSON 경로
+    QUANTIZE_MODE: str = os.getenv("QUANTIZE_MODE", "none")  # INT8 양자화 모드 (none, dynamic, static 중 하나, 기동 시 검증)
+    QUANTIZE_CALIBRATION_DIR: str = os.getenv("QUANTIZE_CALIBRATION_DIR", "")  # 정적 양자화용 식판 crop 폴더
+    REFERENCE_STORE_MAX_MB: int = int(os.getenv("REFERENCE_STORE_MAX_MB", "64"))  # 참조 이미지 저장소 메모리 예산
+    REFERENCE_STORE_TTL: float = float(os.getenv("REFERENCE_STORE_TTL", "600"))  # 참조 이미지 보관 시간(초)
+    USE_SHARED_MEMORY: bool = os.getenv("USE_SHARED_MEMORY", "True")  # 워커에 이미지를 공유 메모리로 전달
+    DECODE_REDUCTION: int = int(os.getenv("DECODE_REDUCTION", "1"))  # 다운로드 이미지 축소 디코딩 배율 (1, 2, 4, 8 중 하나, 기동 시 검증)
+    BACKPROJ_MAX_SIDE: int = int(os.getenv("BACKPROJ_MAX_SIDE", "0"))  # 역투영 작업 해상도 (긴 변 px, 0이면 디코딩 해상도)
+    ANALYZE_WORKERS: int = int(os.getenv("ANALYZE_WORKERS", "0"))  # 분석 워커 프로세스 수 (0이면 사용 가능한 코어 수로 자동 결정)
+    ANALYZE_THREADS_PER_WORKER: int = int(os.getenv("ANALYZE_THREADS_PER_WORKER", "0"))  # 워커당 연산 스레드 수 (0이면 남는 코어를 워커에 분배)
+    ANALYZE_MAX_WORKERS: int = int(os.getenv("ANALYZE_MAX_WORKERS", "4"))  # 최대 워커 수 (자동/지정/API 변경 모두 적용, 워커마다 모델을 로드하므로 메모리 상한)
+    ANALYZE_POOL_ADMIN_TOKEN: str = os.getenv("ANALYZE_POOL_ADMIN_TOKEN", "")  # POST /ai/analyze-pool 운영자 토큰 (X-Admin-Token 헤더, 빈 값이면 API 비활성)
+    WARMUP_ON_STARTUP: bool = os.getenv("WARMUP_ON_STARTUP", "True")  # 시작 시 모든 워커를 기동하고 합성 이미지로 워밍업 (완료 전 /ready 503)
+    WARMUP_TIMEOUT: float = float(os.getenv("WARMUP_TIMEOUT", "600"))  # 워밍업 최대 시간(초, 초과 시 /ready 계속 503)
+    SPLIT_PIPELINE_STAGES: bool = os.getenv("SPLIT_PIPELINE_STAGES", "True")  # 역투영은 스레드 풀, 신경망은 워커 프로세스 풀에서 따로 실행
+    BACKPROJ_THREADS: int = int(os.getenv("BACKPROJ_THREADS", "0"))  # 역투영 스레드 수/동시 실행 수 (0이면 워커 수 x 워커당 스레드 수)
+    USE_MICRO_BATCHING: bool = os.getenv("USE_MICRO_BATCHING", "True")  # 여러 요청의 슬롯 분석을 마이크로 배치로 묶어 실행
+    MICRO_BATCH_MAX_SIZE: int = int(os.getenv("MICRO_BATCH_MAX_SIZE", "8"))  # 마이크로 배치 최대 이미지 수
+    MICRO_BATCH_MAX_WAIT_MS: float = float(os.getenv("MICRO_BATCH_MAX_WAIT_MS", "15"))  # 배치를 채우려고 기다리는 최대 시간(ms)
+    DEPTH_NATIVE_RESOLUTION: bool = os.getenv("DEPTH_NATIVE_RESOLUTION", "False")  # 깊이 맵 업샘플 없이 MiDaS 출력 해상도에서 부피 계산
+    TRAY_ROI_DIR: str = os.getenv("TRAY_ROI_DIR", "")  # 키오스크별 슬롯 ROI 번들 폴더 (once_make_masks 출력, 빈 값이면 미사용)
+    TRAY_ROI_DEFAULT_KIOSK: str = os.getenv("TRAY_ROI_DEFAULT_KIOSK", "default")  # 요청에 kioskId가 없을 때 사용할 번들
+    CALIBRATION_DIR: str = os.getenv("CALIBRATION_DIR", "")  # MiDaS 캘리브레이션 파일 폴더 (빈 값이면 ai/ 폴더)
+    CALIBRATION_SLOTS_FILE: str = os.getenv("CALIBRATION_SLOTS_FILE", "")  # 슬롯 크기(TRAY_SLOTS) 덮어쓰기 JSON
+    CALIBRATION_STRICT: bool = os.getenv("CALIBRATION_STRICT", "False")  # 스케일 파일이 없으면 시작 실패
+    # 디버그 전용: True이면 X-Debug-Timing: 1 요청 헤더에 단계별 소요 시간/span(이미지 URL, 워커 PID 포함)을 응답에 첨부
+    # 운영에서는 끄고, 측정이 필요할 때만 DEBUG_TIMING_HEADER=True로 기동 (내부 정보가 클라이언트에 노출됨)
+    DEBUG_TIMING_HEADER: bool = os.getenv("DEBUG_TIMING_HEADER", "False")
+
+    # 이미지 다운로드 HTTP 클라이언트 설정
+    HTTP_POOL_LIMIT: int = int(os.getenv("HTTP_POOL_LIMIT", "100"))  # 전체 동시 커넥션 수
+    HTTP_POOL_LIMIT_PER_HOST: int = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20"))  # 호스트별 동시 커넥션 수
+    HTTP_DNS_CACHE_TTL: int = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))  # DNS 캐시 유지 시간(초)
+    HTTP_KEEPALIVE_TIMEOUT: float = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))  # 유휴 커넥션 유지 시간(초)
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))  # 연결 타임아웃(초)
+    HTTP_READ_TIMEOUT: float = float(os.getenv("HTTP_READ_TIMEOUT", "10"))  # 소켓 읽기 타임아웃(초)
+    HTTP_TOTAL_TIMEOUT: float = float(os.getenv("HTTP_TOTAL_TIMEOUT", "20"))  # 요청 1회 전체 타임아웃(초)
+    HTTP_RETRIES: int = int(os.getenv("HTTP_RETRIES", "2"))  # 일시적 오류 재시도 횟수
+    HTTP_RETRY_BACKOFF: float = float(os.getenv("HTTP_RETRY_BACKOFF", "0.2"))  # 재시도 백오프 기준 시간(초)
+
+    # 다운로드 이미지 캐시 설정
+    IMAGE_CACHE_MEMORY_MB: int = int(os.getenv("IMAGE_CACHE_MEMORY_MB", "256"))  # 디코딩 배열 메모리 LRU 예산
+    IMAGE_CACHE_DIR: str = os.getenv("IMAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "baberang-image-cache"))  # 디스크 캐시 폴더 (빈 값이면 비활성)
+    IMAGE_CACHE_DISK_MB: int = int(os.getenv("IMAGE_CACHE_DISK_MB", "1024"))  # 디스크 캐시 예산
+    IMAGE_CACHE_STORE_DECODED: bool = os.getenv("IMAGE_CACHE_STORE_DECODED", "False")  # 디코딩 배열도 디스크에 저장 (mmap 로드)
+    IMAGE_CACHE_REVALIDATE: bool = os.getenv("IMAGE_CACHE_REVALIDATE", "True")  # 캐시 적중 시 ETag 조건부 요청으로 변경 여부 확인 (키오스크가 같은 URL에 덮어씀)
+    IMAGE_CACHE_URL_TTL: float = float(os.getenv("IMAGE_CACHE_URL_TTL", "60"))  # 재검증을 끈 경우 URL → 이미지 매핑을 확인 없이 믿는 시간(초)
+
+    # 분석 결과 저장소 설정
+    # 저장소를 켜면 결과 키(이미지 내용 해시)를 만들기 위해 모든 식전/식후 이미지를 받은 뒤 분석을 시작하므로
+    # 식후 이미지 다운로드와 식전 분석의 겹침이 사라짐 → 재요청/재시도가 많은 배포에서만 경로를 지정 (opt-in)
+    RESULT_STORE_PATH: str = os.getenv("RESULT_STORE_PATH", "")  # SQLite 파일 경로 (빈 값이면 비활성)
+    RESULT_STORE_TTL: float = float(os.getenv("RESULT_STORE_TTL", "604800"))  # 결과 보관 시간(초)
+    RESULT_STORE_MODEL_VERSION: str = os.getenv("RESULT_STORE_MODEL_VERSION", "")  # 결과 키의 모델 버전 (빈 값이면 가중치/분석 설정/캘리브레이션 파일로 계산)
+
     # API 설정
     API_TITLE: str = "AI system"
     API_VERSION: str = "0.0.1"
 
     # 로깅 설정
-    DEBUG: bool = os.getenv("DEBUG", "True")
+    DEBUG: bool = os.getenv("DEBUG", "False")  # 개발 모드 (uvicorn reload/debug 로그, 로컬 개발 시에만 DEBUG=True, 로그 양은 LOG_LEVEL로 조절)
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")  # 애플리케이션 로그 레벨 (DEBUG이면 프롬프트/타이밍 등 상세 로그)
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")  # 로그 형식 (text, json)
+    LOG_SAMPLE_EVERY: int = int(os.getenv("LOG_SAMPLE_EVERY", "100"))  # 요청마다 반복되는 hot path 로그는 N개 중 1개만 출력
 
     class Config:
         env_file = ".env"
@@ -34,8 +98,11 @@ def get_settings() -> Settings:
 settings = get_settings()
 get_settings.cache_clear()
 
+# 로깅 설정 (큐 기반 비동기 출력)
+setup_logging(settings.LOG_LEVEL, settings.LOG_FORMAT, settings.LOG_SAMPLE_EVERY)
+
 # 디버그 로그
-if settings.DEBUG:
-    print(f"[CONFIG] DEBUG mode: {settings.DEBUG}")
-    print(f"[CONFIG] OPENAI_API_KEY: {settings.OPENAI_API_KEY[:4] if settings.OPENAI_API_KEY else 'Not set'}...")
-    print(f"[CONFIG] LLM_MODEL: {settings.LLM_MODEL}")
\ No newline at end of file
+logger = logging.getLogger(__name__)
+logger.debug("[CONFIG] DEBUG mode: %s", settings.DEBUG)
+logger.debug("[CONFIG] OPENAI_API_KEY: %s...", settings.OPENAI_API_KEY[:4] if settings.OPENAI_API_KEY else 'Not set')
+logger.debug("[CONFIG] LLM_MODEL: %s", settings.LLM_MODEL)
\ No newline at end of file
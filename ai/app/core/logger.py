@@ -0,0 +1,180 @@
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from typing import Any, Callable, Dict, Optional
+
+# 표준 logging 기반 (requirements의 loguru 대신): uvicorn/aiohttp/onnxruntime 등 서드파티 로거와
+# 같은 레벨/핸들러 체계를 공유하고, QueueHandler/QueueListener로 출력 I/O를 요청 경로 밖으로 뺄 수 있음
+
+# 애플리케이션 로거 이름 공간 (모듈에서는 logging.getLogger(__name__) → "app.services.analyze_service" 등)
+ROOT_LOGGER = "app"
+
+
+class Lazy:
+    """
+    로그가 실제로 출력될 때만 계산되는 인자
+    예) logger.debug("plan: %s", Lazy(json.dumps, plan, ensure_ascii=False, indent=2))
+    레벨이 꺼져 있거나 샘플링으로 버려지면 fn은 호출되지 않음
+    """
+    __slots__ = ('fn', 'args', 'kwargs')
+
+    def __init__(self, fn: Callable[..., Any], *args, **kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self) -> str:
+        return str(self.fn(*self.args, **self.kwargs))
+
+
+def lazy_json(obj: Any, **kwargs) -> Lazy:
+    """출력될 때만 직렬화하는 JSON 인자 (큰 dict/LLM 응답용)"""
+    return Lazy(json.dumps, obj, ensure_ascii=False, default=str, **kwargs)
+
+
+_SAMPLE_EVERY = 100
+
+
+def sampled(every: Optional[int] = None) -> Dict[str, int]:
+    """
+    hot path 로그용 extra: 같은 (로거, 메시지 템플릿)의 레코드를 every개 중 1개만 출력
+    예) logger.debug("[TIMING] crop_center: %.3fs", elapsed, extra=sampled())
+    """
+    return {'sample_every': _SAMPLE_EVERY if every is None else every}
+
+
+class SamplingFilter(logging.Filter):
+    """extra=sampled()로 표시한 레코드를 템플릿별로 샘플링 (통과한 레코드에는 sampled=N 기록)"""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._counts: Dict[tuple, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        every = getattr(record, 'sample_every', 0)
+        if every <= 1:
+            return True
+        key = (record.name, record.msg)
+        with self._lock:
+            seen = self._counts.get(key, 0)
+            self._counts[key] = seen + 1
+        if seen % every:
+            return False
+        record.sampled = every
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """한 줄 JSON (ts, level, logger, pid, msg, [sampled], [exc])"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'pid': record.process,
+            'msg': record.getMessage(),
+        }
+        if getattr(record, 'sampled', None):
+            entry['sampled'] = record.sampled
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        return f"{line} (1/{record.sampled} sampled)" if getattr(record, 'sampled', None) else line
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    이벤트 루프를 막지 않는 QueueHandler
+    - 호출 스레드에서는 메시지 보간(%)만 하고 포맷/출력은 리스너 스레드에서 수행
+    - 큐가 가득 차면 기다리지 않고 버린 뒤 dropped로 집계
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 인자는 나중에 바뀔 수 있는 객체(dict 등)일 수 있으므로 보간만 지금 수행
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_state: Dict[str, Any] = {}
+
+
+def _formatter(fmt: str) -> logging.Formatter:
+    return JsonFormatter() if fmt == "json" else TextFormatter()
+
+
+def setup_logging(level: str = "INFO", fmt: str = "text", sample_every: int = 100, queue_size: int = 10000):
+    """
+    애플리케이션 로거 설정 (여러 번 호출하면 레벨/형식만 갱신)
+    level: DEBUG/INFO/WARNING/ERROR, fmt: text 또는 json
+    로그는 큐에 넣고 리스너 스레드가 stdout으로 출력 (fork된 워커 프로세스는 직접 출력)
+    """
+    global _SAMPLE_EVERY
+    _SAMPLE_EVERY = sample_every
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.setLevel(level.upper())
+    logger.propagate = False
+
+    if _state:
+        _state['stream'].setFormatter(_formatter(fmt))
+        return logger
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(_formatter(fmt))
+    handler = DroppingQueueHandler(queue.Queue(queue_size))
+    handler.addFilter(SamplingFilter())
+    listener = logging.handlers.QueueListener(handler.queue, stream)
+    listener.start()
+    atexit.register(listener.stop)
+    logger.addHandler(handler)
+    _state.update(stream=stream, handler=handler, listener=listener)
+
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=_after_fork)
+    return logger
+
+
+def _after_fork():
+    # fork된 자식(분석 워커)에는 리스너 스레드가 없으므로 큐 대신 stdout에 직접 출력
+    # (워커에는 이벤트 루프가 없어 동기 출력이 요청 처리를 막지 않음)
+    logger = logging.getLogger(ROOT_LOGGER)
+    handler = _state.get('handler')
+    if handler is None or handler not in logger.handlers:
+        return
+    logger.removeHandler(handler)
+    direct = logging.StreamHandler(sys.stdout)
+    direct.setFormatter(_state['stream'].formatter)
+    direct.addFilter(SamplingFilter())
+    logger.addHandler(direct)
+
+
+def dropped() -> int:
+    """큐가 가득 차 버린 로그 수"""
+    handler = _state.get('handler')
+    return handler.dropped if handler is not None else 0
@@ -1,18 +1,20 @@
 # 멀티 에이전트용 프롬프트 템플릿
+import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime, date, timedelta
 import calendar
 import json, time
 
-from ..config import settings
+
+logger = logging.getLogger(__name__)
 
 class PromptTemplates:
     """프롬프트 템플릿 모음"""
 
     @staticmethod
     def get_next_month_range():
-        if settings.DEBUG:
-            print(f"[PROMPT][get_next_month_range] Starting with parameters...")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[PROMPT][get_next_month_range] Starting with parameters...")
             start_time = time.time()
         """
         다음 달의 시작일과 종료일 계산
@@ -42,8 +44,8 @@ class PromptTemplates:
             if current_date.weekday() < 5:  # 5 미만이면 평일
                 weekdays.append(current_date.isoformat())
             current_date += timedelta(days=1)
-        if settings.DEBUG:
-            print(f"[PROMPT][get_next_month_range] Completed in {time.time() - start_time:.4f} seconds")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[PROMPT][get_next_month_range] Completed in %.4f seconds", time.time() - start_time)
 
         return weekdays
     
@@ -51,8 +53,8 @@ class PromptTemplates:
     def organize_menu_by_category(menu_pool: List[str], categories: Optional[Dict[str, List[str]]]) -> Dict[str, List[str]]:
         """메뉴를 카테고리별로 정리"""
 
-        if settings.DEBUG:
-            print(f"[PROMPT][organize_menu_by_category] Starting with parameters...")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[PROMPT][organize_menu_by_category] Starting with parameters...")
             start_time = time.time()
 
         if categories:
@@ -83,8 +85,8 @@ class PromptTemplates:
             if not categorized_flag:
                 categorized["side"].append(menu)
 
-        if settings.DEBUG:
-            print(f"[PROMPT][organize_menu_by_category] Completed in {time.time() - start_time:.4f} seconds")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[PROMPT][organize_menu_by_category] Completed in %.4f seconds", time.time() - start_time)
 
         return categorized
 
@@ -93,8 +95,8 @@ class PromptTemplates:
         """
         잔반율 기반 식단 생성 프롬프트
         """
-        if settings.DEBUG:
-            print(f"[PROMPT][waste_based_templates] Starting with parameters...")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[PROMPT][waste_based_templates] Starting with parameters...")
             start_time = time.time()
 
         # 다음 달 날짜 자동 계산
@@ -105,13 +107,12 @@ class PromptTemplates:
         for category, menus in menu_pool.items():
             limited_menu[category] = menus[:20] if len(menus) > 20 else menus
 
-        if settings.DEBUG:
-            print(leftover_data)
+        logger.debug("[PROMPT][waste_based_templates] leftover_data: %s", leftover_data)
         # 잔반율도 카테고리별로 정리
         categorized_leftover = leftover_data
 
-        if settings.DEBUG:
-            print(f"[PROMPT][waste_based_templates] Completed in {time.time() - start_time:.4f} seconds")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[PROMPT][waste_based_templates] Completed in %.4f seconds", time.time() - start_time)
 
         return f"""
         당신은 학교 급식 메뉴를 계획하는 영양사입니다.
@@ -171,8 +172,8 @@ class PromptTemplates:
         """
         영양소 기반 식단 생성 프롬프트
         """
-        if settings.DEBUG:
-            print(f"[PROMPT][nutrition_based_template] Starting with parameters...")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[PROMPT][nutrition_based_template] Starting with parameters...")
             start_time = time.time()
 
         # 다음 달 날짜 자동 계산
@@ -188,8 +189,8 @@ class PromptTemplates:
 
         categorized_ratings = ratings
 
-        if settings.DEBUG:
-            print(f"[PROMPT][nutrition_based_template] Completed in {time.time() - start_time:.4f} seconds")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[PROMPT][nutrition_based_template] Completed in %.4f seconds", time.time() - start_time)
 
         return f"""
         당신은 영양 균형을 고려한 학교 급식 식단 플래너입니다.
@@ -267,8 +268,7 @@ class PromptTemplates:
         """
         통합 식단 생성 프롬프트
         """
-        if settings.DEBUG:
-            print(f"[PROMPT][integration_template] Starting with parameters...")
+        logger.debug("[PROMPT][integration_template] Starting with parameters...")
 
         # 다음 달 날짜 자동 계산
         
@@ -0,0 +1,183 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# 단계 소요 시간 히스토그램 버킷(초)
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """라벨 하나를 갖는 Prometheus 형식 히스토그램 (프로세스 내 집계, /metrics 텍스트로 노출)"""
+
+    def __init__(self, name: str, documentation: str, label: str, buckets: Tuple[float, ...] = STAGE_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: Dict[str, List[float]] = {}  # 라벨 값 → [버킷별 누적 수..., +Inf 수, 합계]
+
+    def observe(self, value: str, seconds: float):
+        with self._lock:
+            series = self._series.get(value)
+            if series is None:
+                series = self._series[value] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[len(self.buckets)] += 1
+            series[-1] += seconds
+
+    def exposition(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {value: list(counts) for value, counts in sorted(self._series.items())}
+        for value, counts in series.items():
+            label = f'{self.label}="{value}"'
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{label},le="{bound:g}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {counts[len(self.buckets)]}')
+            lines.append(f'{self.name}_sum{{{label}}} {counts[-1]:.6f}')
+            lines.append(f'{self.name}_count{{{label}}} {counts[len(self.buckets)]}')
+        return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram(
+    "baberang_analyze_stage_seconds",
+    "Leftover analysis stage latency in seconds",
+    "stage",
+)
+
+
+class Trace:
+    """
+    span 수집기
+    - 요청 trace: 요청 처리 중 기록된 span과 워커/스레드에서 돌려받은 span을 모음
+    - 원격 trace(observe=False): 워커 프로세스/스레드 안에서 모아 결과와 함께 돌려보내는 span
+      (히스토그램은 받는 쪽에서 배치당 한 번만 집계)
+    """
+
+    def __init__(self, observe: bool = True):
+        self.observe = observe
+        self.started = time.time()
+        self.spans: List[Dict[str, Any]] = []
+        self._attached = set()  # attach로 받은 span id (같은 배치의 span을 슬롯마다 중복 추가하지 않도록)
+
+
+_CURRENT: ContextVar[Optional[Trace]] = ContextVar("baberang_trace", default=None)
+
+
+def current() -> Optional[Trace]:
+    return _CURRENT.get()
+
+
+@contextmanager
+def collect(observe: bool = True):
+    """현재 컨텍스트(와 여기서 만든 asyncio task)의 span을 새 Trace로 수집"""
+    trace = Trace(observe)
+    token = _CURRENT.set(trace)
+    try:
+        yield trace
+    finally:
+        _CURRENT.reset(token)
+
+
+def record(name: str, duration: float, start: Optional[float] = None, **attrs):
+    """
+    span 하나 기록 (duration: 초, start: epoch 초 - 프로세스 간에 비교 가능한 벽시계)
+    수집 중인 Trace가 없으면 히스토그램에만 집계
+    """
+    trace = _CURRENT.get()
+    if trace is None or trace.observe:
+        STAGE_SECONDS.observe(name, duration)
+    if trace is not None:
+        trace.spans.append({'name': name, 'start': start if start is not None else time.time() - duration,
+                            'duration': duration, **attrs})
+
+
+def start() -> Tuple[float, float]:
+    """span 시작 시각 (벽시계, 단조 시계) - with 블록으로 감싸기 어려운 구간은 start()/end()로 기록"""
+    return time.time(), time.perf_counter()
+
+
+def end(name: str, started: Tuple[float, float], **attrs):
+    record(name, time.perf_counter() - started[1], started[0], **attrs)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """with 블록의 소요 시간을 span으로 기록 (예외가 나면 error 속성에 예외 타입)"""
+    started = start()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs['error'] = type(e).__name__
+        raise
+    finally:
+        end(name, started, **attrs)
+
+
+def call_traced(fn: Callable[..., Any], *args) -> Tuple[Any, List[Dict[str, Any]]]:
+    """
+    워커 프로세스/스레드에서 fn(*args)을 실행하고 그 안에서 기록된 span을 결과와 함께 반환
+    executor에 그대로 제출할 수 있도록 모듈 최상위 함수 (fn도 pickle 가능해야 함)
+    """
+    with collect(observe=False) as trace:
+        result = fn(*args)
+    return result, trace.spans
+
+
+def observe(spans: Iterable[Dict[str, Any]]):
+    """call_traced로 돌려받은 span을 히스토그램에 집계 (배치 하나당 한 번)"""
+    for s in spans:
+        STAGE_SECONDS.observe(s['name'], s['duration'])
+
+
+def attach(spans: Iterable[Dict[str, Any]], image: Optional[str] = None):
+    """
+    돌려받은 span을 현재 요청 trace에 추가 (히스토그램 집계 없음, 수집 중이 아니면 무시)
+    image: 여러 요청을 묶은 배치이면 이 이미지의 span과 배치 공통 span(image 속성 없음)만 추가
+    같은 배치에 요청의 슬롯이 여럿이면 배치 공통 span은 한 번만 추가
+    """
+    trace = _CURRENT.get()
+    if trace is None:
+        return
+    for s in spans:
+        if (image is None or s.get('image') in (None, image)) and id(s) not in trace._attached:
+            trace._attached.add(id(s))
+            trace.spans.append(s)
+
+
+def breakdown(trace: Trace) -> Dict[str, Any]:
+    """요청 trace의 단계별 합계와 span 목록 (ms, start_ms는 요청 시작 기준)"""
+    stages: Dict[str, Dict[str, Any]] = {}
+    for s in trace.spans:
+        stage = stages.setdefault(s['name'], {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        stage['count'] += 1
+        stage['total_ms'] += s['duration'] * 1000
+        stage['max_ms'] = max(stage['max_ms'], s['duration'] * 1000)
+    for stage in stages.values():
+        stage['total_ms'] = round(stage['total_ms'], 2)
+        stage['max_ms'] = round(stage['max_ms'], 2)
+    spans = [
+        {**{k: v for k, v in s.items() if k not in ('start', 'duration')},
+         'start_ms': round((s['start'] - trace.started) * 1000, 2),
+         'duration_ms': round(s['duration'] * 1000, 2)}
+        for s in sorted(trace.spans, key=lambda s: s['start'])
+    ]
+    return {'total_ms': round((time.time() - trace.started) * 1000, 2), 'stages': stages, 'spans': spans}
+
+
+def server_timing(timing: Dict[str, Any]) -> str:
+    """breakdown 결과를 Server-Timing 헤더 값으로 (단계별 합계)"""
+    return ", ".join(
+        [f"{name};dur={stage['total_ms']}" for name, stage in timing['stages'].items()]
+        + [f"total;dur={timing['total_ms']}"]
+    )
+
+
+def render_metrics() -> str:
+    """Prometheus 텍스트 노출 형식"""
+    return STAGE_SECONDS.exposition()
@@ -1,13 +1,18 @@
 # FAST API 진입점, router 등록
+import logging
 from fastapi import FastAPI, Depends
+from fastapi.responses import JSONResponse, PlainTextResponse
 import uvicorn
 import datetime
 from .config import settings
+from .core import tracing
+from .core.logger import sampled
 from .api.routes import router
 from .services.analyze_service import AnalyzeService
 
-if settings.DEBUG:
-    print(f"[MAIN] Initailizing {settings.API_TITLE} v{settings.API_VERSION}")
+logger = logging.getLogger(__name__)
+
+logger.info("[MAIN] Initailizing %s v%s", settings.API_TITLE, settings.API_VERSION)
 
 app = FastAPI(
     title=settings.API_TITLE,
@@ -17,11 +22,16 @@ app = FastAPI(
 # 서버 시작 시 모델 로드
 @app.on_event("startup")
 async def startup_event():
-    if settings.DEBUG:
-        print("[MAIN] Loading models on startup...")
+    logger.info("[MAIN] Loading models on startup...")
     app.state.analyze_service = AnalyzeService()
-    if settings.DEBUG:
-        print("[MAIN] Models loaded successfully")
+    await app.state.analyze_service.start()
+    logger.info("[MAIN] Models loaded successfully")
+
+# 서버 종료 시 HTTP 세션/워커 풀 정리
+@app.on_event("shutdown")
+async def shutdown_event():
+    await app.state.analyze_service.close()
+    logger.info("[MAIN] Analyze service closed")
 
 # AnalyzeService 의존성 주입
 def get_analyze_service() -> AnalyzeService:
@@ -34,10 +44,25 @@ app.include_router(router, dependencies=[Depends(get_analyze_service)])
 @app.get("/health")
 async def health_check():
     """애플리케이션 상태 확인 엔드포인트"""
-    if settings.DEBUG:
-        print(f"[HEALTH] Health check called at {datetime.datetime.now()}")
+    logger.debug("[HEALTH] Health check called at %s", datetime.datetime.now(), extra=sampled())
     return {"status": "healty", "version": settings.API_VERSION}
 
+# 준비 상태 확인 엔드포인트 (로드밸런서/쿠버네티스 readiness probe용)
+@app.get("/ready")
+async def readiness_check():
+    """모든 분석 워커의 워밍업이 끝나기 전까지 503 반환"""
+    analyze_service = getattr(app.state, "analyze_service", None)
+    status = analyze_service.readiness() if analyze_service is not None else {"ready": False}
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content={"status": "warming", **status})
+    return {"status": "ready", "version": settings.API_VERSION, **status}
+
+# Prometheus 지표 엔드포인트 (잔반 분석 단계별 소요 시간 히스토그램)
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus 텍스트 형식 지표 (baberang_analyze_stage_seconds{stage=...})"""
+    return PlainTextResponse(tracing.render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # 메인 실행함수
 if __name__ == "__main__":
     import uvicorn
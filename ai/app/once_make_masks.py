@@ -1,4 +1,22 @@
-import cv2, os
+# once_make_masks.py – 빈 식판 이미지로 키오스크별 슬롯 ROI 번들 생성 (키오스크 설치 시 한 번 실행)
+# ---------------------------------------------------------------
+# tray_empty.jpg(빈 식판 ROI, 흰색 = 식판 칸 안쪽)를 슬롯 crop 좌표로 잘라
+#   masks/mask_<A~E>.jpg             : 기존 슬롯 마스크 이미지
+#   <out>/<kiosk>/<slot_name>.npz     : 유효 픽셀 ROI + 빈 식판 마스크 (+ 빈 식판 깊이 맵)
+# 를 만듭니다. 서버는 TRAY_ROI_DIR=<out> 으로 설정하면 요청의 kioskId 번들을 워커마다 한 번 로드합니다.
+# --empty-depth 는 같은 카메라로 찍은 빈 식판 전체의 정규화 깊이 맵(.npy, --backend 로 추정)입니다.
+#
+# Usage example (ai/ 폴더에서 실행)
+#   python -m app.once_make_masks --kiosk kiosk-01 --empty-depth depth_map_empty.npy --out ./tray_roi
+# ---------------------------------------------------------------
+import argparse
+import os
+
+import cv2
+import numpy as np
+
+from .services.tray_roi import save_slot_roi
+
 boxes = {           # 라즈베리파이 crop 좌표(px)
     'A':[100,50,380,290],
     'B':[400,50,780,290],
@@ -6,9 +24,49 @@ boxes = {           # 라즈베리파이 crop 좌표(px)
     'D':[50,300,580,780],
     'E':[600,300,1170,780],
 }
-os.makedirs('masks', exist_ok=True)
-mask_full = cv2.imread('tray_empty.jpg', 0)        # 빈 식판 ROI
-for k,(x1,y1,x2,y2) in boxes.items():
-    sub = mask_full[y1:y2, x1:x2][2:-2, 2:-2]          # 2 px 안쪽으로
-    cv2.imwrite(f'masks/mask_{k}.jpg', sub)
-print('✔  masks/ 폴더 생성 완료')
+# crop 영역별 슬롯 이름 (TRAY_SLOTS 키)
+box_slots = {'A': 'side1', 'B': 'side2', 'C': 'main', 'D': 'rice', 'E': 'soup'}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="빈 식판 이미지로 키오스크별 슬롯 ROI 번들 생성",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--tray-empty", type=str, default="tray_empty.jpg", help="빈 식판 ROI 이미지")
+    parser.add_argument("--kiosk", type=str, default="default", help="키오스크(카메라) ID")
+    parser.add_argument("--out", type=str, default="tray_roi", help="번들 폴더 (TRAY_ROI_DIR)")
+    parser.add_argument("--empty-depth", type=str, default=None, help="빈 식판 깊이 맵 .npy (선택)")
+    parser.add_argument("--backend", type=str, default="DPT_Large", help="빈 식판 깊이 맵을 추정한 깊이 백엔드")
+    parser.add_argument("--margin", type=int, default=2, help="칸 벽에서 안쪽으로 제외할 px")
+    parser.add_argument("--threshold", type=int, default=127, help="ROI로 볼 최소 밝기")
+    args = parser.parse_args()
+
+    mask_full = cv2.imread(args.tray_empty, 0)        # 빈 식판 ROI
+    if mask_full is None:
+        raise SystemExit(f"빈 식판 이미지를 읽을 수 없습니다: {args.tray_empty}")
+    depth_full = None
+    if args.empty_depth:
+        depth_full = np.load(args.empty_depth).astype(np.float32)
+        if depth_full.shape != mask_full.shape:
+            depth_full = cv2.resize(depth_full, mask_full.shape[::-1], interpolation=cv2.INTER_LINEAR)
+
+    os.makedirs('masks', exist_ok=True)
+    m = args.margin
+    for k, (x1, y1, x2, y2) in boxes.items():
+        sub = mask_full[y1:y2, x1:x2][m:-m or None, m:-m or None]          # margin px 안쪽으로
+        cv2.imwrite(f'masks/mask_{k}.jpg', sub)
+
+        # 유효 픽셀 ROI: 칸 안쪽(밝은 영역)을 margin만큼 더 침식해 벽/테두리 제외
+        roi = sub > args.threshold
+        if m > 0:
+            roi = cv2.erode(roi.astype(np.uint8), np.ones((2 * m + 1, 2 * m + 1), np.uint8)) > 0
+        depth = depth_full[y1:y2, x1:x2][m:-m or None, m:-m or None] if depth_full is not None else None
+        path = os.path.join(args.out, args.kiosk, f"{box_slots[k]}.npz")
+        save_slot_roi(path, roi, empty_mask=sub, empty_depth=depth, depth_backend=args.backend)
+        print(f"  {k} → {path}  ROI {roi.mean() * 100:.1f}%")
+    print(f'✔  masks/ 폴더 및 {os.path.join(args.out, args.kiosk)} 번들 생성 완료')
+
+
+if __name__ == "__main__":
+    main()
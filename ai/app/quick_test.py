@@ -21,6 +21,7 @@ from services.custom_model import (
     analyze_food_image_custom,
     load_resnet_model,
     load_midas_model,
+    seed_everything,
 )
 
 
@@ -38,6 +39,7 @@ def main():
     parser.add_argument("--no-midas", action="store_true", help="Disable MiDaS depth estimation for speed")
 
     args = parser.parse_args()
+    seed_everything()
 
     # ------------------------------------------------------------------
     # model loading (one‑time)
@@ -1,27 +1,39 @@
+import logging
 import time
-from typing import Dict, Any, List
-import aiohttp
-import random
-import boto3
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple, Union
 import os
+import shutil
 import asyncio
-from concurrent.futures import ProcessPoolExecutor
+import functools
+import hashlib
+import json
+from concurrent.futures import Executor, ThreadPoolExecutor
 from ..config import settings
-import requests
+from ..core import tracing
+from ..core.logger import sampled
 import cv2
 import numpy as np
-from .custom_model import analyze_food_image_custom, load_resnet_model, load_midas_model, preprocess_image_for_midas
+from .custom_model import (
+    analyze_food_image_custom, analyze_food_images_batch,
+    backproj_stages, model_stages, fuse_stages, extract_slot_name,
+    load_resnet_model, load_midas_model,
+    load_depth_backend_selection, seed_everything, CALIBRATION, TRAY_SLOTS
+)
+from .quantize_models import QUANTIZE_MODES, ensure_quantized_model, resnet_input, make_midas_input
+from .reference_store import ReferenceStore, ReferenceKey
+from .shm_transport import share_jobs, attached_jobs, ensure_resource_tracker
+from .http_client import ImageHttpClient
+from .image_cache import ImageCache
+from .result_store import ResultStore
+from .tray_roi import TrayRoiRegistry
+from .inference_scheduler import InferenceScheduler
+from .worker_pool import ResizableProcessPool, available_cpus, plan_pool
+from .stage_executor import StageExecutor
 import torch
-import onnx
 import onnxruntime as ort
 from torch.onnx import export
 
-# RNG 시드 고정
-SEED = 42
-random.seed(SEED)         # 파이썬 표준 RNG
-np.random.seed(SEED)      # NumPy RNG
-torch.manual_seed(SEED)   # PyTorch
-cv2.setRNGSeed(SEED)      # OpenCV RNG
+logger = logging.getLogger(__name__)
 
 # 전역 모델 레퍼런스
 _WORKER_RESNET = None
@@ -29,39 +41,148 @@ _WORKER_MIDAS = None
 _WORKER_TRANSFORM = None
 _WORKER_RESNET_SESSION = None
 _WORKER_MIDAS_SESSION = None
+_WORKER_DEPTH_MODELS = {}
+_WORKER_SLOT_BACKENDS = {}
+_WORKER_TRAY_ROIS = None
+_WORKER_INTRA_OP_THREADS = 1
+_WORKER_STARTUP = {}   # 워커 기동 단계별 소요 시간(초)
+_WORKER_WARM = False
 
-def convert_to_onnx(model, dummy_input, output_path):
+def convert_to_onnx(model, dummy_input, output_path, opset_version=12):
     """PyTorch 모델을 ONNX 형식으로 변환"""
+    # 여러 워커가 동시에 변환할 수 있으므로 임시 디렉토리에 같은 파일명으로 쓴 뒤 교체
+    # (external data 파일이 있으면 모델 파일명 기준으로 참조되므로 파일명은 유지)
+    tmp_dir = f"{output_path}.{os.getpid()}.tmp"
+    tmp_path = os.path.join(tmp_dir, os.path.basename(output_path))
     try:
+        os.makedirs(tmp_dir, exist_ok=True)
         export(
             model,
             dummy_input,
-            output_path,
+            tmp_path,
             export_params=True,
-            opset_version=12,
+            opset_version=opset_version,
             do_constant_folding=True,
             input_names=['input'],
             output_names=['output'],
             dynamic_axes={'input': {0: 'batch_size'},
                          'output': {0: 'batch_size'}}
         )
+        # 모델 파일은 마지막에 교체하여 다른 워커가 불완전한 파일을 읽지 않도록 함
+        for name in sorted(os.listdir(tmp_dir), key=lambda n: n == os.path.basename(output_path)):
+            os.replace(os.path.join(tmp_dir, name), os.path.join(os.path.dirname(output_path), name))
         return True
     except Exception as e:
-        print(f"ONNX 변환 실패: {e}")
+        logger.error("ONNX 변환 실패: %s", e)
         return False
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
 
-def _init_worker(models_path: str):
+def create_ort_session(onnx_path: str, intra_op_threads: Optional[int] = None) -> ort.InferenceSession:
+    """그래프 최적화를 켠 ONNX Runtime CPU 세션 생성 (스레드 수 미지정 시 워커 스레드 예산)"""
+    sess_options = ort.SessionOptions()
+    sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    # 워커당 스레드 예산만큼 연산자 내부 병렬화 (torch.set_num_threads와 동일), 연산자 간은 순차
+    sess_options.intra_op_num_threads = intra_op_threads or _WORKER_INTRA_OP_THREADS
+    sess_options.inter_op_num_threads = 1
+    return ort.InferenceSession(
+        onnx_path,
+        sess_options=sess_options,
+        providers=['CPUExecutionProvider']
+    )
+
+def _load_depth_backend(backend: str, onnx_dir: str):
+    """깊이 백엔드 로드 (ONNX 변환/양자화 후 세션 반환, 실패 시 PyTorch 모델)"""
+    midas_onnx_path = os.path.join(onnx_dir, f'midas_{backend.lower()}.onnx')
+
+    # MiDaS 모델 로드 및 ONNX 변환 (preprocess_image_for_midas와 같은 256x256 고정 입력)
+    midas_model, midas_transform = load_midas_model(device="cpu", backend=backend)
+    if settings.USE_MIDAS_ONNX and midas_model is not None and not os.path.exists(midas_onnx_path):
+        dummy_input = torch.randn(1, 3, 256, 256)
+        if convert_to_onnx(midas_model, dummy_input, midas_onnx_path, opset_version=14):
+            logger.info("MiDaS %s ONNX 변환 성공", backend)
+
+    # INT8 양자화 모드 (QUANTIZE_MODE가 none이면 FP32 경로 그대로 사용)
+    if settings.USE_MIDAS_ONNX and midas_transform is not None:
+        midas_onnx_path = ensure_quantized_model(
+            midas_onnx_path, settings.QUANTIZE_MODE, settings.QUANTIZE_CALIBRATION_DIR,
+            make_midas_input(midas_transform)
+        )
+
+    if settings.USE_MIDAS_ONNX and os.path.exists(midas_onnx_path):
+        # PyTorch 가중치는 더 이상 필요 없으므로 메모리에서 해제
+        del midas_model
+        return create_ort_session(midas_onnx_path), midas_transform
+    return midas_model, midas_transform
+
+def configure_calibration(backends) -> Dict[str, Dict[str, Any]]:
+    """설정 경로로 캘리브레이션 레지스트리를 구성하고 사용할 백엔드를 검증 (경고는 항상 출력)"""
+    CALIBRATION.configure(
+        settings.CALIBRATION_DIR,
+        settings.CALIBRATION_SLOTS_FILE,
+        strict=settings.CALIBRATION_STRICT,
+    )
+    summary = CALIBRATION.validate(sorted(backends))
+    for backend, info in summary.items():
+        for warning in info['warnings']:
+            logger.warning("[CALIBRATION] %s: %s", backend, warning)
+    return summary
+
+# 분석 결과를 바꾸는 설정 (결과 저장소 모델 버전 계산에 포함)
+ANALYSIS_SETTINGS = (
+    'USE_MIDAS_ONNX', 'DEPTH_BACKEND', 'DEPTH_BACKEND_SELECTION', 'QUANTIZE_MODE', 'DECODE_REDUCTION',
+    'BACKPROJ_MAX_SIDE', 'DEPTH_NATIVE_RESOLUTION', 'TRAY_ROI_DIR', 'TRAY_ROI_DEFAULT_KIOSK',
+)
+
+def analysis_version(weights_path: str, backends) -> str:
+    """
+    결과 저장소 키에 들어가는 모델 버전
+    RESULT_STORE_MODEL_VERSION이 있으면 그 값, 없으면 가중치 파일/분석 설정/캘리브레이션 파일 mtime/
+    키오스크별 ROI 번들 파일(크기, mtime)의 해시 (once_make_masks로 번들을 다시 만들면 이전 결과는 조회되지 않음)
+    """
+    if settings.RESULT_STORE_MODEL_VERSION:
+        return settings.RESULT_STORE_MODEL_VERSION
+    try:
+        st = os.stat(weights_path)
+        weights = [os.path.basename(weights_path), st.st_size, st.st_mtime_ns]
+    except OSError:
+        weights = None
+    fingerprint = json.dumps({
+        'weights': weights,
+        'settings': {name: getattr(settings, name) for name in ANALYSIS_SETTINGS},
+        'calibration': CALIBRATION.fingerprint(sorted(backends)),
+        'tray_rois': TrayRoiRegistry(settings.TRAY_ROI_DIR).fingerprint(),
+    }, sort_keys=True, default=str)
+    return "auto-" + hashlib.blake2b(fingerprint.encode("utf-8"), digest_size=8).hexdigest()
+
+def _init_worker(models_path: str, intra_op_threads: int = 1):
     """
     프로세스 풀 워커가 처음 기동될 때 한 번만 호출됩니다.
     여기서 모델을 로드해 이후 분석 호출 지연을 제거합니다.
+    intra_op_threads: 워커당 연산 스레드 수 (워커 수 x 스레드 수가 코어 예산을 넘지 않도록 plan_pool이 결정)
     """
     global _WORKER_RESNET, _WORKER_MIDAS, _WORKER_TRANSFORM
     global _WORKER_RESNET_SESSION, _WORKER_MIDAS_SESSION
+    global _WORKER_DEPTH_MODELS, _WORKER_SLOT_BACKENDS, _WORKER_TRAY_ROIS, _WORKER_INTRA_OP_THREADS
+    global _WORKER_STARTUP
+
+    # 콜드 스타트 단계별 소요 시간 (워밍업 로그에 사용)
+    started = checkpoint = time.perf_counter()
+
+    def mark(step):
+        nonlocal checkpoint
+        now = time.perf_counter()
+        _WORKER_STARTUP[step] = now - checkpoint
+        checkpoint = now
 
-    # OpenBLAS/MKL, PyTorch 스레드 제한
-    os.environ["OMP_NUM_THREADS"] = "1"
-    os.environ["MKL_NUM_THREADS"] = "1"
-    torch.set_num_threads(1)
+    # OpenBLAS/MKL, PyTorch, OpenCV, ONNX Runtime 스레드를 워커 예산으로 제한
+    _WORKER_INTRA_OP_THREADS = max(1, intra_op_threads)
+    os.environ["OMP_NUM_THREADS"] = str(_WORKER_INTRA_OP_THREADS)
+    os.environ["MKL_NUM_THREADS"] = str(_WORKER_INTRA_OP_THREADS)
+    torch.set_num_threads(_WORKER_INTRA_OP_THREADS)
+    cv2.setNumThreads(_WORKER_INTRA_OP_THREADS)
+    # RNG 시드는 워커 프로세스에서 한 번만 고정 (모듈 import 시 전역 RNG를 건드리지 않음)
+    seed_everything()
 
     # ONNX 모델 경로
     onnx_dir = os.path.join(os.path.dirname(models_path), 'onnx')
@@ -70,26 +191,77 @@ def _init_worker(models_path: str):
 
     # ResNet 모델 로드 및 ONNX 변환
     resnet_model = load_resnet_model(models_path, device="cpu")
+    mark('resnet_load')
     if not os.path.exists(resnet_onnx_path):
         dummy_input = torch.randn(1, 3, 224, 224)
         if convert_to_onnx(resnet_model, dummy_input, resnet_onnx_path):
-            print("ResNet ONNX 변환 성공")
-    
-    # MiDaS 모델 로드 (ONNX 변환 없이)
-    midas_model, midas_transform = load_midas_model(device="cpu")
+            logger.info("ResNet ONNX 변환 성공")
+
+    # INT8 양자화 모드 (QUANTIZE_MODE가 none이면 FP32 경로 그대로 사용)
+    resnet_onnx_path = ensure_quantized_model(
+        resnet_onnx_path, settings.QUANTIZE_MODE, settings.QUANTIZE_CALIBRATION_DIR, resnet_input
+    )
 
-    # ONNX Runtime 세션 생성 (ResNet만)
+    # ONNX Runtime 세션 생성 (실패 시 PyTorch 모델 사용)
     if os.path.exists(resnet_onnx_path):
-        _WORKER_RESNET_SESSION = ort.InferenceSession(
-            resnet_onnx_path,
-            providers=['CPUExecutionProvider']
-        )
+        _WORKER_RESNET_SESSION = create_ort_session(resnet_onnx_path)
     else:
         _WORKER_RESNET = resnet_model
+    mark('resnet_onnx')
+
+    # 깊이 백엔드 로드 (기본 백엔드 + 슬롯별 선택 결과에 포함된 백엔드)
+    _WORKER_SLOT_BACKENDS = load_depth_backend_selection(settings.DEPTH_BACKEND_SELECTION, settings.DEPTH_BACKEND)
+    backends = {settings.DEPTH_BACKEND, *_WORKER_SLOT_BACKENDS.values()}
+    _WORKER_DEPTH_MODELS = {}
+    for backend in sorted(backends):
+        _WORKER_DEPTH_MODELS[backend] = _load_depth_backend(backend, onnx_dir)
+        mark(f'depth:{backend}')
+
+    # 캘리브레이션 값은 워커마다 한 번 로드 (파일 변경 시 자동으로 다시 로드)
+    CALIBRATION.configure(settings.CALIBRATION_DIR, settings.CALIBRATION_SLOTS_FILE,
+                          strict=settings.CALIBRATION_STRICT)
+    CALIBRATION.validate(sorted(backends))
+    mark('calibration')
+
+    # 키오스크별 슬롯 ROI 번들 (키오스크마다 처음 요청될 때 한 번 로드)
+    _WORKER_TRAY_ROIS = TrayRoiRegistry(settings.TRAY_ROI_DIR, settings.TRAY_ROI_DEFAULT_KIOSK)
+
+    # 기본 백엔드는 기존 전역 레퍼런스에도 연결
+    midas_model, _WORKER_TRANSFORM = _WORKER_DEPTH_MODELS[settings.DEPTH_BACKEND]
+    if isinstance(midas_model, ort.InferenceSession):
+        _WORKER_MIDAS_SESSION = midas_model
+    else:
+        _WORKER_MIDAS = midas_model
+    _WORKER_STARTUP['total'] = time.perf_counter() - started
 
-    # MiDaS는 PyTorch 모델 그대로 사용
-    _WORKER_MIDAS = midas_model
-    _WORKER_TRANSFORM = midas_transform
+def _warmup_jobs(pixel_scale: float = 1.0) -> List[Tuple[np.ndarray, np.ndarray, str]]:
+    """워밍업용 합성 식판 이미지 (슬롯마다 한 장, 슬롯별 깊이 백엔드와 ROI 번들까지 모두 거치도록)"""
+    jobs = []
+    for slot_name, slot in TRAY_SLOTS.items():
+        h, w = max(32, int(slot['ny'] / pixel_scale)), max(32, int(slot['nx'] / pixel_scale))
+        img = np.full((h, w, 3), 200, np.uint8)
+        cv2.circle(img, (w // 2, h // 2), min(h, w) // 3, (40, 120, 180), -1)
+        jobs.append((img, crop_center(img), f"warmup_{slot_name}.jpg"))
+    return jobs
+
+def _warmup_worker(pixel_scale: float = 1.0, hold: float = 0.05) -> Dict[str, Any]:
+    """
+    워커 워밍업: 합성 식판 배치를 지연 생략 없이 두 번 분석해
+    역투영/ResNet/모든 깊이 백엔드의 첫 추론 비용(메모리 할당, 커널 선택)을 미리 치름
+    이미 워밍업된 워커는 hold초 뒤 바로 반환 (아직 기동 중인 다른 워커가 작업을 받도록)
+    """
+    global _WORKER_WARM
+    if _WORKER_WARM:
+        time.sleep(hold)
+        return {'pid': os.getpid(), 'warmup': None}
+    jobs = _warmup_jobs(pixel_scale)
+    timings = {}
+    for step in ('first_inference', 'steady_inference'):
+        start = time.perf_counter()
+        _analyze_batch_worker(jobs, lazy=False, pixel_scale=pixel_scale)
+        timings[step] = time.perf_counter() - start
+    _WORKER_WARM = True
+    return {'pid': os.getpid(), 'startup': dict(_WORKER_STARTUP), 'warmup': timings}
 
 def _analyze_worker(target_img, reference_img, image_name: str):
     """워커 프로세스에서 이미지 분석을 수행"""
@@ -97,234 +269,865 @@ def _analyze_worker(target_img, reference_img, image_name: str):
     resnet_model = _WORKER_RESNET_SESSION if _WORKER_RESNET_SESSION else _WORKER_RESNET
     midas_model = _WORKER_MIDAS_SESSION if _WORKER_MIDAS_SESSION else _WORKER_MIDAS
     
-    return analyze_food_image_custom(
-        target_image_path=target_img,
-        reference_image_path=reference_img,
-        resnet_model=resnet_model,
-        midas_model=midas_model,
-        midas_transform=_WORKER_TRANSFORM,
-        image_name=image_name,
-    )
+    # 공유 메모리 핸들이면 복사 없이 ndarray로 복원
+    with attached_jobs([(target_img, reference_img, image_name)]) as jobs:
+        return analyze_food_image_custom(
+            target_image_path=jobs[0][0],
+            reference_image_path=jobs[0][1],
+            resnet_model=resnet_model,
+            midas_model=midas_model,
+            midas_transform=_WORKER_TRANSFORM,
+            image_name=image_name,
+            depth_backend=settings.DEPTH_BACKEND,
+        )
+
+def _analyze_batch_worker(jobs: List[Tuple[np.ndarray, np.ndarray, str]], lazy: Union[bool, List[bool]] = False,
+                          pixel_scale: float = 1.0, kiosk_id: Optional[str] = None):
+    """워커 프로세스에서 여러 슬롯을 하나의 배치로 묶어 분석 (kiosk_id: 슬롯 ROI 번들 선택)"""
+    resnet_model = _WORKER_RESNET_SESSION if _WORKER_RESNET_SESSION else _WORKER_RESNET
+    midas_model = _WORKER_MIDAS_SESSION if _WORKER_MIDAS_SESSION else _WORKER_MIDAS
+
+    # 공유 메모리 핸들이면 복사 없이 ndarray로 복원
+    with attached_jobs(jobs) as jobs:
+        return analyze_food_images_batch(
+            jobs,
+            resnet_model=resnet_model,
+            midas_model=midas_model,
+            midas_transform=_WORKER_TRANSFORM,
+            depth_backend=settings.DEPTH_BACKEND,
+            depth_models=_WORKER_DEPTH_MODELS,
+            slot_backends=_WORKER_SLOT_BACKENDS,
+            lazy=lazy,
+            pixel_scale=pixel_scale,
+            backproj_max_side=settings.BACKPROJ_MAX_SIDE,
+            native_depth=settings.DEPTH_NATIVE_RESOLUTION,
+            slot_rois=_WORKER_TRAY_ROIS.get(kiosk_id) if _WORKER_TRAY_ROIS is not None else None,
+        )
+
+def _model_batch_worker(jobs: List[Tuple[np.ndarray, np.ndarray, str]], pixel_scale: float = 1.0,
+                        kiosk_id: Optional[str] = None):
+    """
+    워커 프로세스에서 신경망 단계(MiDaS/ResNet)만 배치로 실행 (역투영은 부모 프로세스 스레드 풀에서 완료)
+    jobs: (대상 이미지, 역투영 음식 마스크, image_name) 리스트
+    return: jobs와 같은 순서의 (깊이 결과, ResNet 결과) - 실행되지 않은 분기는 None, 깊이 맵/마스크는 돌려보내지 않음
+    """
+    resnet_model = _WORKER_RESNET_SESSION if _WORKER_RESNET_SESSION else _WORKER_RESNET
+    slot_rois = _WORKER_TRAY_ROIS.get(kiosk_id) if _WORKER_TRAY_ROIS is not None else {}
 
-# 메모리 캐시를 위한 딕셔너리
-reference_cache = {}
+    with attached_jobs(jobs) as jobs:
+        stages = []
+        for target_img, food_mask, image_name in jobs:
+            slot_name = extract_slot_name(image_name)
+            stages.append({'target_img': target_img, 'food_mask': food_mask, 'slot_name': slot_name,
+                           'slot_roi': slot_rois.get(slot_name), 'trace': {}, 'image_name': image_name})
+        depth_results, resnet_results = model_stages(
+            stages, resnet_model, _WORKER_DEPTH_MODELS,
+            depth_backend=settings.DEPTH_BACKEND,
+            slot_backends=_WORKER_SLOT_BACKENDS,
+            pixel_scale=pixel_scale,
+            native_depth=settings.DEPTH_NATIVE_RESOLUTION,
+        )
+    results = []
+    for i in range(len(stages)):
+        depth_result = depth_results.get(i)
+        if depth_result is not None:
+            _, midas_result, _, food_volume_cm3, z_plane, z_plane_source = depth_result
+            depth_result = (None, midas_result, None, food_volume_cm3, z_plane, z_plane_source)
+        results.append((depth_result, resnet_results.get(i)))
+    return results
+
+def _backproj_slot(image: np.ndarray, reference, image_name: str, lazy: bool, pixel_scale: float, slot_rois):
+    """
+    부모 프로세스 스레드 풀에서 역투영 단계 실행 (OpenCV는 GIL을 놓으므로 이벤트 루프를 막지 않음)
+    return: (stage, 결과) - 역투영만으로 확정되는 lazy 슬롯은 융합 결과까지, 아니면 결과 None
+    """
+    stage = backproj_stages([(image, reference, image_name)], pixel_scale, settings.BACKPROJ_MAX_SIDE,
+                            slot_rois, lazy)[0]
+    if stage is not None and stage['trace'].get('midas') == 'skipped':
+        return stage, fuse_stages([image_name], [stage], {}, {})[0]
+    return stage, None
+
+# 축소 디코딩 배율별 플래그 (JPEG은 libjpeg DCT 단계에서 축소되어 전체 해상도 디코딩을 생략)
+DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
 
-async def download_image_async(url: str, session: aiohttp.ClientSession) -> np.ndarray:
-    """비동기로 이미지 다운로드"""
+def decode_image(content: bytes, reduction: int = 1) -> np.ndarray:
+    """
+    JPEG/PNG 바이트를 BGR 이미지로 디코딩 (실패 시 None)
+    reduction: 1/2/4/8 축소 디코딩 (분석 결과의 픽셀 면적 보정에 같은 값을 pixel_scale로 전달)
+    """
+    with tracing.span('decode', reduction=reduction):
+        # numpy 배열로 변환
+        img_arr = np.frombuffer(content, dtype=np.uint8)
+        # 이미지 디코딩
+        return cv2.imdecode(img_arr, DECODE_FLAGS[reduction])
+
+def validate_settings():
+    """기동 시 설정값 검증 (요청마다 실패하는 대신 워커 기동 전에 잘못된 설정을 드러냄)"""
+    if settings.DECODE_REDUCTION not in DECODE_FLAGS:
+        raise ValueError(f"DECODE_REDUCTION은 {sorted(DECODE_FLAGS)} 중 하나여야 합니다: {settings.DECODE_REDUCTION}")
+    if settings.QUANTIZE_MODE not in QUANTIZE_MODES:
+        raise ValueError(f"QUANTIZE_MODE는 {list(QUANTIZE_MODES)} 중 하나여야 합니다: {settings.QUANTIZE_MODE!r}")
+
+async def download_image_async(url: str, client: ImageHttpClient, image_cache: ImageCache = None) -> np.ndarray:
+    """
+    비동기로 이미지 다운로드 (공유 HTTP 클라이언트의 커넥션 풀 사용, 일시적 오류는 재시도)
+    image_cache가 있으면 이미 받은 URL은 네트워크/디코딩 없이 캐시에서 반환 (읽기 전용 배열)
+    """
     start = time.time()
     try:
-        async with session.get(url) as response:
-            if response.status != 200:
-                raise Exception(f"이미지 다운로드 실패: HTTP {response.status}")
-            
+        if image_cache is not None:
+            img = await image_cache.get(url)
+        else:
             # 바이너리 데이터 읽기
-            content = await response.read()
-            
-            # numpy 배열로 변환
-            img_arr = np.frombuffer(content, dtype=np.uint8)
-            
-            # 이미지 디코딩
-            img = cv2.imdecode(img_arr, cv2.IMREAD_COLOR)
-            
-            if img is None:
-                raise Exception("이미지 디코딩 실패")
-            
-            elapsed = time.time() - start
-            if settings.DEBUG:
-                print(f"[TIMING] download_image_async: {elapsed:.3f}s for {url}")
-            return img
-            
+            content = await client.fetch(url)
+            img = decode_image(content, settings.DECODE_REDUCTION)
+        
+        if img is None:
+            raise Exception("이미지 디코딩 실패")
+        
+        elapsed = time.time() - start
+        logger.debug("[TIMING] download_image_async: %.3fs for %s", elapsed, url, extra=sampled())
+        return img
+        
+    except Exception as e:
+        logger.error("[ANALYZE] download_image_async failed for %s: %s", url, e)
+        raise Exception(f"이미지 다운로드 실패: {str(e)}")
+
+async def fetch_images(urls, image_cache: ImageCache) -> Dict[str, Tuple[np.ndarray, str]]:
+    """
+    URL별 (이미지, 내용 해시) - 결과 저장소 키는 URL이 아니라 이미지 내용으로 만듦
+    (키오스크는 같은 URL에 매 식사 이미지를 덮어씀)
+    """
+    urls = list(dict.fromkeys(urls))
+    try:
+        results = await asyncio.gather(*[image_cache.fetch(url) for url in urls])
     except Exception as e:
-        if settings.DEBUG:
-            print(f"[ERROR] download_image_async failed for {url}: {str(e)}")
+        logger.error("[ANALYZE] fetch_images failed: %s", e)
         raise Exception(f"이미지 다운로드 실패: {str(e)}")
+    return dict(zip(urls, results))
 
-def crop_center(img, crop_ratio=0.2, cache_key=None):
+def crop_center(img, crop_ratio=0.2):
     start = time.time()
+    started = tracing.start()
     h, w = img.shape[:2]
     ch, cw = int(h * crop_ratio), int(w * crop_ratio)
     startx = w//2 - cw//2
     starty = h//2 - ch//2
     cropped = img[starty:starty+ch, startx:startx+cw]
-    
-    if cache_key is not None:
-        reference_cache[cache_key] = cropped
+    tracing.end('crop', started)
         
     elapsed = time.time() - start
-    if settings.DEBUG:
-        print(f"[TIMING] crop_center: {elapsed:.3f}s")
+    logger.debug("[TIMING] crop_center: %.3fs", elapsed, extra=sampled())
     return cropped
 
-def preprocess_image_for_midas(img: np.ndarray) -> np.ndarray:
-    """MiDaS 모델을 위한 이미지 전처리"""
-    # 원본 이미지의 비율 유지하면서 크기 조정
-    h, w = img.shape[:2]
-    target_size = 384
-    
-    # 비율 계산
-    ratio = target_size / max(h, w)
-    new_h, new_w = int(h * ratio), int(w * ratio)
-    
-    # 이미지 리사이즈
-    img = cv2.resize(img, (new_w, new_h))
-    
-    # 패딩 추가하여 정사각형으로 만들기
-    square_img = np.zeros((target_size, target_size, 3), dtype=np.uint8)
-    y_offset = (target_size - new_h) // 2
-    x_offset = (target_size - new_w) // 2
-    square_img[y_offset:y_offset+new_h, x_offset:x_offset+new_w] = img
-    
-    return square_img
-
-def _analyze_with_reseed(*args, **kwargs):
-    """RNG 시드를 다시 고정하고 이미지 분석 수행"""
-    reseed_every_thread()
-    return analyze_food_image_custom(*args, **kwargs)
+def _share_jobs(jobs: List[Tuple[Any, Any, str]]):
+    """설정에 따라 작업 이미지를 공유 메모리로 옮김 (실패 시 기존 pickle 전달)"""
+    if not settings.USE_SHARED_MEMORY:
+        return None, jobs
+    try:
+        return share_jobs(jobs)
+    except OSError as e:
+        # /dev/shm 용량 부족 등
+        logger.warning("[ANALYZE] shared memory transfer unavailable, falling back to pickle: %s", e)
+        return None, jobs
 
 async def analyze_image_parallel(
     image: np.ndarray,
     reference: np.ndarray,
     image_name: str,
-    executor: ProcessPoolExecutor
+    executor: Executor
 ) -> Dict[str, Any]:
     """단일 이미지 분석을 비동기로 실행"""
     start = time.time()
     
-    # CPU 바운드 작업을 워커 프로세스에서 실행
+    # CPU 바운드 작업을 워커 프로세스에서 실행 (이미지는 공유 메모리 핸들로 전달)
     loop = asyncio.get_running_loop()
-    result = await loop.run_in_executor(
-        executor,
-        _analyze_worker,
-        image, reference, image_name
-    )
+    shared, ((image, reference, _),) = _share_jobs([(image, reference, image_name)])
+    try:
+        result = await loop.run_in_executor(
+            executor,
+            _analyze_worker,
+            image, reference, image_name
+        )
+    finally:
+        if shared is not None:
+            shared.close()
     
     elapsed = time.time() - start
-    if settings.DEBUG:
-        print(f"[TIMING] analyze_image_parallel for {image_name}: {elapsed:.3f}s")
+    logger.debug("[TIMING] analyze_image_parallel for %s: %.3fs", image_name, elapsed, extra=sampled())
     return result
 
-async def process_before_images_parallel(
-    before_images: Dict[str, str],
-    executor: ProcessPoolExecutor
-) -> Dict[str, Dict[str, Any]]:
-    """식전 이미지들을 병렬로 처리"""
-    async def download_and_crop(category: str, url: str) -> tuple[str, np.ndarray, np.ndarray]:
-        # 이미지 다운로드
-        img = await download_image_async(url, session)
-        # 중앙 crop
-        reference = crop_center(img, cache_key=f"reference_{category}")
-        return category, img, reference
-
-    # aiohttp 세션 생성
-    async with aiohttp.ClientSession() as session:
-        # 모든 이미지 다운로드 및 크롭을 병렬로 실행
-        download_tasks = [download_and_crop(category, url) for category, url in before_images.items()]
-        download_results = await asyncio.gather(*download_tasks)
-        
-        # 분석 태스크 생성 및 실행
-        analysis_tasks = []
-        for category, img, reference in download_results:
-            task = analyze_image_parallel(img, reference, before_images[category], executor)
-            analysis_tasks.append((category, task))
-        
-        # 분석 태스크를 병렬로 실행 (최대 3개씩)
-        results = {}
-        for i in range(0, len(analysis_tasks), 3):
-            batch = analysis_tasks[i:i+3]
-            batch_results = await asyncio.gather(*[task for _, task in batch])
-            for (category, _), result in zip(batch, batch_results):
-                results[category] = result
-        
-        return results
-
-async def process_after_images_parallel(
-    after_images: Dict[str, str],
-    before_results: Dict[str, Dict[str, Any]],
-    executor: ProcessPoolExecutor
-) -> Dict[str, Dict[str, Any]]:
-    """식후 이미지들을 병렬로 처리"""
-    async def download_and_get_reference(category: str, url: str) -> tuple[str, np.ndarray, np.ndarray]:
-        if category not in before_results:
-            return category, None, None
-            
-        # 이미지 다운로드
-        img = await download_image_async(url, session)
-        # 참조 이미지 가져오기
-        reference = reference_cache.get(f"reference_{category}")
-        if reference is None:
-            reference = crop_center(img, cache_key=f"reference_{category}")
-        return category, img, reference
-
-    # aiohttp 세션 생성
-    async with aiohttp.ClientSession() as session:
-        # 모든 이미지 다운로드 및 참조 이미지 가져오기를 병렬로 실행
-        download_tasks = [download_and_get_reference(category, url) for category, url in after_images.items()]
-        download_results = await asyncio.gather(*download_tasks)
-        
-        # 분석 태스크 생성 및 실행
-        analysis_tasks = []
-        for category, img, reference in download_results:
-            if img is not None and reference is not None:
-                task = analyze_image_parallel(img, reference, after_images[category], executor)
-                analysis_tasks.append((category, task))
-            else:
-                analysis_tasks.append((category, None))
-        
-        # 분석 태스크를 병렬로 실행 (최대 3개씩)
-        results = {}
-        for i in range(0, len(analysis_tasks), 3):
-            batch = analysis_tasks[i:i+3]
-            batch_results = await asyncio.gather(*[task if task is not None else None for _, task in batch])
-            for (category, _), result in zip(batch, batch_results):
-                results[category] = result
-        
-        return results
+async def analyze_images_batch(
+    jobs: List[Tuple[np.ndarray, np.ndarray, str]],
+    executor: Executor,
+    lazy: Union[bool, List[bool]] = False,
+    pixel_scale: float = 1.0,
+    kiosk_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    여러 슬롯 이미지를 하나의 배치 추론으로 비동기 실행
+    lazy=True이면 역투영만으로 결과가 확정되는 슬롯의 MiDaS/ResNet 추론을 생략 (job별 bool 리스트도 가능)
+    pixel_scale: 이미지의 업로드 해상도 대비 축소 배율 (decode_image의 reduction)
+    kiosk_id: 촬영 키오스크 ID (워커가 해당 키오스크의 슬롯 ROI 번들 사용)
+    """
+    start = time.time()
+
+    # 모든 슬롯을 한 번의 워커 호출로 전달 (ResNet/MiDaS 단일 forward pass)
+    # 이미지는 공유 메모리에 한 번 복사하고 워커에는 핸들만 전달
+    # 워커 안에서 기록한 단계별 span은 결과와 함께 돌려받아 집계하고 현재 요청 trace에 추가
+    loop = asyncio.get_running_loop()
+    shared, jobs = _share_jobs(jobs)
+    try:
+        results, spans = await loop.run_in_executor(
+            executor,
+            tracing.call_traced,
+            _analyze_batch_worker,
+            jobs, lazy, pixel_scale, kiosk_id
+        )
+    finally:
+        # 워커가 끝난 뒤(취소 포함) 세그먼트 해제
+        if shared is not None:
+            shared.close()
+    tracing.observe(spans)
+    tracing.attach(spans)
+
+    elapsed = time.time() - start
+    logger.debug("[TIMING] analyze_images_batch for %s slots: %.3fs", len(jobs), elapsed, extra=sampled())
+    return results
+
+class SlotStages(NamedTuple):
+    """단계별 실행기 (역투영: 부모 프로세스 스레드 풀, 신경망: 모델 프로세스 풀)"""
+    cv: StageExecutor
+    model: StageExecutor
+    tray_rois: TrayRoiRegistry
+
+async def run_model_batch(
+    model_stage: StageExecutor,
+    key: Tuple[Optional[str], int],
+    jobs: List[Tuple[np.ndarray, np.ndarray, str]],
+    options: Optional[List[Any]] = None
+) -> List[Tuple[Tuple[Any, Any], List[Dict[str, Any]]]]:
+    """
+    신경망 단계 실행: 여러 슬롯의 MiDaS/ResNet을 한 번의 워커 호출로 (마이크로 배치 run_batch로도 사용)
+    return: job별 ((깊이 결과, ResNet 결과), 워커 span) - span은 배치 전체 것이므로 받는 쪽에서 이미지별로 거름
+    """
+    kiosk_id, pixel_scale = key
+    shared, jobs = _share_jobs(jobs)
+    try:
+        results, spans = await model_stage.run(tracing.call_traced, _model_batch_worker, jobs, pixel_scale, kiosk_id)
+    finally:
+        if shared is not None:
+            shared.close()
+    tracing.observe(spans)
+    return [(result, spans) for result in results]
+
+async def analyze_slot_staged(
+    image: np.ndarray,
+    reference,
+    image_name: str,
+    stages: SlotStages,
+    lazy: bool = False,
+    kiosk_id: Optional[str] = None,
+    scheduler: Optional[InferenceScheduler] = None
+) -> Dict[str, Any]:
+    """
+    슬롯 하나를 단계별로 분석
+    - 역투영은 스레드 풀에서 바로 실행 (신경망 워커가 바쁠 때도 대기하지 않음)
+    - 역투영만으로 확정되는 lazy 슬롯은 신경망 단계 없이 반환
+    - 나머지는 대상 이미지와 음식 마스크만 모델 프로세스 풀로 전달 (scheduler가 있으면 마이크로 배치)
+    """
+    pixel_scale = settings.DECODE_REDUCTION
+    (stage, result), spans = await stages.cv.run(tracing.call_traced, _backproj_slot, image, reference, image_name,
+                                                 lazy, pixel_scale, stages.tray_rois.get(kiosk_id))
+    tracing.observe(spans)
+    tracing.attach(spans)
+    if stage is None or result is not None:
+        return result
+    job = (stage['target_img'], stage['food_mask'], image_name)
+    # inference: 모델 풀 대기(마이크로 배치 창 포함) + 전송 + 워커 실행
+    with tracing.span('inference', image=image_name, slot=stage['slot_name']):
+        if scheduler is not None:
+            (depth_result, resnet_result), spans = await scheduler.submit(job, key=(kiosk_id, pixel_scale))
+        else:
+            ((depth_result, resnet_result), spans), = await run_model_batch(stages.model, (kiosk_id, pixel_scale),
+                                                                             [job])
+    tracing.attach(spans, image=image_name)
+    return fuse_stages(
+        [image_name], [stage],
+        {0: depth_result} if depth_result is not None else {},
+        {0: resnet_result} if resnet_result is not None else {},
+    )[0]
+
+async def analyze_slot(
+    image: np.ndarray,
+    reference,
+    image_name: str,
+    executor: Executor,
+    semaphore: asyncio.Semaphore,
+    lazy: bool = False,
+    kiosk_id: Optional[str] = None,
+    scheduler: Optional[InferenceScheduler] = None,
+    stages: Optional[SlotStages] = None
+) -> Dict[str, Any]:
+    """
+    슬롯 하나를 워커에서 분석 (동시 실행 수는 워커 풀 크기의 세마포어로 제한)
+    scheduler가 있으면 다른 요청의 슬롯과 마이크로 배치로 묶어 실행 (동시 실행 수는 스케줄러가 제한)
+    stages가 있으면 역투영/신경망 단계를 각자의 실행기로 나눠 실행
+    """
+    if stages is not None:
+        return await analyze_slot_staged(image, reference, image_name, stages, lazy, kiosk_id, scheduler)
+    # inference: 워커 대기(마이크로 배치 창 포함) + 전송 + 워커 실행
+    with tracing.span('inference', image=image_name):
+        if scheduler is not None:
+            result, spans = await scheduler.submit((image, reference, image_name), option=lazy,
+                                                   key=(kiosk_id, settings.DECODE_REDUCTION))
+            tracing.attach(spans, image=image_name)
+            return result
+        async with semaphore:
+            # 다운로드 이미지는 DECODE_REDUCTION 배율로 축소 디코딩되어 있음
+            results = await analyze_images_batch([(image, reference, image_name)], executor, lazy=lazy,
+                                                 pixel_scale=settings.DECODE_REDUCTION, kiosk_id=kiosk_id)
+        return results[0]
+
+async def process_slot_pipeline(
+    category: str,
+    before_url: str,
+    after_url: str,
+    executor: Executor,
+    semaphore: asyncio.Semaphore,
+    image_cache: ImageCache,
+    reference_store: ReferenceStore,
+    reference_key: ReferenceKey,
+    kiosk_id: Optional[str] = None,
+    scheduler: Optional[InferenceScheduler] = None,
+    stages: Optional[SlotStages] = None,
+    before_result: Optional[Dict[str, Any]] = None,
+    images: Optional[Dict[str, np.ndarray]] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    슬롯 하나의 식전 → 식후 분석 체인
+    - 식전/식후 이미지를 동시에 다운로드
+    - 참조 crop이 준비되는 즉시 식전 분석과 식후 분석을 각각 시작 (다른 슬롯을 기다리지 않음)
+    - 식후 분석 시점에 식전 워커가 만든 역투영 참조 모델이 있으면 crop 대신 모델 전달
+    - before_result(결과 저장소의 식전 요약)가 있으면 식전 분석은 생략하고 참조 crop만 만듦
+    - images(URL → 이미 받은 이미지)에 있는 URL은 다시 받지 않음
+    return: (식전 결과, 식후 결과) - 식후 이미지가 없으면 식후 결과는 None
+    """
+    if before_result is not None and not after_url:
+        return before_result, None
+    start = time.time()
+
+    async def download(url: str) -> np.ndarray:
+        if images is not None and url in images:
+            return images[url]
+        return await download_image_async(url, image_cache.client, image_cache)
+
+    before_download = asyncio.ensure_future(download(before_url))
+    after_download = asyncio.ensure_future(download(after_url)) if after_url else None
+    tasks = [before_download] + ([after_download] if after_download else [])
+
+    async def run_before(img: np.ndarray, reference: np.ndarray) -> Dict[str, Any]:
+        result = await analyze_slot(img, reference, before_url, executor, semaphore, kiosk_id=kiosk_id,
+                                    scheduler=scheduler, stages=stages)
+        # 워커가 만든 역투영 참조 모델을 저장소에 연결
+        if result is not None:
+            reference_store.attach_model(reference_key, result.pop('reference_model', None))
+        return result
+
+    async def run_after(reference: np.ndarray) -> Dict[str, Any]:
+        img = await after_download
+        # 식전 분석이 먼저 끝났으면 참조 모델, 아니면 참조 crop
+        handoff = reference_store.handoff(reference_key)
+        # 식후 역투영 점수가 20% 이하이면 잔반율은 역투영만으로 결정되므로 신경망 추론 생략
+        result = await analyze_slot(img, handoff if handoff is not None else reference, after_url,
+                                    executor, semaphore, lazy=True, kiosk_id=kiosk_id, scheduler=scheduler,
+                                    stages=stages)
+        if result is not None:
+            result.pop('reference_model', None)
+        return result
+
+    try:
+        img = await before_download
+        # 중앙 crop 후 참조 저장소에 저장 (원본 이미지와 분리된 복사본)
+        reference = reference_store.put(reference_key, crop_center(img))
+        chains = [asyncio.ensure_future(run_before(img, reference))] if before_result is None else []
+        if after_download is not None:
+            chains.append(asyncio.ensure_future(run_after(reference)))
+        tasks += chains
+        del img
+        results = await asyncio.gather(*chains)
+        if before_result is not None:
+            results.insert(0, before_result)
+    finally:
+        # 한 분기가 실패하면 나머지 다운로드/분석도 취소
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+    elapsed = time.time() - start
+    logger.debug("[TIMING] process_slot_pipeline for %s: %.3fs", category, elapsed, extra=sampled())
+    return results[0], results[1] if after_download is not None else None
+
+async def run_scheduled_batch(
+    executor: Executor,
+    key: Tuple[Optional[str], int],
+    jobs: List[Tuple[np.ndarray, Any, str]],
+    lazy: List[bool]
+) -> List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """
+    마이크로 배치 실행: 여러 요청의 슬롯을 한 번의 워커 호출(ResNet/MiDaS 단일 forward pass)로 분석
+    return: job별 (결과, 워커 span) - span은 배치 전체 것이므로 받는 쪽에서 이미지별로 거름
+    """
+    kiosk_id, pixel_scale = key
+    with tracing.collect(observe=False) as trace:
+        results = await analyze_images_batch(jobs, executor, lazy=lazy, pixel_scale=pixel_scale, kiosk_id=kiosk_id)
+    return [(result, trace.spans) for result in results]
+
+def slot_summary(result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """compute_leftover_rate에 필요한 값만 남긴 슬롯 결과 (결과 저장소에 JSON으로 저장)"""
+    if result is None:
+        return None
+    resnet_result = result['resnet_result']
+    return {
+        'backproj_percentage': float(result['backproj_percentage']),
+        'food_volume_cm3': float(result['food_volume_cm3']),
+        'resnet_result': [str(resnet_result[0]), float(resnet_result[1]), float(resnet_result[2])]
+        if resnet_result else None,
+        'trace': dict(result['trace']),
+    }
+
+def final_leftover_rate(rates: Dict[str, float]) -> float:
+    """compute_leftover_rate의 rates를 API 응답 leftoverRate 값으로 변환"""
+    return round(100 - rates['final'], 2)
+
+def compute_leftover_rate(before_result: Dict[str, Any], after_result: Dict[str, Any]):
+    """
+    슬롯 하나의 식전/식후 분석 결과로 잔반율 계산
+    return: (식전 양, 식후 양, 잔반율) 딕셔너리
+    """
+    # 각 모델별 결과 추출
+    before_backproj = before_result['backproj_percentage'] if before_result else 0.0
+    after_backproj = after_result['backproj_percentage'] if after_result else 0.0
+    before_volume = before_result['food_volume_cm3'] if before_result else 0.0
+    after_volume = after_result['food_volume_cm3'] if after_result else 0.0
+    # 추론을 생략한 분기(resnet_result None)는 가중치가 0이므로 0.0으로 처리
+    before_resnet = before_result['resnet_result'][2] if before_result and before_result['resnet_result'] else 0.0
+    after_resnet = after_result['resnet_result'][2] if after_result and after_result['resnet_result'] else 0.0
+
+    # before/after 딕셔너리 저장
+    before_amount = {
+        'backproj': float(round(before_backproj, 1)),
+        'food_volume_cm3': float(round(before_volume, 2)),
+        'resnet': float(round(before_resnet, 1))
+    }
+    after_amount = {
+        'backproj': float(round(after_backproj, 1)),
+        'food_volume_cm3': float(round(after_volume, 2)),
+        'resnet': float(round(after_resnet, 1))
+    }
+
+    # leftover 계산
+    if before_backproj > 0:
+        leftover_backproj = max(0, (before_backproj - after_backproj) / before_backproj * 100)
+    else:
+        leftover_backproj = 0.0
+    if before_resnet > 0:
+        leftover_resnet = max(0, (before_resnet - after_resnet) / before_resnet * 100)
+    else:
+        leftover_resnet = 0.0
+    if before_volume > 0:
+        leftover_volume_pct = max(0, (before_volume - after_volume) / before_volume * 100)
+    else:
+        leftover_volume_pct = 0.0
+
+    # 가중치 적용
+    if after_backproj <= 20:
+        w_backproj, w_volume, w_resnet = 1.0, 0.0, 0.0
+    elif leftover_resnet == 0.0:
+        w_backproj, w_volume, w_resnet = 0.5, 0.5, 0.0
+    else:
+        w_backproj, w_volume, w_resnet = 0.4, 0.3, 0.3
+
+    final_leftover = (
+        w_backproj * leftover_backproj +
+        w_volume * leftover_volume_pct +
+        w_resnet * leftover_resnet
+    )
+
+    rates = {
+        'backproj': float(round(leftover_backproj, 1)),
+        'food_volume_pct': float(round(leftover_volume_pct, 1)),
+        'resnet': float(round(leftover_resnet, 1)),
+        'final': float(round(final_leftover, 1))
+    }
+    return before_amount, after_amount, rates
 
 class AnalyzeService:
     """잔반 분석 서비스"""
     
     def __init__(self):
-        if settings.DEBUG:
-            print("[ANALYZE] Initializing analyze service and loading models...")
+        logger.debug("[ANALYZE] Initializing analyze service and loading models...")
         
         # 모델 가중치 경로
         weights_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'weights', 'new_opencv_ckpt_b84_e200.pth')
         
-        # 워커 풀 생성 (3 프로세스)
-        self._executor = ProcessPoolExecutor(
-            max_workers=3,
-            initializer=_init_worker,
-            initargs=(weights_path,),
+        # 설정값/캘리브레이션 파일 검증 (워커 기동 전에 잘못된 설정을 드러냄)
+        validate_settings()
+        slot_backends = load_depth_backend_selection(settings.DEPTH_BACKEND_SELECTION, settings.DEPTH_BACKEND)
+        calibration = configure_calibration({settings.DEPTH_BACKEND, *slot_backends.values()})
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[ANALYZE] Calibration: %s", calibration)
+            kiosks = TrayRoiRegistry(settings.TRAY_ROI_DIR).kiosks()
+            logger.debug("[ANALYZE] Tray ROI bundles: %s", kiosks if kiosks else 'none (full-image analysis)')
+
+        # 워커가 공유 메모리 세그먼트를 부모와 같은 resource tracker로 추적하도록 먼저 기동
+        if settings.USE_SHARED_MEMORY:
+            ensure_resource_tracker()
+
+        # 워커 풀 생성 (워커 수 x 스레드 수는 CPU affinity/cgroup 할당량에서 결정, 설정값이 있으면 우선)
+        pool_config = plan_pool(
+            available_cpus(), settings.ANALYZE_WORKERS, settings.ANALYZE_THREADS_PER_WORKER,
+            settings.ANALYZE_MAX_WORKERS,
         )
+        self._max_workers = pool_config.workers
+        self._executor = ResizableProcessPool(pool_config, _init_worker, (weights_path,),
+                                              on_replace=self._on_pool_replaced)
+
+        # 워밍업 상태 (워밍업을 하지 않으면 기존처럼 바로 준비 완료, 워커는 첫 분석 때 기동)
+        self._ready = not settings.WARMUP_ON_STARTUP
+        self._warmup_task = None
+        self.warmup_status: Dict[str, Any] = {'workers': pool_config.workers, 'warm_workers': 0,
+                                              'elapsed_s': None, 'error': None}
         
-        if settings.DEBUG:
-            print("[ANALYZE] Process pool initialized with 3 workers")
+        # 워커에 동시에 넘기는 슬롯 분석 수 제한 (요청 간 공유)
+        self._semaphore = asyncio.Semaphore(self._max_workers)
+
+        # 역투영(OpenCV)은 스레드 풀, 신경망은 모델 프로세스 풀로 나눠 실행 (단계별 동시 실행 제한/큐 지표)
+        self.stages = None
+        if settings.SPLIT_PIPELINE_STAGES:
+            cv_threads = settings.BACKPROJ_THREADS or pool_config.workers * pool_config.threads
+            self.stages = SlotStages(
+                cv=StageExecutor('backproj', ThreadPoolExecutor(cv_threads, thread_name_prefix='backproj'),
+                                 cv_threads),
+                model=StageExecutor('model', self._executor, pool_config.workers),
+                tray_rois=TrayRoiRegistry(settings.TRAY_ROI_DIR, settings.TRAY_ROI_DEFAULT_KIOSK),
+            )
+
+        # 요청 간 슬롯 분석 마이크로 배치 스케줄러 (비활성화 시 슬롯마다 개별 워커 호출)
+        # 단계 분리 시에는 신경망 단계만 묶음
+        self.scheduler = None
+        if settings.USE_MICRO_BATCHING:
+            self.scheduler = InferenceScheduler(
+                functools.partial(run_model_batch, self.stages.model) if self.stages is not None
+                else functools.partial(run_scheduled_batch, self._executor),
+                max_batch_size=settings.MICRO_BATCH_MAX_SIZE,
+                max_wait=settings.MICRO_BATCH_MAX_WAIT_MS / 1000,
+                max_concurrency=self._max_workers,
+            )
+
+        # 요청/학생 단위 참조 이미지 저장소
+        self.reference_store = ReferenceStore(
+            max_bytes=settings.REFERENCE_STORE_MAX_MB * 1024 * 1024,
+            ttl_seconds=settings.REFERENCE_STORE_TTL,
+        )
+
+        # 이미지 다운로드용 HTTP 클라이언트 (세션은 start()에서 생성)
+        self.http_client = ImageHttpClient(
+            limit=settings.HTTP_POOL_LIMIT,
+            limit_per_host=settings.HTTP_POOL_LIMIT_PER_HOST,
+            dns_cache_ttl=settings.HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+            connect_timeout=settings.HTTP_CONNECT_TIMEOUT,
+            read_timeout=settings.HTTP_READ_TIMEOUT,
+            total_timeout=settings.HTTP_TOTAL_TIMEOUT,
+            retries=settings.HTTP_RETRIES,
+            retry_backoff=settings.HTTP_RETRY_BACKOFF,
+        )
+
+        # 다운로드 이미지 캐시 (메모리 LRU + 디스크 내용 주소 저장소)
+        self.image_cache = ImageCache(
+            self.http_client,
+            lambda content: decode_image(content, settings.DECODE_REDUCTION),
+            variant=f"color_r{settings.DECODE_REDUCTION}",
+            memory_max_bytes=settings.IMAGE_CACHE_MEMORY_MB * 1024 * 1024,
+            disk_dir=settings.IMAGE_CACHE_DIR,
+            disk_max_bytes=settings.IMAGE_CACHE_DISK_MB * 1024 * 1024,
+            store_decoded=settings.IMAGE_CACHE_STORE_DECODED,
+            revalidate=settings.IMAGE_CACHE_REVALIDATE,
+            url_ttl=settings.IMAGE_CACHE_URL_TTL,
+        )
+
+        # 분석 결과 저장소 (같은 식판 재요청/재시도는 저장된 결과 반환, 식전 슬롯 결과 재사용)
+        self.result_store = None
+        if settings.RESULT_STORE_PATH:
+            self.result_store = ResultStore(
+                settings.RESULT_STORE_PATH,
+                analysis_version(weights_path, {settings.DEPTH_BACKEND, *slot_backends.values()}),
+                ttl_seconds=settings.RESULT_STORE_TTL,
+            )
+        # 진행 중인 분석 (결과 키가 같은 동시 요청은 하나의 분석을 함께 기다림)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.inflight_joins = 0
+
+        logger.debug("[ANALYZE] Process pool initialized with %s workers x %s threads (%g CPUs available)",
+                     self._max_workers, pool_config.threads, available_cpus())
+
+    async def start(self):
+        """FastAPI startup 시 호출: 애플리케이션 수명 동안 재사용할 HTTP 세션 생성 후 워커 워밍업 시작"""
+        await self.http_client.start()
+        if settings.WARMUP_ON_STARTUP:
+            self.start_warmup()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def readiness(self) -> Dict[str, Any]:
+        """준비 상태 (/ready 응답)"""
+        return {'ready': self._ready, **self.warmup_status}
+
+    def start_warmup(self) -> asyncio.Task:
+        """백그라운드 워밍업 시작 (진행 중인 워밍업은 취소하고 현재 풀 기준으로 다시 시작)"""
+        if self._warmup_task is not None and not self._warmup_task.done():
+            self._warmup_task.cancel()
+        self._ready = False
+        self._warmup_task = asyncio.ensure_future(self.warm_up())
+        return self._warmup_task
+
+    def _on_pool_replaced(self):
+        # 크기 변경/비정상 종료 복구로 새로 뜬 워커도 트래픽 전에 워밍업
+        if not settings.WARMUP_ON_STARTUP:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.start_warmup()
+
+    async def warm_up(self) -> Dict[str, Any]:
+        """
+        모든 워커를 미리 기동(모델 로드, ONNX 변환/양자화)하고 합성 식판으로 모든 분기를 한 번씩 추론
+        워커마다 콜드 스타트 단계별 소요 시간을 로그로 남기며, 모든 워커가 끝나야 ready
+        """
+        self._ready = False
+        loop = asyncio.get_running_loop()
+        pool = self._executor
+        generation, workers = pool.generation, pool.max_workers
+        start = time.perf_counter()
+        warmed = {}
+        self.warmup_status = {'workers': workers, 'warm_workers': 0, 'elapsed_s': None, 'error': None}
+        logger.info("[WARMUP] Warming up %d workers...", workers)
+        try:
+            # 이미 워밍업된 워커는 바로 반환하므로 모든 워커가 한 번씩 받을 때까지 반복
+            while len(warmed) < workers:
+                results = await asyncio.wait_for(
+                    asyncio.gather(*[
+                        loop.run_in_executor(pool, _warmup_worker, settings.DECODE_REDUCTION)
+                        for _ in range(workers - len(warmed))
+                    ]),
+                    timeout=max(0.0, start + settings.WARMUP_TIMEOUT - time.perf_counter()),
+                )
+                if pool.generation != generation:
+                    # 워밍업 중 풀이 교체됨 (새 풀의 워밍업이 따로 실행)
+                    return self.warmup_status
+                for result in results:
+                    if result['warmup'] is None:
+                        continue
+                    warmed[result['pid']] = result
+                    steps = ", ".join(f"{step} {sec:.2f}s" for step, sec in result['startup'].items() if step != 'total')
+                    logger.info("[WARMUP] worker %d cold start: %s (total %.2fs) | "
+                                "first inference %.2fs, steady %.2fs",
+                                result['pid'], steps, result['startup'].get('total', 0.0),
+                                result['warmup']['first_inference'], result['warmup']['steady_inference'])
+                self.warmup_status['warm_workers'] = len(warmed)
+        except asyncio.TimeoutError:
+            self.warmup_status['error'] = f"timeout after {settings.WARMUP_TIMEOUT:g}s"
+            logger.warning("[WARMUP] Timed out: %d/%d workers warm", len(warmed), workers)
+            return self.warmup_status
+        except Exception as e:
+            self.warmup_status['error'] = f"{type(e).__name__}: {e}"
+            logger.error("[WARMUP] Failed: %s", self.warmup_status['error'])
+            return self.warmup_status
+
+        self.warmup_status['elapsed_s'] = round(time.perf_counter() - start, 2)
+        self._ready = True
+        logger.info("[WARMUP] %d/%d workers warm in %.2fs (pool %dx%d)", len(warmed), workers,
+                    self.warmup_status['elapsed_s'], pool.config.workers, pool.config.threads)
+        return self.warmup_status
+
+    async def close(self):
+        """FastAPI shutdown 시 호출: HTTP 세션과 워커 풀 정리"""
+        if self._warmup_task is not None and not self._warmup_task.done():
+            self._warmup_task.cancel()
+        if self.scheduler is not None:
+            await self.scheduler.close()
+        await self.http_client.close()
+        if self.stages is not None:
+            self.stages.cv.executor.shutdown(wait=False, cancel_futures=True)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self.result_store is not None:
+            self.result_store.close()
+
+    def resize_pool(self, workers: int = 0, threads: int = 0) -> Dict[str, Any]:
+        """
+        실행 중 워커 풀 크기 변경 (0이면 자동 결정, 새 워커는 모델을 다시 로드)
+        이미 제출된 분석은 이전 풀에서 끝까지 실행되고, 이후 분석부터 새 풀 사용
+        """
+        config = plan_pool(available_cpus(), workers, threads, settings.ANALYZE_MAX_WORKERS)
+        previous = self._executor.resize(config)
+        if config.workers != self._max_workers:
+            self._max_workers = config.workers
+            self._semaphore = asyncio.Semaphore(config.workers)
+            if self.scheduler is not None:
+                self.scheduler.resize(config.workers)
+            if self.stages is not None:
+                self.stages.model.resize(config.workers)
+        logger.debug("[ANALYZE] Process pool resized: %sx%s -> %sx%s",
+                     previous.workers, previous.threads, config.workers, config.threads)
+        return self._executor.info()
+
+    def metrics(self) -> Dict[str, Any]:
+        """분석 파이프라인 지표 (워커 풀, 단계별 실행기, 마이크로 배치 큐, 참조 저장소, 이미지 캐시, 결과 저장소)"""
+        return {
+            'worker_pool': self._executor.info(),
+            'warmup': self.readiness(),
+            'stages': {
+                stage.name: stage.metrics() for stage in (self.stages.cv, self.stages.model)
+            } if self.stages is not None else None,
+            'micro_batching': self.scheduler.metrics() if self.scheduler is not None else None,
+            'reference_store': self.reference_store.metrics(),
+            'image_cache': self.image_cache.metrics(),
+            'result_store': {
+                **self.result_store.metrics(),
+                'inflight': len(self._inflight),
+                'inflight_joins': self.inflight_joins,
+            } if self.result_store is not None else None,
+        }
 
     async def analyze_leftover_images(
         self,
         before_images: Dict[str, str],
         after_images: Dict[str, str],
-        student_info: Dict[str, Any]
+        student_info: Dict[str, Any],
+        kiosk_id: Optional[str] = None
     ) -> Dict[str, Any]:
+        """
+        식판 잔반 분석
+        결과 저장소가 없으면(기본값) 식전 분석과 식후 이미지 다운로드를 겹쳐 바로 분석
+        결과 저장소가 있으면 이미지를 먼저 받아(캐시는 ETag로 재검증) 내용 해시로 결과 키를 만들고,
+        같은 요청(학생, 식전/식후 이미지 내용, 키오스크, 모델 버전)은 저장된 결과를 반환
+        같은 요청이 분석 중이면(Spring 타임아웃 재시도 등) 새로 분석하지 않고 진행 중인 분석을 함께 기다림
+        """
+        if self.result_store is None:
+            leftover_rate, _, _ = await self._analyze_leftover(before_images, after_images, student_info, kiosk_id)
+            return {"leftoverRate": leftover_rate, "studentInfo": student_info}
+
+        fetched = await fetch_images([*before_images.values(), *after_images.values()], self.image_cache)
+        before_digests = {category: fetched[url][1] for category, url in before_images.items()}
+        after_digests = {category: fetched[url][1] for category, url in after_images.items()}
+        images = {url: img for url, (img, _) in fetched.items()}
+        del fetched
+
+        key = self.result_store.make_key(student_info.get('id'), before_digests, after_digests, kiosk_id)
+        task = self._inflight.get(key)
+        if task is None:
+            with tracing.span('store') as attrs:
+                stored = await asyncio.to_thread(self.result_store.get, key)
+                attrs['hit'] = stored is not None
+            if stored is not None:
+                logger.debug("[ANALYZE] Result store hit for %s", student_info.get('name'))
+                return {"leftoverRate": stored['leftoverRate'], "studentInfo": student_info}
+            task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._analyze_and_store(
+                key, before_images, after_images, student_info, kiosk_id, before_digests, images
+            ))
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._inflight_done, key))
+        else:
+            self.inflight_joins += 1
+        # 요청이 취소되어도(클라이언트 타임아웃) 분석은 끝까지 실행해 저장 → 재시도 요청이 결과를 받음
+        leftover_rate = await asyncio.shield(task)
+        return {"leftoverRate": dict(leftover_rate), "studentInfo": student_info}
+
+    def _inflight_done(self, key: str, task: asyncio.Future):
+        self._inflight.pop(key, None)
+        # 기다리는 요청이 모두 취소된 경우 "exception was never retrieved" 경고 방지
+        if not task.cancelled():
+            task.exception()
+
+    async def _analyze_and_store(
+        self,
+        key: str,
+        before_images: Dict[str, str],
+        after_images: Dict[str, str],
+        student_info: Dict[str, Any],
+        kiosk_id: Optional[str],
+        before_digests: Dict[str, str],
+        images: Dict[str, np.ndarray]
+    ) -> Dict[str, float]:
+        """저장된 식전 슬롯 결과(식전 이미지 내용 기준)를 재사용해 분석하고 요청 결과와 새 식전 슬롯 결과를 저장"""
+        store = self.result_store
+        slot_keys = {category: store.slot_key(digest, kiosk_id) for category, digest in before_digests.items()}
+        stored_slots = await asyncio.to_thread(store.get_slots, slot_keys.values())
+        stored_before = {category: stored_slots[k] for category, k in slot_keys.items() if k in stored_slots}
+
+        leftover_rate, details, before_results = await self._analyze_leftover(
+            before_images, after_images, student_info, kiosk_id, stored_before, images
+        )
+        new_slots = {
+            slot_keys[category]: slot_summary(result) for category, result in before_results.items()
+            if category not in stored_before and result is not None
+        }
+        await asyncio.to_thread(store.put, key, student_info.get('id'), leftover_rate, details, new_slots)
+        return leftover_rate
+
+    async def _analyze_leftover(
+        self,
+        before_images: Dict[str, str],
+        after_images: Dict[str, str],
+        student_info: Dict[str, Any],
+        kiosk_id: Optional[str] = None,
+        stored_before: Optional[Dict[str, Dict[str, Any]]] = None,
+        images: Optional[Dict[str, np.ndarray]] = None
+    ) -> Tuple[Dict[str, float], Dict[str, Any], Dict[str, Any]]:
+        """
+        슬롯별 식전/식후 분석과 잔반율 계산
+        stored_before: 카테고리별 저장된 식전 슬롯 요약 (해당 슬롯은 식전 분석 생략)
+        images: 이미 받은 이미지 (URL → 이미지, 없는 URL은 파이프라인에서 다운로드)
+        return: (응답 잔반율, 상세 {before, after, leftover}, 카테고리별 식전 결과)
+        """
+        stored_before = stored_before or {}
         total_start = time.time()
+
+        # 참조 키 (학생 ID + 카테고리 + 식전 이미지 URL)
+        reference_keys = {
+            category: ReferenceStore.make_key(student_info.get('id'), category, url)
+            for category, url in before_images.items()
+        }
         
-        # 식전 이미지 병렬 처리
-        before_start = time.time()
-        before_results = await process_before_images_parallel(
-            before_images, self._executor
-        )
-        before_elapsed = time.time() - before_start
-        if settings.DEBUG:
-            print(f"[TIMING] Process before images: {before_elapsed:.3f}s")
-
-        # 식후 이미지 병렬 처리
-        after_start = time.time()
-        after_results = await process_after_images_parallel(
-            after_images, before_results, self._executor
-        )
-        after_elapsed = time.time() - after_start
-        if settings.DEBUG:
-            print(f"[TIMING] Process after images: {after_elapsed:.3f}s")
+        # 슬롯별 식전 → 식후 체인을 동시에 실행 (워커 풀 크기만큼만 동시 분석)
+        pipeline_start = time.time()
+        slot_results = await asyncio.gather(*[
+            process_slot_pipeline(
+                category, url, after_images.get(category), self._executor, self._semaphore,
+                self.image_cache, self.reference_store, reference_keys[category], kiosk_id,
+                self.scheduler, self.stages, stored_before.get(category), images
+            )
+            for category, url in before_images.items()
+        ])
+        before_results = {category: before for category, (before, _) in zip(before_images, slot_results)}
+        after_results = {
+            category: after for category, (_, after) in zip(before_images, slot_results)
+            if category in after_images
+        }
+        pipeline_elapsed = time.time() - pipeline_start
+        logger.debug("[TIMING] Process slot pipelines: %.3fs", pipeline_elapsed)
 
         # 결과 처리
         before_amounts = {}
@@ -333,119 +1136,31 @@ class AnalyzeService:
 
         for category in before_results.keys():
             if category in after_results:
-                before_result = before_results[category]
-                after_result = after_results[category]
-
-                # 각 모델별 결과 추출
-                before_backproj = before_result['backproj_percentage'] if before_result else 0.0
-                after_backproj = after_result['backproj_percentage'] if after_result else 0.0
-                before_volume = before_result['food_volume_cm3'] if before_result else 0.0
-                after_volume = after_result['food_volume_cm3'] if after_result else 0.0
-                before_resnet = before_result['resnet_result'][2] if before_result else 0.0
-                after_resnet = after_result['resnet_result'][2] if after_result else 0.0
-
-                # before/after 딕셔너리 저장
-                before_amounts[category] = {
-                    'backproj': float(round(before_backproj, 1)),
-                    'food_volume_cm3': float(round(before_volume, 2)),
-                    'resnet': float(round(before_resnet, 1))
-                }
-                after_amounts[category] = {
-                    'backproj': float(round(after_backproj, 1)),
-                    'food_volume_cm3': float(round(after_volume, 2)),
-                    'resnet': float(round(after_resnet, 1))
-                }
-
-                # leftover 계산
-                if before_backproj > 0:
-                    leftover_backproj = max(0, (before_backproj - after_backproj) / before_backproj * 100)
-                else:
-                    leftover_backproj = 0.0
-                if before_resnet > 0:
-                    leftover_resnet = max(0, (before_resnet - after_resnet) / before_resnet * 100)
-                else:
-                    leftover_resnet = 0.0
-                if before_volume > 0:
-                    leftover_volume_pct = max(0, (before_volume - after_volume) / before_volume * 100)
-                else:
-                    leftover_volume_pct = 0.0
-
-                # 가중치 적용
-                if after_backproj <= 20:
-                    w_backproj, w_volume, w_resnet = 1.0, 0.0, 0.0
-                elif leftover_resnet == 0.0:
-                    w_backproj, w_volume, w_resnet = 0.5, 0.5, 0.0
-                else:
-                    w_backproj, w_volume, w_resnet = 0.4, 0.3, 0.3
-
-                final_leftover = (
-                    w_backproj * leftover_backproj +
-                    w_volume * leftover_volume_pct +
-                    w_resnet * leftover_resnet
+                before_amounts[category], after_amounts[category], leftover_rates[category] = compute_leftover_rate(
+                    before_results[category], after_results[category]
                 )
 
-                leftover_rates[category] = {
-                    'backproj': float(round(leftover_backproj, 1)),
-                    'food_volume_pct': float(round(leftover_volume_pct, 1)),
-                    'resnet': float(round(leftover_resnet, 1)),
-                    'final': float(round(final_leftover, 1))
-                }
-
         total_elapsed = time.time() - total_start
-        if settings.DEBUG:
-            print(f"[TIMING] Total analyze_leftover_images: {total_elapsed:.3f}s")
-            print(f"[ANALYZE] Processed images for {student_info.get('name')}")
-            print(f"[ANALYZE] Before: {before_amounts}")
-            print(f"[ANALYZE] After: {after_amounts}")
-            print(f"[ANALYZE] Leftover: {leftover_rates}")
-
-        leftoverRate_final = {k: round(100 - v['final'], 2) for k, v in leftover_rates.items()}
-        return {
-            "leftoverRate": leftoverRate_final,
-            "studentInfo": student_info
-        }
-
-    async def _calculate_leftover(self, before_url: str, after_url: str) -> float:
-        # 더미 구현
-        return round(random.uniform(1.0, 35.0), 1)
-
-
-def analyze_leftover(before_images, after_images, resnet_model, midas_model, midas_transform):
-    start = time.time()
-    result = {}
-    for key in before_images:
-        # 이미지 다운로드
-        dl_start = time.time()
-        before_img = download_image(before_images[key])
-        after_img = download_image(after_images[key])
-        dl_elapsed = time.time() - dl_start
-        if settings.DEBUG:
-            print(f"[TIMING] analyze_leftover download images for {key}: {dl_elapsed:.3f}s")
-
-        # 중앙 crop - 메모리에 캐싱
-        crop_start = time.time()
-        cache_key = f"reference_{key}_{int(time.time()*1000)}"
-        reference = crop_center(before_img, cache_key=cache_key)
-        crop_elapsed = time.time() - crop_start
-        if settings.DEBUG:
-            print(f"[TIMING] analyze_leftover crop_center for {key}: {crop_elapsed:.3f}s")
-
-        # 분석
-        proc_start = time.time()
-        res = analyze_food_image_custom(
-            target_image_path=after_img,
-            reference_image_path=reference,
-            resnet_model=resnet_model,
-            midas_model=midas_model,
-            midas_transform=midas_transform
-        )
-        proc_elapsed = time.time() - proc_start
-        if settings.DEBUG:
-            print(f"[TIMING] analyze_food_image_custom for {key}: {proc_elapsed:.3f}s")
+        tracing.record('request', total_elapsed, total_start, slots=len(before_images))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[TIMING] Total analyze_leftover_images: %.3fs", total_elapsed)
+            logger.debug("[ANALYZE] Processed images for %s", student_info.get('name'))
+            logger.debug("[ANALYZE] Before: %s", before_amounts)
+            logger.debug("[ANALYZE] After: %s", after_amounts)
+            logger.debug("[ANALYZE] Leftover: %s", leftover_rates)
+            skipped = {
+                category: [branch for branch, state in result['trace'].items() if state == 'skipped']
+                for category, result in after_results.items() if result
+            }
+            logger.debug("[ANALYZE] Skipped branches (after): %s", skipped)
+            logger.debug("[ANALYZE] Reference store: %s", self.reference_store.metrics())
+            logger.debug("[ANALYZE] Image cache: %s", self.image_cache.metrics())
+            if self.scheduler is not None:
+                logger.debug("[ANALYZE] Micro-batching: %s", self.scheduler.metrics())
+            if self.stages is not None:
+                logger.debug("[ANALYZE] Stages: backproj %s, model %s",
+                             self.stages.cv.metrics(), self.stages.model.metrics())
 
-        result[key] = res['final_percentage'] if res else 0.0
-
-    elapsed = time.time() - start
-    if settings.DEBUG:
-        print(f"[TIMING] Total analyze_leftover: {elapsed:.3f}s")
-    return result
+        leftoverRate_final = {k: final_leftover_rate(v) for k, v in leftover_rates.items()}
+        details = {'before': before_amounts, 'after': after_amounts, 'leftover': leftover_rates}
+        return leftoverRate_final, details, before_results
@@ -1,7 +1,16 @@
+import os
+import sys
 import numpy as np
 import cv2
 import torch
-from app.services.custom_model import load_midas_model
+from app.config import settings
+from app.services.custom_model import load_midas_model, CALIBRATION, DEPTH_BACKENDS, DEFAULT_DEPTH_BACKEND
+
+# 캘리브레이션할 깊이 백엔드 (예: python -m app.services.calibrate_midas_scale MiDaS_small)
+BACKEND = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DEPTH_BACKEND
+
+# 서비스와 같은 캘리브레이션 폴더에 저장
+CALIBRATION.configure(settings.CALIBRATION_DIR)
 
 # 실제 식판 깊이(cm)
 H_CM = 3.0
@@ -9,7 +18,7 @@ H_CM = 3.0
 empty_img_path = 'app/refs/tray_empty.jpg'
 
 # MiDaS 모델 로드 (CPU 사용)
-midas_model, midas_transform = load_midas_model(device='cpu')
+midas_model, midas_transform = load_midas_model(device='cpu', backend=BACKEND)
 img = cv2.imread(empty_img_path)
 input_batch = midas_transform(img).to('cpu')
 
@@ -23,13 +32,15 @@ with torch.no_grad():
     ).squeeze()
 
 depth_map = prediction.cpu().numpy()  # 정규화 전 원본
-np.save('depth_map_empty.npy', depth_map)
-print('빈 식판 depth_map 저장 완료!')
+empty_depth_path = CALIBRATION.resolve(DEPTH_BACKENDS[BACKEND]['empty_depth_file'])
+np.save(empty_depth_path, depth_map)
+print(f'빈 식판 depth_map 저장 완료! ({BACKEND}, {empty_depth_path})')
 
 # --- 스케일 캘리브레이션 ---
 d = depth_map
 d_wall = np.percentile(d, 95)   # 벽면(가장 얕은 곳)
 d_floor = np.percentile(d, 5)   # 바닥(가장 깊은 곳)
 scale_cm_per_unit = H_CM / (d_wall - d_floor)
-np.save('midas_scale.npy', scale_cm_per_unit)
-print(f"스케일 계수: {scale_cm_per_unit:.4f} cm/ΔZ (midas_scale.npy 저장)")
\ No newline at end of file
+scale_path = CALIBRATION.resolve(DEPTH_BACKENDS[BACKEND]['scale_file'])
+np.save(scale_path, scale_cm_per_unit)
+print(f"스케일 계수: {scale_cm_per_unit:.4f} cm/ΔZ ({scale_path} 저장)")
\ No newline at end of file
@@ -0,0 +1,181 @@
+import json
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+# 스케일 파일이 없을 때 사용하는 기본값 (기존 H_CM)
+FALLBACK_SCALE_CM_PER_UNIT = 3.0
+# 캘리브레이션 파일 기본 위치 (ai/ 폴더, calibrate_midas_scale 실행 위치와 동일)
+DEFAULT_CALIBRATION_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class CalibrationError(ValueError):
+    """캘리브레이션 파일이 없거나 값이 올바르지 않음"""
+
+
+class BackendCalibration:
+    """깊이 백엔드 하나의 캘리브레이션 값 (워커에서 한 번 로드 후 재사용)"""
+    __slots__ = ('backend', 'scale_cm_per_unit', 'scale_source', 'empty_z_plane', 'empty_source',
+                 'z_plane', 'slots', 'warnings')
+
+    def __init__(self, backend: str):
+        self.backend = backend
+        self.scale_cm_per_unit = FALLBACK_SCALE_CM_PER_UNIT
+        self.scale_source = 'fallback'
+        self.empty_z_plane: Optional[float] = None
+        self.empty_source: Optional[str] = None
+        self.z_plane: Dict[str, float] = {}
+        self.slots: Dict[str, Dict[str, float]] = {}
+        self.warnings = []
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'backend': self.backend,
+            'scale_cm_per_unit': self.scale_cm_per_unit,
+            'scale_source': self.scale_source,
+            'empty_z_plane': self.empty_z_plane,
+            'empty_source': self.empty_source,
+            'z_plane_slots': sorted(self.z_plane),
+            'warnings': list(self.warnings),
+        }
+
+
+def _load_scale(path: str) -> float:
+    value = np.load(path)
+    if value.size != 1:
+        raise CalibrationError(f"스케일 파일은 스칼라여야 합니다: {path} shape={value.shape}")
+    scale = float(value.reshape(()))
+    if not math.isfinite(scale) or scale <= 0:
+        raise CalibrationError(f"스케일 값이 올바르지 않습니다: {path} = {scale}")
+    return scale
+
+
+def _load_empty_z_plane(path: str) -> float:
+    depth = np.load(path)
+    if depth.ndim != 2 or depth.size == 0:
+        raise CalibrationError(f"빈 식판 깊이 맵은 2차원이어야 합니다: {path} shape={depth.shape}")
+    z_plane = float(np.nanmean(depth))
+    if not math.isfinite(z_plane):
+        raise CalibrationError(f"빈 식판 깊이 맵 평균이 유한하지 않습니다: {path}")
+    return z_plane
+
+
+def _validate_slots(slots: Dict[str, Dict[str, float]]):
+    for name, slot in slots.items():
+        for key in ('w', 'h', 'nx', 'ny'):
+            value = slot.get(key)
+            if not isinstance(value, (int, float)) or not value > 0:
+                raise CalibrationError(f"TRAY_SLOTS[{name!r}][{key!r}] 값이 올바르지 않습니다: {value!r}")
+
+
+class CalibrationRegistry:
+    """
+    MiDaS 캘리브레이션 값 레지스트리
+    - 백엔드별 스케일(cm/ΔZ), 빈 식판 z_plane, 슬롯별 고정 z_plane, 슬롯 크기(TRAY_SLOTS)
+    - 파일 경로는 calibration_dir 기준으로 해석 (CWD와 무관)
+    - 파일이 바뀌면 (check_interval초마다 mtime 확인) 다시 로드
+    - strict=True이면 스케일 파일이 없거나 잘못된 경우 fallback 대신 CalibrationError
+    """
+
+    def __init__(self, backends: Dict[str, Dict[str, Any]], slots: Dict[str, Dict[str, float]],
+                 calibration_dir: str = DEFAULT_CALIBRATION_DIR, slots_file: str = "",
+                 strict: bool = False, check_interval: float = 5.0):
+        self._backends = backends
+        self._default_slots = slots
+        self._lock = threading.Lock()
+        self._entries: Dict[str, BackendCalibration] = {}
+        self._mtimes: Dict[str, tuple] = {}
+        self._checked_at: Dict[str, float] = {}
+        self.reloads = 0
+        self.configure(calibration_dir, slots_file, strict, check_interval)
+
+    def configure(self, calibration_dir: str = DEFAULT_CALIBRATION_DIR, slots_file: str = "",
+                  strict: bool = False, check_interval: float = 5.0):
+        with self._lock:
+            self.calibration_dir = os.path.abspath(calibration_dir or DEFAULT_CALIBRATION_DIR)
+            self.slots_file = self.resolve(slots_file) if slots_file else ""
+            self.strict = strict
+            self.check_interval = check_interval
+            self._entries.clear()
+            self._mtimes.clear()
+            self._checked_at.clear()
+
+    def resolve(self, path: str) -> str:
+        """캘리브레이션 파일 경로 (상대 경로는 calibration_dir 기준)"""
+        return path if os.path.isabs(path) else os.path.join(self.calibration_dir, path)
+
+    def _paths(self, backend: str):
+        cfg = self._backends[backend]
+        return (self.resolve(cfg["scale_file"]), self.resolve(cfg["empty_depth_file"]), self.slots_file)
+
+    @staticmethod
+    def _mtime(path: str):
+        try:
+            return os.stat(path).st_mtime_ns if path else None
+        except OSError:
+            return None
+
+    def get(self, backend: str) -> BackendCalibration:
+        """백엔드 캘리브레이션 (캐시, 파일 변경 시 다시 로드)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(backend)
+            if entry is not None and now - self._checked_at.get(backend, 0) < self.check_interval:
+                return entry
+            paths = self._paths(backend)
+            mtimes = tuple(self._mtime(p) for p in paths)
+            self._checked_at[backend] = now
+            if entry is not None and mtimes == self._mtimes.get(backend):
+                return entry
+            entry = self._load(backend, paths)
+            if backend in self._entries:
+                self.reloads += 1
+            self._entries[backend] = entry
+            self._mtimes[backend] = mtimes
+            return entry
+
+    def _load(self, backend: str, paths) -> BackendCalibration:
+        scale_path, empty_path, slots_path = paths
+        cfg = self._backends[backend]
+        entry = BackendCalibration(backend)
+        entry.z_plane = dict(cfg.get("z_plane", {}))
+
+        try:
+            entry.scale_cm_per_unit = _load_scale(scale_path)
+            entry.scale_source = scale_path
+        except (OSError, ValueError) as e:
+            if self.strict:
+                raise CalibrationError(f"{backend} 스케일 파일을 읽을 수 없습니다: {scale_path} ({e})")
+            entry.warnings.append(f"scale fallback {FALLBACK_SCALE_CM_PER_UNIT}: {scale_path} ({e})")
+
+        try:
+            entry.empty_z_plane = _load_empty_z_plane(empty_path)
+            entry.empty_source = empty_path
+        except (OSError, ValueError) as e:
+            # 빈 식판 깊이 맵은 tray_mask가 부족할 때만 쓰이므로 없으면 경고만 기록
+            entry.warnings.append(f"empty tray depth unavailable: {empty_path} ({e})")
+
+        slots = {name: dict(slot) for name, slot in self._default_slots.items()}
+        if slots_path:
+            try:
+                with open(slots_path, "r", encoding="utf-8") as f:
+                    overrides = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CalibrationError(f"슬롯 캘리브레이션 파일을 읽을 수 없습니다: {slots_path} ({e})")
+            for name, slot in overrides.items():
+                slots.setdefault(name, {}).update(slot)
+        _validate_slots(slots)
+        entry.slots = slots
+        return entry
+
+    def fingerprint(self, backends=None) -> Dict[str, tuple]:
+        """백엔드별 캘리브레이션 파일 mtime (값이 바뀌었는지 비교하는 용도, 파일이 없으면 None)"""
+        return {backend: tuple(self._mtime(p) for p in self._paths(backend)) for backend in (backends or self._backends)}
+
+    def validate(self, backends=None) -> Dict[str, Dict[str, Any]]:
+        """시작 시 검증: 백엔드별 요약 반환 (strict이면 잘못된 파일에서 예외)"""
+        return {backend: self.get(backend).summary() for backend in (backends or self._backends)}
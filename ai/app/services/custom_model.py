@@ -1,4 +1,5 @@
 # 음식양추정/음식양추정/quantity_est/custom_model.py
+import logging
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
@@ -10,17 +11,24 @@ import os
 import time
 from datetime import datetime
 import argparse
+import json
 import re
+import hashlib
+import threading
+from collections import OrderedDict
 from torchvision import transforms
 import random
 import onnxruntime as ort
 
-# RNG 시드 고정
+# RNG 시드 (import 시점이 아니라 분석 워커 초기화/CLI 진입점에서 seed_everything()으로 고정)
 SEED = 42
-random.seed(SEED)         # 파이썬 표준 RNG
-np.random.seed(SEED)      # NumPy RNG
-torch.manual_seed(SEED)   # PyTorch
-cv2.setRNGSeed(SEED)      # OpenCV RNG
+
+def seed_everything(seed: int = SEED):
+    """파이썬/NumPy/PyTorch/OpenCV 전역 RNG 시드 고정"""
+    random.seed(seed)         # 파이썬 표준 RNG
+    np.random.seed(seed)      # NumPy RNG
+    torch.manual_seed(seed)   # PyTorch
+    cv2.setRNGSeed(seed)      # OpenCV RNG
 
 # 한글 폰트 설정
 plt.rcParams['font.family'] = 'Malgun Gothic'  # 윈도우 기본 한글 폰트
@@ -28,6 +36,11 @@ plt.rcParams['axes.unicode_minus'] = False     # 마이너스 기호 깨짐 방
 
 # 모델 관련 임포트
 from torchvision import transforms, models
+from .calibration import CalibrationRegistry
+from ..core import tracing
+from ..core.logger import sampled
+
+logger = logging.getLogger(__name__)
 
 def remove_small_objects(mask, min_size=500):
     """
@@ -36,13 +49,97 @@ def remove_small_objects(mask, min_size=500):
     min_size: 남길 최소 픽셀 수
     return: 작은 객체가 제거된 마스크
     """
-    mask_uint8 = (mask.astype(np.uint8)) * 255
-    num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(mask_uint8, connectivity=8)
-    cleaned_mask = np.zeros_like(mask_uint8)
-    for i in range(1, num_labels):  # 0은 배경
-        if stats[i, cv2.CC_STAT_AREA] >= min_size:
-            cleaned_mask[labels == i] = 255
-    return cleaned_mask > 0
+    # connectedComponents는 0이 아닌 픽셀을 전경으로 보므로 0/1 그대로 사용
+    mask_uint8 = mask.astype(np.uint8)
+    _, labels, stats, _ = cv2.connectedComponentsWithStats(mask_uint8, connectivity=8)
+    # 라벨별 유지 여부 lookup table (0은 배경) 후 한 번의 gather로 마스크 생성
+    keep = stats[:, cv2.CC_STAT_AREA] >= min_size
+    keep[0] = False
+    return keep[labels]
+
+class ReferenceModel:
+    """
+    역투영용 참조 이미지 모델
+    참조 crop의 정규화 H-S 히스토그램과 참조 이미지 자체의 음식 마스크 픽셀 수를 한 번만 계산해
+    대상 이미지 역투영, 참조 자기 역투영, 식후 이미지 역투영에서 재사용합니다.
+    """
+    __slots__ = ('key', 'hist', 'food_pixel_count', 'use_channels', 'hist_bins')
+
+    def __init__(self, key, hist, food_pixel_count, use_channels, hist_bins):
+        self.key = key
+        self.hist = hist
+        self.food_pixel_count = food_pixel_count
+        self.use_channels = use_channels
+        self.hist_bins = hist_bins
+
+    @property
+    def nbytes(self):
+        return self.hist.nbytes
+
+    def __getstate__(self):
+        # 히스토그램은 대부분 0이므로 0이 아닌 bin만 직렬화 (워커 간 전달 비용 절감)
+        flat = self.hist.ravel()
+        nonzero = np.flatnonzero(flat).astype(np.int32)
+        return (self.key, self.hist.shape, nonzero, flat[nonzero],
+                self.food_pixel_count, self.use_channels, self.hist_bins)
+
+    def __setstate__(self, state):
+        key, shape, nonzero, values, food_pixel_count, use_channels, hist_bins = state
+        hist = np.zeros(shape, np.float32)
+        hist.ravel()[nonzero] = values
+        self.__init__(key, hist, food_pixel_count, use_channels, hist_bins)
+
+# 참조 모델 LRU 캐시 (프로세스별, 이미지 내용 해시 기준)
+REFERENCE_CACHE_SIZE = 32
+_REFERENCE_MODEL_CACHE = OrderedDict()
+_REFERENCE_MODEL_LOCK = threading.Lock()  # 역투영 단계를 스레드 풀에서 실행할 때 캐시 보호
+
+def reference_key(reference_img, use_channels=(0, 1), hist_bins=(180, 256)):
+    """참조 이미지 내용 해시 (크기/채널/bin 설정 포함)"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(reference_img).data)
+    h.update(repr((reference_img.shape, str(reference_img.dtype), tuple(use_channels), tuple(hist_bins))).encode())
+    return h.hexdigest()
+
+def _reference_hist(hsv_r, use_channels=(0, 1), hist_bins=(180, 256)):
+    """참조 HSV 이미지의 정규화 히스토그램"""
+    ch_idx = list(use_channels)
+    hist_size = [hist_bins[0] if 0 in ch_idx else 1, hist_bins[1] if 1 in ch_idx else 1]
+    ranges = [0, 180, 0, 256]
+    roi_hist = cv2.calcHist([hsv_r], ch_idx, None, hist_size, ranges)
+    cv2.normalize(roi_hist, roi_hist, 0, 255, cv2.NORM_MINMAX)
+    return roi_hist
+
+def build_reference_model(reference_img, use_channels=(0, 1), hist_bins=(180, 256), key=None, min_size=500):
+    """참조 이미지로부터 ReferenceModel 생성 (HSV 변환은 히스토그램과 자기 역투영에 한 번만 사용)"""
+    hsv_r = cv2.cvtColor(reference_img, cv2.COLOR_BGR2HSV)
+    model = ReferenceModel(
+        key or reference_key(reference_img, use_channels, hist_bins),
+        _reference_hist(hsv_r, use_channels, hist_bins),
+        0, tuple(use_channels), tuple(hist_bins),
+    )
+    # 참조 이미지(가득 찬 상태)에서 음식 마스크 추출
+    _, _, ref_food_mask = back_projection(reference_img, model, min_size=min_size, target_hsv=hsv_r)
+    model.food_pixel_count = int(np.sum(ref_food_mask))
+    return model
+
+def get_reference_model(reference_img, use_channels=(0, 1), hist_bins=(180, 256), min_size=500):
+    """LRU 캐시에서 ReferenceModel 조회 (없으면 생성 후 저장)"""
+    if isinstance(reference_img, ReferenceModel):
+        return reference_img
+    key = reference_key(reference_img, use_channels, hist_bins)
+    # food_pixel_count는 min_size에 따라 달라지므로 캐시 키에 포함 (모델 key는 내용 해시 그대로)
+    with _REFERENCE_MODEL_LOCK:
+        model = _REFERENCE_MODEL_CACHE.get((key, min_size))
+        if model is not None:
+            _REFERENCE_MODEL_CACHE.move_to_end((key, min_size))
+            return model
+    model = build_reference_model(reference_img, use_channels, hist_bins, key=key, min_size=min_size)
+    with _REFERENCE_MODEL_LOCK:
+        _REFERENCE_MODEL_CACHE[(key, min_size)] = model
+        while len(_REFERENCE_MODEL_CACHE) > REFERENCE_CACHE_SIZE:
+            _REFERENCE_MODEL_CACHE.popitem(last=False)
+    return model
 
 # 역투영 알고리즘 함수
 def back_projection(
@@ -61,19 +158,26 @@ def back_projection(
     use_percentile=False,           # percentile 방식 사용 여부
     food_percent=70,                 # 음식으로 인식할 상위 퍼센트(%)
     use_otsu=False,              # Otsu 방식 사용 여부
-    use_triangle=False           # Triangle 방식 사용 여부
+    use_triangle=False,          # Triangle 방식 사용 여부
+    target_hsv=None,             # 미리 변환한 대상 HSV 이미지 (없으면 변환)
+    roi_mask=None                # 유효 픽셀 마스크 (있으면 ROI 밖은 음식/잔반 어디에도 포함하지 않음)
 ):
-    """역투영 알고리즘 (파라미터 튜닝 지원, 기본값은 기존과 동일)"""
+    """
+    역투영 알고리즘 (파라미터 튜닝 지원, 기본값은 기존과 동일)
+    reference_img: 참조 BGR 이미지 또는 ReferenceModel (이 경우 use_channels/hist_bins는 모델 값 사용)
+    """
     # 1. HSV 변환
-    hsv_t = cv2.cvtColor(target_img, cv2.COLOR_BGR2HSV)
-    hsv_r = cv2.cvtColor(reference_img, cv2.COLOR_BGR2HSV)
+    hsv_t = target_hsv if target_hsv is not None else cv2.cvtColor(target_img, cv2.COLOR_BGR2HSV)
 
-    # 2. 선택 채널만 추출
+    # 2. 선택 채널만 추출 (참조 모델이 있으면 캐시된 히스토그램 사용)
+    if isinstance(reference_img, ReferenceModel):
+        use_channels = reference_img.use_channels
+        roi_hist = reference_img.hist
+    else:
+        hsv_r = cv2.cvtColor(reference_img, cv2.COLOR_BGR2HSV)
+        roi_hist = _reference_hist(hsv_r, use_channels, hist_bins)
     ch_idx = list(use_channels)
-    hist_size = [hist_bins[0] if 0 in ch_idx else 1, hist_bins[1] if 1 in ch_idx else 1]
     ranges = [0, 180, 0, 256]
-    roi_hist = cv2.calcHist([hsv_r], ch_idx, None, hist_size, ranges)
-    cv2.normalize(roi_hist, roi_hist, 0, 255, cv2.NORM_MINMAX)
 
     # 3. 역투영
     dst = cv2.calcBackProject([hsv_t], ch_idx, roi_hist, ranges, 1)
@@ -106,16 +210,24 @@ def back_projection(
     mask_bool = remove_small_objects(mask_bool, min_size=min_size)
     # 반사광 마스크 적용
     if use_specular_mask:
-        hsv = cv2.cvtColor(target_img, cv2.COLOR_BGR2HSV)
+        hsv = hsv_t
         specular_mask = (hsv[:,:,2] > specular_v_thresh) & (hsv[:,:,1] < specular_s_thresh)
         mask_bool = mask_bool & (~specular_mask)
-    mask_for_bitwise = (~mask_bool).astype(np.uint8) * 255  # 반전
+    food_mask = ~mask_bool
+    if roi_mask is not None:
+        # 식판 벽/테두리 등 ROI 밖 픽셀 제외
+        mask_bool &= roi_mask
+        food_mask &= roi_mask
+    mask_for_bitwise = food_mask.astype(np.uint8) * 255  # 반전
     result_img = cv2.bitwise_and(target_img, target_img, mask=mask_for_bitwise)
 
-    # 8. 잔반 비율 계산 (검은색 픽셀 비율)
+    # 8. 잔반 비율 계산 (검은색 픽셀 비율, ROI가 있으면 ROI 픽셀 기준)
     h, w = result_img.shape[:2]
-    black_ratio = mask_bool.mean() * 100
-    return black_ratio, result_img, ~mask_bool
+    if roi_mask is not None:
+        black_ratio = np.count_nonzero(mask_bool) / max(1, np.count_nonzero(roi_mask)) * 100
+    else:
+        black_ratio = mask_bool.mean() * 100
+    return black_ratio, result_img, food_mask
 
 def preprocess_image_for_midas(img: np.ndarray) -> np.ndarray:
     """MiDaS 모델을 위한 이미지 전처리 (256x256 고정 크기)"""
@@ -128,91 +240,195 @@ def preprocess_image_for_midas(img: np.ndarray) -> np.ndarray:
     square[y:y+img.shape[0], x:x+img.shape[1]] = img
     return square
 
-def load_midas_model(device='cpu'):
+# 깊이 추정 백엔드 레지스트리 (torch.hub intel-isl/MiDaS 모델명 기준)
+# 백엔드마다 출력 깊이 스케일이 다르므로 z_plane, midas_scale.npy를 각각 캘리브레이션해야 합니다.
+# z_plane이 없는 슬롯은 tray_mask 기반으로 z_plane을 추정합니다.
+# DPT_Hybrid/MiDaS_small은 아직 z_plane 캘리브레이션 값이 없으므로 슬롯별 선택(DEPTH_BACKEND_SELECTION)에 쓸 수 없습니다.
+DEFAULT_DEPTH_BACKEND = "DPT_Large"
+DEPTH_BACKENDS = {
+    "DPT_Large": {
+        "mean": [0.5, 0.5, 0.5], "std": [0.5, 0.5, 0.5],
+        "scale_file": "midas_scale.npy",
+        "empty_depth_file": "depth_map_empty.npy",
+        "z_plane": {"side1": 0.420, "side2": 0.416, "main": 0.444, "rice": 0.350},
+    },
+    "DPT_Hybrid": {
+        "mean": [0.5, 0.5, 0.5], "std": [0.5, 0.5, 0.5],
+        "scale_file": "midas_scale_dpt_hybrid.npy",
+        "empty_depth_file": "depth_map_empty_dpt_hybrid.npy",
+        "z_plane": {},
+    },
+    "MiDaS_small": {
+        "mean": [0.485, 0.456, 0.406], "std": [0.229, 0.224, 0.225],
+        "scale_file": "midas_scale_midas_small.npy",
+        "empty_depth_file": "depth_map_empty_midas_small.npy",
+        "z_plane": {},
+    },
+}
+
+def load_midas_model(device='cpu', backend=DEFAULT_DEPTH_BACKEND):
     """MiDaS 깊이 추정 모델 로드"""
     try:
-        print("MiDaS DPT_Large 모델 로드 중...")
-        midas = torch.hub.load("intel-isl/MiDaS", "DPT_Large")
+        if backend not in DEPTH_BACKENDS:
+            raise ValueError(f"지원하지 않는 깊이 백엔드: {backend}")
+        logger.info("MiDaS %s 모델 로드 중...", backend)
+        midas = torch.hub.load("intel-isl/MiDaS", backend)
         midas.to(device)
         midas.eval()
         
         # 새로운 transform 설정 (정규화만 수행)
         midas_transform = transforms.Compose([
             transforms.ToTensor(),
-            transforms.Normalize(mean=[0.5, 0.5, 0.5], std=[0.5, 0.5, 0.5])
+            transforms.Normalize(mean=DEPTH_BACKENDS[backend]["mean"], std=DEPTH_BACKENDS[backend]["std"])
         ])
         
         return midas, midas_transform
     except Exception as e:
-        print(f"MiDaS 모델 로드 중 오류 발생: {e}")
+        logger.error("MiDaS 모델 로드 중 오류 발생: %s", e)
         return None, None
 
-def predict_depth(image, midas_model, midas_transform, device='cpu', roi_mask=None, slot_name=None):
+def has_z_plane(backend, slot_name):
+    """백엔드에 해당 슬롯의 고정 z_plane 캘리브레이션 값이 있는지"""
+    return slot_name in DEPTH_BACKENDS[backend]["z_plane"]
+
+def load_depth_backend_selection(path, default_backend=DEFAULT_DEPTH_BACKEND):
+    """
+    슬롯별 깊이 백엔드 선택 파일 로드 (app.benchmarks.depth_backends 결과)
+    z_plane 캘리브레이션이 없는 백엔드를 슬롯에 선택하면 ValueError (default_backend와 같은 선택은 허용)
+    return: {slot_name: 백엔드명}, 파일이 없으면 빈 dict
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        selection = json.load(f)
+    selection = selection.get('selection', selection)
+    unknown = set(selection.values()) - set(DEPTH_BACKENDS)
+    if unknown:
+        raise ValueError(f"지원하지 않는 깊이 백엔드: {sorted(unknown)}")
+    uncalibrated = sorted(
+        f"{slot_name}={backend}" for slot_name, backend in selection.items()
+        if backend != default_backend and not has_z_plane(backend, slot_name)
+    )
+    if uncalibrated:
+        raise ValueError(f"z_plane 캘리브레이션이 없는 슬롯 백엔드 선택: {uncalibrated} "
+                         f"(DEPTH_BACKENDS의 z_plane을 먼저 캘리브레이션해야 합니다)")
+    return selection
+
+def predict_depth(image, midas_model, midas_transform, device='cpu', roi_mask=None, slot_name=None,
+                  backend=DEFAULT_DEPTH_BACKEND, pixel_scale=1.0, native_resolution=False, slot_roi=None):
     """MiDaS로 깊이 맵 생성 및 깊이 가중치 적용"""
     if midas_model is None or midas_transform is None:
         return None, 0, None, 0, None, None
-    
-    # 이미지 변환
-    if isinstance(image, np.ndarray):
-        img = image
-    else:
-        img = np.array(image)
-    
-    # 이미지가 RGBA인 경우 RGB로 변환
-    if len(img.shape) > 2 and img.shape[2] == 4:
-        img = cv2.cvtColor(img, cv2.COLOR_RGBA2RGB)
-    
-    # 원본 이미지 크기 저장
-    original_h, original_w = img.shape[:2]
-    
-    # MiDaS 입력을 위한 전처리
-    img_proc = preprocess_image_for_midas(img)
-    input_batch = midas_transform(img_proc).unsqueeze(0)
-    
+    return predict_depth_batch([image], midas_model, midas_transform, device,
+                               roi_masks=[roi_mask], slot_names=[slot_name], backend=backend,
+                               pixel_scale=pixel_scale, native_resolution=native_resolution,
+                               slot_rois=[slot_roi])[0]
+
+def predict_depth_batch(images, midas_model, midas_transform, device='cpu', roi_masks=None, slot_names=None,
+                        backend=DEFAULT_DEPTH_BACKEND, pixel_scale=1.0, native_resolution=False, slot_rois=None,
+                        image_names=None):
+    """
+    여러 이미지를 하나의 NCHW 배치로 묶어 MiDaS 깊이 추정 후 슬롯별로 결과 분배
+    images: BGR/RGB np.ndarray 리스트 (크기는 서로 달라도 됨)
+    pixel_scale: 업로드 해상도 대비 축소 배율 (축소 디코딩 시 픽셀 면적 보정)
+    native_resolution: True이면 깊이 맵을 원본 크기로 업샘플하지 않고 MiDaS 출력 해상도에서
+                       부피 계산 (ROI 마스크를 출력 해상도로 축소하고 픽셀 면적을 보정,
+                       반환되는 depth_map/food_mask도 출력 해상도)
+    slot_rois: 이미지별 SlotRoi (있으면 부피/z_plane 계산을 유효 픽셀로 제한, 빈 식판 z_plane 사용)
+    image_names: 이미지별 이름 (volume span 속성, 여러 요청을 묶은 배치의 span을 요청별로 나눌 때 사용)
+    return: predict_depth 반환값과 동일한 튜플의 리스트
+    """
+    if midas_model is None or midas_transform is None:
+        return [(None, 0, None, 0, None, None) for _ in images]
+    if not images:
+        return []
+    roi_masks = roi_masks if roi_masks is not None else [None] * len(images)
+    slot_names = slot_names if slot_names is not None else [None] * len(images)
+    slot_rois = slot_rois if slot_rois is not None else [None] * len(images)
+    image_names = image_names if image_names is not None else [None] * len(images)
+
+    # 전처리 + forward pass (배치 전체)
+    started = tracing.start()
+    original_sizes = []
+    tensors = []
+    for image in images:
+        # 이미지 변환
+        img = image if isinstance(image, np.ndarray) else np.array(image)
+        # 이미지가 RGBA인 경우 RGB로 변환
+        if len(img.shape) > 2 and img.shape[2] == 4:
+            img = cv2.cvtColor(img, cv2.COLOR_RGBA2RGB)
+        # 원본 이미지 크기 저장
+        original_sizes.append(img.shape[:2])
+        # MiDaS 입력을 위한 전처리 (256x256 고정이므로 그대로 stack 가능)
+        tensors.append(midas_transform(preprocess_image_for_midas(img)))
+    input_batch = torch.stack(tensors)
+
     # ONNX Runtime 또는 PyTorch 모델로 예측
     if isinstance(midas_model, ort.InferenceSession):
         # ONNX Runtime 사용
         input_name = midas_model.get_inputs()[0].name
         output_name = midas_model.get_outputs()[0].name
-        # 입력 텐서를 numpy 배열로 변환
-        input_data = input_batch.numpy()
-        prediction = midas_model.run([output_name], {input_name: input_data})[0]
+        prediction = midas_model.run([output_name], {input_name: input_batch.numpy()})[0]
         prediction = torch.from_numpy(prediction)
     else:
         # PyTorch 모델 사용
         input_batch = input_batch.to(device)
         with torch.no_grad():
             prediction = midas_model(input_batch)
-    
-    # 깊이 맵 크기 조정 (더 빠른 보간법 사용)
-    prediction = torch.nn.functional.interpolate(
-        prediction.unsqueeze(1),
-        size=(original_h, original_w),
-        mode="bilinear",  # bicubic -> bilinear로 변경
-        align_corners=False,
-    ).squeeze()
-    
-    # CPU로 이동 및 넘파이 배열로 변환
-    depth_map = prediction.cpu().numpy()
-    
-    # 정규화
-    depth_min = depth_map.min()
-    depth_max = depth_map.max()
-    if depth_max - depth_min > 0:
-        depth_map = (depth_map - depth_min) / (depth_max - depth_min)
-    
-    # 깊이 맵에서 음식 부피 추정 및 깊이 가중치 적용 비율 계산
-    volume_estimate, food_mask, weighted_ratio, food_volume_cm3, z_plane, z_plane_source = estimate_volume_from_depth_with_weight(depth_map, roi_mask, slot_name)
-    
-    return depth_map, weighted_ratio, food_mask, food_volume_cm3, z_plane, z_plane_source
+    tracing.end('depth', started, backend=backend, batch=len(images))
+
+    results = []
+    for i, (original_h, original_w) in enumerate(original_sizes):
+        # 깊이 맵 후처리 + 부피 추정 (이미지별)
+        started = tracing.start()
+        roi_mask, slot_pixel_scale = roi_masks[i], pixel_scale
+        if native_resolution:
+            depth_map = prediction[i].cpu().numpy()
+            # 출력 픽셀 하나가 덮는 원본 픽셀 면적만큼 보정 (업샘플과 같은 전체 이미지 대응)
+            slot_pixel_scale = pixel_scale * np.sqrt(original_h * original_w / depth_map.size)
+            if roi_mask is not None:
+                # 면적 평균 후 반올림 = 출력 픽셀 영역의 과반이 음식이면 음식
+                roi_mask = cv2.resize(roi_mask.astype(np.uint8), depth_map.shape[::-1],
+                                      interpolation=cv2.INTER_AREA) > 0
+        else:
+            # 깊이 맵 크기 조정 (슬롯마다 원본 크기가 다르므로 개별 보간)
+            depth = torch.nn.functional.interpolate(
+                prediction[i:i+1].unsqueeze(1),
+                size=(original_h, original_w),
+                mode="bilinear",  # bicubic -> bilinear로 변경
+                align_corners=False,
+            ).squeeze()
+
+            # CPU로 이동 및 넘파이 배열로 변환
+            depth_map = depth.cpu().numpy()
+
+        # 정규화
+        depth_min = depth_map.min()
+        depth_max = depth_map.max()
+        if depth_max - depth_min > 0:
+            depth_map = (depth_map - depth_min) / (depth_max - depth_min)
+
+        # 깊이 맵에서 음식 부피 추정 및 깊이 가중치 적용 비율 계산
+        slot_roi = slot_rois[i]
+        volume_estimate, food_mask, weighted_ratio, food_volume_cm3, z_plane, z_plane_source = \
+            estimate_volume_from_depth_with_weight(
+                depth_map, roi_mask, slot_names[i], backend, slot_pixel_scale,
+                valid_mask=slot_roi.at(depth_map.shape) if slot_roi is not None else None,
+                empty_z_plane=slot_roi.z_plane_for(backend) if slot_roi is not None else None,
+            )
+        results.append((depth_map, weighted_ratio, food_mask, food_volume_cm3, z_plane, z_plane_source))
+        tracing.end('volume', started, image=image_names[i], slot=slot_names[i])
+
+    return results
 
 # 칸별 실제 크기(cm) 및 해상도
 # 배포환경용용
+# (z_plane은 깊이 백엔드마다 다르므로 DEPTH_BACKENDS에 있음)
 TRAY_SLOTS = {
-    "side1": {"w": 9.0, "h": 11.0, "nx": 724, "ny": 730, "z_plane": 0.420},
-    "side2": {"w": 9.0, "h": 11.0, "nx": 726, "ny": 730, "z_plane": 0.416},
-    "main":  {"w": 15.0, "h": 11.0, "nx": 854, "ny": 730, "z_plane": 0.444},
-    "rice":  {"w": 17.2, "h": 15.0, "nx": 1224, "ny": 998, "z_plane": 0.350},
+    "side1": {"w": 9.0, "h": 11.0, "nx": 724, "ny": 730},
+    "side2": {"w": 9.0, "h": 11.0, "nx": 726, "ny": 730},
+    "main":  {"w": 15.0, "h": 11.0, "nx": 854, "ny": 730},
+    "rice":  {"w": 17.2, "h": 15.0, "nx": 1224, "ny": 998},
     "soup":  {"w": 15.0, "h": 15.0, "nx": 1080, "ny": 998},
 }
 # 개발환경용    
@@ -224,68 +440,82 @@ TRAY_SLOTS = {
 #     "soup":  {"w": 15.0, "h": 15.0, "nx": 1777, "ny": 1716},  # 필요시 soup도 추가
 # }
 
-def estimate_volume_from_depth_with_weight(depth_map, roi_mask=None, slot_name=None):
-    print(f"[DEBUG] estimate_volume_from_depth_with_weight: slot_name={slot_name}")
+# 캘리브레이션 값(스케일, 빈 식판 z_plane, 슬롯 크기) 레지스트리
+# 파일 경로는 CALIBRATION_DIR 기준이며 워커 시작 시 configure()로 설정 (기본값: ai/ 폴더)
+CALIBRATION = CalibrationRegistry(DEPTH_BACKENDS, TRAY_SLOTS)
+
+def estimate_volume_from_depth_with_weight(depth_map, roi_mask=None, slot_name=None, backend=DEFAULT_DEPTH_BACKEND,
+                                           pixel_scale=1.0, valid_mask=None, empty_z_plane=None):
+    """
+    valid_mask: 키오스크 슬롯 ROI (있으면 ROI 밖 픽셀은 음식/트레이 어디에도 포함하지 않음)
+    empty_z_plane: 키오스크별 빈 식판 z_plane (tray_mask가 부족할 때 캘리브레이션 값보다 우선)
+    """
+    logger.debug("estimate_volume_from_depth_with_weight: slot_name=%s", slot_name, extra=sampled())
     if roi_mask is None or roi_mask.mean() < 0.01:
         return estimate_volume_from_depth_with_weight_old(depth_map)
 
-    # 1. food_mask 보강 (팽창)
-    food_mask = roi_mask.astype(np.uint8)
-    food_mask = food_mask > 0
-
-    # 2. z_plane 계산 안정화 (음식 주변 5px 제외)
-    tray_mask = ~food_mask.astype(bool)
-
-    # 음식/트레이 영역별 복사본 생성
-    depth_tray = depth_map.copy()
-    depth_food = depth_map.copy()
-    depth_food[~food_mask] = np.nan  # 음식 마스크가 True인 부분만 남김
-    depth_tray[food_mask] = np.nan
+    # 1. food_mask (bool 마스크는 그대로 사용해 전체 크기 변환을 생략)
+    food_mask = roi_mask if roi_mask.dtype == bool else roi_mask.astype(np.uint8) > 0
+    if valid_mask is not None:
+        food_mask = food_mask & valid_mask
+        tray_mask = valid_mask & ~food_mask
+        tray_count, tray_total = np.count_nonzero(tray_mask), np.count_nonzero(valid_mask)
+    else:
+        tray_mask = None
+        tray_count, tray_total = food_mask.size - np.count_nonzero(food_mask), food_mask.size
 
-    # 트레이 평균 깊이(z_plane) 계산 보강
-    if slot_name in TRAY_SLOTS and "z_plane" in TRAY_SLOTS[slot_name]:
-        z_plane = TRAY_SLOTS[slot_name]["z_plane"]
+    # 트레이 평균 깊이(z_plane) 계산 보강 (캘리브레이션 값은 레지스트리에 캐시됨)
+    # 음식/트레이 영역별 NaN 복사본 대신 트레이 픽셀만 모아 평균 (기존 nanmean과 같은 합산 순서)
+    calibration = CALIBRATION.get(backend)
+    slots = calibration.slots
+    if slot_name in slots and slot_name in calibration.z_plane:
+        z_plane = calibration.z_plane[slot_name]
         z_plane_source = 'fixed_empty'
-    elif np.sum(tray_mask) > 0.05 * tray_mask.size:
-        z_plane = np.nanmean(depth_tray[tray_mask])
+    elif tray_count > 0.05 * tray_total:
+        z_plane = np.nanmean(depth_map[tray_mask if tray_mask is not None else ~food_mask])
         z_plane_source = 'tray_mask'
+    elif empty_z_plane is not None:
+        z_plane = empty_z_plane
+        z_plane_source = 'kiosk_empty'
+    elif calibration.empty_z_plane is not None:
+        z_plane = calibration.empty_z_plane
+        z_plane_source = 'empty_plate'
     else:
-        try:
-            depth_map_empty = np.load('ai/depth_map_empty.npy')
-            z_plane = np.nanmean(depth_map_empty)
-            z_plane_source = 'empty_plate'
-        except Exception:
-            z_plane = np.nanmean(depth_tray)
-            z_plane_source = 'fallback'
+        # 드문 경로: 기존과 같은 결과를 위해 음식 영역을 NaN으로 둔 전체 배열 평균
+        tray = tray_mask if tray_mask is not None else ~food_mask
+        z_plane = np.nanmean(np.where(tray, depth_map, np.nan))
+        z_plane_source = 'fallback'
 
-    # ΔZ (음식 높이)
-    dz = np.maximum(0, depth_map - z_plane)
+    # 2. ΔZ(cm)는 음식 픽셀에서만 계산 (임시 배열 하나에 제자리 연산)
+    scale_cm_per_unit = calibration.scale_cm_per_unit  # 파일이 없으면 3.0 (기존 H_CM, 시작 시 경고)
+    dz_cm = depth_map[food_mask]
+    dz_cm -= z_plane
+    np.maximum(dz_cm, 0, out=dz_cm)  # ΔZ (음식 높이)
+    dz_cm *= scale_cm_per_unit
+    dz_cm *= 2  # 음식 깊이 80배로 반영
 
     # 3. ΔZ(cm) 컷오프 적용
-    try:
-        scale_cm_per_unit = np.load('midas_scale.npy')
-    except Exception:
-        scale_cm_per_unit = 3.0  # fallback: 기존 H_CM
-    dz_cm = dz * scale_cm_per_unit * 2 # 음식 깊이 80배로 반영
     dz_cutoff = 0.002  # 0.002cm 이상만 음식으로 인정 (하한)
     dz_upper = 3.0   # 2.0cm 이하만 음식으로 인정 (상한, 필요시 조정)
-    # 음식 마스크가 True인 부분만 부피 계산
-    food_mask_final = food_mask & ((dz_cm > dz_cutoff) & (dz_cm < dz_upper))
+    valid = (dz_cm > dz_cutoff) & (dz_cm < dz_upper)
+    food_mask_final = np.zeros(food_mask.shape, dtype=bool)
+    food_mask_final[food_mask] = valid
 
-    # 평균 높이 (dz_cm>0 영역)
-    valid_h = dz_cm[food_mask_final]
+    # 평균 높이 (컷오프 범위 영역)
+    valid_h = dz_cm[valid]
     avg_h_cm = np.nanmean(valid_h) if valid_h.size else 0
 
     # slot_name에 따라 W_CM, L_CM, NX, NY 적용
-    if slot_name in TRAY_SLOTS:
-        slot = TRAY_SLOTS[slot_name]
+    if slot_name in slots:
+        slot = slots[slot_name]
         W_CM, L_CM = slot["w"], slot["h"]
         NX, NY = slot["nx"], slot["ny"]
     else:
         W_CM, L_CM, NX, NY = 37.5, 29.0, 2592, 1944  # 전체 식판 기본값
     H_CM = 3.0
     PIX_AREA = (W_CM / NX) * (L_CM / NY)
-    food_pixel_count = np.sum(food_mask_final)
+    # NX, NY는 업로드 해상도 기준이므로 축소 디코딩한 이미지는 픽셀 수를 업로드 해상도로 환산
+    food_pixel_count = np.sum(valid) * pixel_scale ** 2
     food_area_cm2 = food_pixel_count * PIX_AREA
     food_volume_cm3 = food_area_cm2 * avg_h_cm * 30
 
@@ -293,41 +523,44 @@ def estimate_volume_from_depth_with_weight(depth_map, roi_mask=None, slot_name=N
     volume_pct = min(60, (food_pixel_count / (NX*NY)) * (avg_h_cm / H_CM) * 100)
     return volume_pct, food_mask_final, volume_pct, food_volume_cm3, z_plane, z_plane_source
 
+def otsu_depth_threshold(depth_map, bins=256):
+    """
+    깊이 값 히스토그램의 Otsu 임계값 (1차원 2-클러스터 k-means의 전역 최적해와 동일한 기준)
+    히스토그램 한 번(O(pixels)) + 빈 단위 계산이므로 난수 시드와 무관하게 결정적
+    return: (임계값, 임계값 이하 픽셀 비율) — 값이 모두 같으면 (값, 1.0)
+    """
+    depth = np.asarray(depth_map, dtype=np.float32)
+    lo, hi = float(depth.min()), float(depth.max())
+    if not hi > lo:
+        return lo, 1.0
+    # calcHist 범위 상한은 제외값이므로 최댓값 바로 다음 float32까지
+    hi = float(np.nextafter(np.float32(hi), np.float32(np.inf)))
+    hist = cv2.calcHist([depth], [0], None, [bins], [lo, hi]).ravel().astype(np.float64)
+    edges = np.linspace(lo, hi, bins + 1)
+    centers = (edges[:-1] + edges[1:]) / 2
+
+    # 빈 경계 t마다 하위/상위 클래스 가중치와 평균 → 클래스 간 분산 최대인 경계 선택
+    w0 = np.cumsum(hist)[:-1]
+    w1 = hist.sum() - w0
+    m0 = np.cumsum(hist * centers)[:-1]
+    m1 = (hist * centers).sum() - m0
+    valid = (w0 > 0) & (w1 > 0)
+    between = np.zeros_like(w0)
+    between[valid] = w0[valid] * w1[valid] * (m0[valid] / w0[valid] - m1[valid] / w1[valid]) ** 2
+    t = int(np.argmax(between))
+    return float(edges[t + 1]), float(w0[t] / hist.sum())
+
 def estimate_volume_from_depth_with_weight_old(depth_map):
-    """기존 K-means 기반 부피 추정 방식 (fallback용)"""
-    # 깊이 맵을 1차원 배열로 변환
-    depth_flat = depth_map.flatten().reshape(-1, 1).astype(np.float32)
-    
-    # K-means 클러스터링으로 깊이 값을 2개 그룹으로 분류
-    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
-    _, labels, centers = cv2.kmeans(depth_flat, 2, None, criteria, 10, cv2.KMEANS_RANDOM_CENTERS)
-    
-    # 두 클러스터의 중심값 확인
-    center_0 = centers[0][0]
-    center_1 = centers[1][0]
-    
-    # 클러스터 크기 계산
-    cluster_0_size = np.sum(labels == 0)
-    cluster_1_size = np.sum(labels == 1)
-    cluster_0_ratio = cluster_0_size / len(labels)
-    cluster_1_ratio = cluster_1_size / len(labels)
-    
+    """기존 2-클러스터 깊이 분할 기반 부피 추정 방식 (fallback용, K-means 대신 Otsu 임계값)"""
+    # 깊이 값을 임계값 기준 2개 그룹으로 분류 (하위 그룹 = 기존 K-means의 작은 중심 클러스터)
+    threshold, low_ratio = otsu_depth_threshold(depth_map)
+
     # 음식 클러스터 선택
     MIN_CLUSTER_RATIO = 0.05
-    if center_0 < center_1:
-        if cluster_0_ratio > MIN_CLUSTER_RATIO:
-            food_cluster = 0
-        else:
-            food_cluster = 1
+    if low_ratio > MIN_CLUSTER_RATIO:
+        food_mask = depth_map < threshold
     else:
-        if cluster_1_ratio > MIN_CLUSTER_RATIO:
-            food_cluster = 1
-        else:
-            food_cluster = 0
-    
-    # 마스크 생성
-    labels = labels.reshape(depth_map.shape)
-    food_mask = labels == food_cluster
+        food_mask = depth_map >= threshold
     
     # 마스크 정제
     kernel = np.ones((5, 5), np.uint8)
@@ -336,12 +569,8 @@ def estimate_volume_from_depth_with_weight_old(depth_map):
     food_mask = cv2.morphologyEx(food_mask, cv2.MORPH_OPEN, kernel)
     food_mask = food_mask > 0
     
-    # 음식 영역의 깊이 통계 계산
-    masked_depth = depth_map.copy()
-    masked_depth[~food_mask] = np.nan
-    
-    # 평균 깊이 계산
-    avg_depth = np.nanmean(masked_depth) if np.sum(food_mask) > 0 else 0
+    # 음식 영역의 평균 깊이 계산
+    avg_depth = np.nanmean(depth_map[food_mask]) if np.sum(food_mask) > 0 else 0
     
     # 음식 영역 비율
     food_ratio = np.sum(food_mask) / depth_map.size
@@ -360,7 +589,7 @@ def load_resnet_model(weights_path, device='cpu'):
         # 절대 경로로 변환
         abs_weights_path = os.path.abspath(weights_path)
         if not os.path.exists(abs_weights_path):
-            print(f"가중치 파일을 찾을 수 없습니다: {abs_weights_path}")
+            logger.error("가중치 파일을 찾을 수 없습니다: %s", abs_weights_path)
             raise FileNotFoundError(f"가중치 파일을 찾을 수 없습니다: {abs_weights_path}")
             
         checkpoint = torch.load(abs_weights_path, map_location=device, weights_only=False)
@@ -373,10 +602,10 @@ def load_resnet_model(weights_path, device='cpu'):
         
         return model
     except Exception as e:
-        print(f"ResNet 모델 로드 중 오류 발생: {e}")
+        logger.error("ResNet 모델 로드 중 오류 발생: %s", e)
         # 오류 발생 시 응급 처치로 사전 훈련된 모델 사용
         try:
-            print("사전 훈련된 ResNet50 모델을 대체로 사용합니다...")
+            logger.warning("사전 훈련된 ResNet50 모델을 대체로 사용합니다...")
             model = models.resnet50(weights=models.ResNet50_Weights.DEFAULT)
             # 마지막 레이어 수정 (5개 클래스: Q1-Q5)
             num_ftrs = model.fc.in_features
@@ -385,37 +614,55 @@ def load_resnet_model(weights_path, device='cpu'):
             model.eval()
             return model
         except Exception as e2:
-            print(f"대체 모델 로드 실패: {e2}")
+            logger.error("대체 모델 로드 실패: %s", e2)
             return None
 
+# ResNet 입력 전처리 (224x224 고정)
+RESNET_PREPROCESS = transforms.Compose([
+    transforms.Resize(256),
+    transforms.CenterCrop(224),
+    transforms.ToTensor(),
+    transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+])
+
+# 클래스 이름과 새로운 스케일 (Q1:10%, Q2:30%, Q3:50%, Q4:70%, Q5:90%)
+RESNET_CLASS_NAMES = ['Q1', 'Q2', 'Q3', 'Q4', 'Q5']
+RESNET_PERCENTAGE = {
+    'Q1': 10.0,
+    'Q2': 30.0,
+    'Q3': 50.0,
+    'Q4': 70.0,
+    'Q5': 90.0
+}
+
 def predict_resnet(image, model, device='cpu'):
     """ResNet 모델로 음식량 예측"""
     if model is None:
         return None, None, None
-    
-    # 이미지 전처리
-    preprocess = transforms.Compose([
-        transforms.Resize(256),
-        transforms.CenterCrop(224),
-        transforms.ToTensor(),
-        transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
-    ])
-    
-    # PIL 이미지로 변환
-    if isinstance(image, np.ndarray):
-        image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-    
-    # 텐서로 변환
-    img_tensor = preprocess(image).unsqueeze(0)
-    
+    return predict_resnet_batch([image], model, device)[0]
+
+def predict_resnet_batch(images, model, device='cpu'):
+    """여러 이미지를 하나의 NCHW 배치로 묶어 ResNet 음식량 예측"""
+    if model is None:
+        return [(None, None, None) for _ in images]
+    if not images:
+        return []
+
+    started = tracing.start()
+    # 이미지 전처리 (PIL 이미지로 변환 후 텐서로)
+    tensors = []
+    for image in images:
+        if isinstance(image, np.ndarray):
+            image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        tensors.append(RESNET_PREPROCESS(image))
+    img_tensor = torch.stack(tensors)
+
     # ONNX Runtime 또는 PyTorch 모델로 예측
     if isinstance(model, ort.InferenceSession):
-        # ONNX Runtime 사용
+        # ONNX Runtime 사용 (convert_to_onnx에서 batch_size 축을 동적으로 export)
         input_name = model.get_inputs()[0].name
         output_name = model.get_outputs()[0].name
-        # 입력 텐서를 numpy 배열로 변환
-        input_data = img_tensor.numpy()
-        outputs = model.run([output_name], {input_name: input_data})[0]
+        outputs = model.run([output_name], {input_name: img_tensor.numpy()})[0]
         probs = F.softmax(torch.from_numpy(outputs), dim=1)
     else:
         # PyTorch 모델 사용
@@ -423,26 +670,16 @@ def predict_resnet(image, model, device='cpu'):
         with torch.no_grad():
             outputs = model(img_tensor)
             probs = F.softmax(outputs, dim=1)
-    
+
     # 결과 추출
-    probs = probs.cpu().numpy().squeeze()
-    class_idx = np.argmax(probs)
-    
-    # 클래스 이름과 확률
-    class_names = ['Q1', 'Q2', 'Q3', 'Q4', 'Q5']
-    class_name = class_names[class_idx]
-    
-    # 새로운 스케일로 변환 (Q1:10%, Q2:30%, Q3:50%, Q4:70%, Q5:90%)
-    resnet_percentage = {
-        'Q1': 10.0,
-        'Q2': 30.0,
-        'Q3': 50.0,
-        'Q4': 70.0,
-        'Q5': 90.0
-    }
-    percentage = resnet_percentage[class_name]
-    
-    return class_name, probs[class_idx], percentage
+    probs = probs.cpu().numpy()
+    results = []
+    for row in probs:
+        class_idx = np.argmax(row)
+        class_name = RESNET_CLASS_NAMES[class_idx]
+        results.append((class_name, row[class_idx], RESNET_PERCENTAGE[class_name]))
+    tracing.end('resnet', started, batch=len(images))
+    return results
 
 # 새로운 가중치 조정 함수
 def adjust_weights(backproj_result, resnet_result=None):
@@ -467,6 +704,13 @@ def adjust_weights(backproj_result, resnet_result=None):
     # 3. 기본 가중치
     return (0.5, 0.3, 0.2)
 
+def backproj_decides(backproj_result):
+    """
+    역투영 결과만으로 가중치가 (1.0, 0.0, 0.0)으로 확정되는지 여부
+    True이면 MiDaS/ResNet 결과가 최종 결과에 반영되지 않으므로 추론을 생략할 수 있습니다.
+    """
+    return adjust_weights(backproj_result) == (1.0, 0.0, 0.0)
+
 # 새로운 결과 융합 함수
 def combine_results_custom(backproj_result, midas_result, resnet_result, weights):
     """
@@ -475,7 +719,7 @@ def combine_results_custom(backproj_result, midas_result, resnet_result, weights
     Args:
         backproj_result: 역투영 결과 (검은색 픽셀 비율 %)
         midas_result: MiDaS 결과 (볼륨 추정값)
-        resnet_result: ResNet 결과 (클래스, 확률, 백분율)
+        resnet_result: ResNet 결과 (클래스, 확률, 백분율), 추론을 생략한 경우 None
         weights: 각 모델의 가중치 (역투영, MiDaS, ResNet)
     
     Returns:
@@ -487,8 +731,11 @@ def combine_results_custom(backproj_result, midas_result, resnet_result, weights
     w_sum = sum(weights)
     w_backproj, w_midas, w_resnet = [w/w_sum for w in weights]
     
-    # ResNet 결과 추출
-    resnet_class, resnet_prob, resnet_percentage = resnet_result
+    # ResNet 결과 추출 (생략된 경우 가중치 0이므로 값은 사용되지 않음)
+    if resnet_result is not None:
+        resnet_class, resnet_prob, resnet_percentage = resnet_result
+    else:
+        resnet_class, resnet_prob, resnet_percentage = None, None, 0.0
     
     # 역투영 결과 정규화 (0-100%)
     backproj_score = 100 - backproj_result
@@ -506,7 +753,7 @@ def combine_results_custom(backproj_result, midas_result, resnet_result, weights
     score_diffs = [
         abs(backproj_score - weighted_percentage),
         abs(midas_percentage - weighted_percentage) if w_midas > 0 else 0,
-        abs(resnet_percentage - weighted_percentage)
+        abs(resnet_percentage - weighted_percentage) if resnet_result is not None else 0
     ]
     score_diffs = [diff for diff in score_diffs if diff != 0]  # 0 가중치 모델은 제외
     avg_diff = sum(score_diffs) / len(score_diffs) if score_diffs else 0
@@ -559,10 +806,7 @@ def visualize_results_custom(image, backproj_img, depth_map, depth_mask,
         depth_colored = (depth_colored * 255).astype(np.uint8)
 
         # ΔZ(깊이차) 맵 시각화 (viridis 컬러맵)
-        try:
-            scale_cm_per_unit = np.load('midas_scale.npy')
-        except Exception:
-            scale_cm_per_unit = 3.0  # fallback, 실제론 np.load('midas_scale.npy') 사용 가능
+        scale_cm_per_unit = CALIBRATION.get(DEFAULT_DEPTH_BACKEND).scale_cm_per_unit
         dz = norm_depth_map * scale_cm_per_unit
         dz_vis = dz * 10  # 시각화용 10배
 
@@ -651,60 +895,90 @@ def extract_slot_name(image_name):
         return match.group(1).replace('_', '').lower()
     return None
 
-# 메인 분석 함수
-def analyze_food_image_custom(target_image_path, reference_image_path, 
-                             resnet_model, midas_model, midas_transform,
-                             output_dir='./results', image_name=None):
+def _load_image(image_or_path):
+    """경로 또는 np.ndarray를 BGR 이미지로 반환"""
+    if isinstance(image_or_path, str):
+        return cv2.imread(image_or_path)
+    return image_or_path
+
+def _scaled_min_size(min_size, scale):
+    """업로드 해상도 기준 최소 객체 크기(px)를 축소 배율에 맞게 환산"""
+    return max(1, int(round(min_size / scale ** 2)))
+
+def _backproj_stage(target_img, reference_img, image_name=None, pixel_scale=1.0, backproj_max_side=0,
+                    slot_rois=None):
     """
-    세 모델을 사용하여 음식 이미지 분석 (사용자 정의 방식)
+    1단계: 역투영 분석 및 상대 부피 계산
+    pixel_scale: 업로드 해상도 대비 입력 이미지 축소 배율
+    backproj_max_side: 역투영 작업 해상도 (긴 변 최대 px, 0이면 입력 해상도)
+    slot_rois: {slot_name: SlotRoi} 키오스크 슬롯 ROI (있으면 ROI 외접 영역만 역투영)
     """
-    # 결과 디렉토리 생성
-    # os.makedirs(output_dir, exist_ok=True)
-    
-    # 이미지 로드
-    if isinstance(target_image_path, str):
-        target_img = cv2.imread(target_image_path)
-    else:
-        target_img = target_image_path
-        
-    if isinstance(reference_image_path, str):
-        reference_img = cv2.imread(reference_image_path)
-    else:
-        reference_img = reference_image_path
-    
-    if target_img is None or reference_img is None:
-        return None
-    
-    # 1. 역투영 분석
-    backproj_result, backproj_img, food_mask = back_projection(target_img, reference_img)
-    # 참조 이미지(가득 찬 상태)에서 음식 마스크 추출
-    _, _, ref_food_mask = back_projection(reference_img, reference_img)
-    ref_food_pixel_count = np.sum(ref_food_mask)
-    cur_food_pixel_count = np.sum(food_mask)
+    # 참조 히스토그램과 참조 음식 마스크 픽셀 수는 캐시된 ReferenceModel에서 재사용
+    reference = get_reference_model(reference_img, min_size=_scaled_min_size(500, pixel_scale))
+    slot_name = extract_slot_name(image_name) if image_name else None
+    slot_roi = (slot_rois or {}).get(slot_name)
+
+    # ROI 외접 영역으로 crop (식판 벽/테두리는 처리하지 않음)
+    h, w = target_img.shape[:2]
+    crop_img, valid = target_img, None
+    if slot_roi is not None:
+        y0, y1, x0, x1 = slot_roi.bbox((h, w))
+        crop_img = target_img[y0:y1, x0:x1]
+        valid = slot_roi.at((h, w))[y0:y1, x0:x1]
+
+    # 역투영 작업 해상도로 축소 (히스토그램 역투영 비율은 해상도와 무관)
+    ch, cw = crop_img.shape[:2]
+    work_scale = max(ch, cw) / backproj_max_side if backproj_max_side and max(ch, cw) > backproj_max_side else 1.0
+    work_img, work_valid = crop_img, valid
+    if work_scale > 1.0:
+        work_size = (round(cw / work_scale), round(ch / work_scale))
+        work_img = cv2.resize(crop_img, work_size, interpolation=cv2.INTER_AREA)
+        if valid is not None:
+            work_valid = cv2.resize(valid.astype(np.uint8), work_size, interpolation=cv2.INTER_NEAREST).astype(bool)
+    backproj_result, backproj_img, food_mask = back_projection(
+        work_img, reference, min_size=_scaled_min_size(500, pixel_scale * work_scale), roi_mask=work_valid
+    )
+    ref_food_pixel_count = reference.food_pixel_count
+    # 작업 해상도 픽셀 수를 입력 해상도 픽셀 수로 환산 (참조 모델은 입력 해상도 기준)
+    cur_food_pixel_count = np.sum(food_mask) * (ch * cw) / food_mask.size
+    if work_scale > 1.0:
+        # 깊이 추정 ROI는 입력 해상도 마스크 사용
+        food_mask = cv2.resize(food_mask.astype(np.uint8), (cw, ch), interpolation=cv2.INTER_NEAREST).astype(bool)
+        if valid is not None:
+            food_mask &= valid
+    if slot_roi is not None:
+        full_mask = np.zeros((h, w), dtype=bool)
+        full_mask[y0:y1, x0:x1] = food_mask
+        food_mask = full_mask
     # 상대 부피(%) 계산
     relative_volume_pct = (cur_food_pixel_count / ref_food_pixel_count) * 100 if ref_food_pixel_count > 0 else 0
-    
-    # slot_name 추출
-    slot_name = extract_slot_name(image_name) if image_name else None
-    
-    # 2. MiDaS 깊이 분석
-    if midas_model is not None and midas_transform is not None:
-        depth_map, midas_result, depth_mask, food_volume_cm3, z_plane, z_plane_source = predict_depth(target_img, midas_model, midas_transform, roi_mask=food_mask, slot_name=slot_name)
-    else:
-        depth_map, midas_result, depth_mask, food_volume_cm3, z_plane, z_plane_source = None, 0, None, 0, None, None
-    
-    # 3. ResNet 분류
-    if resnet_model is not None:
-        resnet_result = predict_resnet(target_img, resnet_model)
-    else:
-        resnet_result = ('Q3', 0.5, 50.0)  # 기본값
-    
+
+    return {
+        'target_img': target_img,
+        'reference_model': reference,
+        'backproj_result': backproj_result,
+        'backproj_img': backproj_img,
+        'food_mask': food_mask,
+        'relative_volume_pct': relative_volume_pct,
+        # slot_name 추출
+        'image_name': image_name,
+        'slot_name': slot_name,
+        'slot_roi': slot_roi,
+        # 분기별 실행 여부 ('run', 'skipped', 'unavailable')
+        'trace': {'backproj': 'run'},
+    }
+
+def _fuse_stage(target_image_path, stage, depth_result, resnet_result):
+    """4~5단계: 가중치 조정 및 결과 융합"""
+    backproj_result = stage['backproj_result']
+    depth_map, midas_result, depth_mask, food_volume_cm3, z_plane, z_plane_source = depth_result
+
     # 4. 역투영 결과에 따라 가중치 조정
     weights = adjust_weights(backproj_result, resnet_result)
-    
+
     # 5. 결과 융합
     final_result = combine_results_custom(backproj_result, midas_result, resnet_result, weights)
-    
+
     # 6. 결과 시각화 (주석 처리)
     # try:
     #     if image_name is not None:
@@ -716,7 +990,7 @@ def analyze_food_image_custom(target_image_path, reference_image_path,
     #         img_base = "uploaded_image"
     # except Exception:
     #     img_base = "uploaded_image"
-    
+
     # 시각화 결과 저장 (주석 처리)
     # viz_path = os.path.join(output_dir, f"{img_base}_analysis.png")
     # visualize_results_custom(
@@ -725,11 +999,12 @@ def analyze_food_image_custom(target_image_path, reference_image_path,
     #     final_result, weights, viz_path, food_volume_cm3, relative_volume_pct,
     #     z_plane=z_plane, z_plane_source=z_plane_source
     # )
-    
+
     # 결과 정리
     final_percentage, confidence, details = final_result
-    result_dict = {
-        'image_path': target_image_path,
+    return {
+        # ndarray 입력이면 이미지 전체를 결과로 되돌려 보내지 않도록 이름만 기록
+        'image_path': target_image_path if isinstance(target_image_path, str) else stage['image_name'],
         'backproj_result': backproj_result,
         'backproj_percentage': details['backproj_percentage'],
         'midas_result': midas_result,
@@ -740,10 +1015,153 @@ def analyze_food_image_custom(target_image_path, reference_image_path,
         'confidence': confidence,
         'details': details,
         'food_volume_cm3': food_volume_cm3,
-        'relative_volume_pct': relative_volume_pct
+        'relative_volume_pct': stage['relative_volume_pct'],
+        'trace': stage['trace'],
+        # 같은 참조 이미지로 다시 분석할 때 전달할 수 있는 역투영 참조 모델
+        'reference_model': stage['reference_model']
     }
-    
-    return result_dict
+
+# 메인 분석 함수
+def analyze_food_image_custom(target_image_path, reference_image_path, 
+                             resnet_model, midas_model, midas_transform,
+                             output_dir='./results', image_name=None,
+                             depth_backend=DEFAULT_DEPTH_BACKEND, lazy=False,
+                             pixel_scale=1.0, backproj_max_side=0, native_depth=False, slot_rois=None):
+    """
+    세 모델을 사용하여 음식 이미지 분석 (사용자 정의 방식)
+    """
+    return analyze_food_images_batch(
+        [(target_image_path, reference_image_path, image_name)],
+        resnet_model, midas_model, midas_transform,
+        output_dir=output_dir,
+        depth_backend=depth_backend,
+        lazy=lazy,
+        pixel_scale=pixel_scale,
+        backproj_max_side=backproj_max_side,
+        native_depth=native_depth,
+        slot_rois=slot_rois,
+    )[0]
+
+def analyze_food_images_batch(jobs, resnet_model, midas_model, midas_transform,
+                              output_dir='./results', depth_backend=DEFAULT_DEPTH_BACKEND,
+                              depth_models=None, slot_backends=None, lazy=False,
+                              pixel_scale=1.0, backproj_max_side=0, native_depth=False, slot_rois=None):
+    """
+    여러 슬롯 이미지를 한 번에 분석
+    역투영은 슬롯별로 수행하고, MiDaS/ResNet은 모든 슬롯을 하나의 배치로 묶어
+    단일 forward pass로 추론한 뒤 결과를 슬롯별로 다시 분배합니다.
+    jobs: (target_image_path, reference_image_path, image_name) 튜플 리스트
+    depth_models: {백엔드명: (midas_model, midas_transform)} (없으면 midas_model을 depth_backend로 사용)
+    slot_backends: {slot_name: 백엔드명} 슬롯별 깊이 백엔드 선택 (없는 슬롯은 depth_backend)
+    lazy: True이면 역투영 결과만으로 가중치가 확정되는 슬롯은 MiDaS/ResNet 추론을 생략
+          (생략된 분기는 결과의 trace에 'skipped'로 기록되고 resnet_result는 None)
+          job별로 다르면 jobs와 같은 길이의 bool 리스트 (여러 요청을 묶은 마이크로 배치)
+    pixel_scale: 업로드 해상도 대비 입력 이미지 축소 배율 (축소 디코딩 시 2, 4, 8)
+                 최소 객체 크기와 부피 계산의 픽셀 면적을 업로드 해상도 기준으로 보정
+    backproj_max_side: 역투영 작업 해상도 (긴 변 최대 px, 0이면 입력 해상도 그대로)
+    native_depth: True이면 깊이 맵을 업샘플하지 않고 MiDaS 출력 해상도에서 부피 계산
+    slot_rois: {slot_name: SlotRoi} 키오스크별 사전 계산 슬롯 ROI (있는 슬롯은 역투영/부피를 ROI로 제한)
+    return: jobs와 같은 순서의 결과 dict 리스트 (이미지 로드 실패 시 None)
+    """
+    # 결과 디렉토리 생성
+    # os.makedirs(output_dir, exist_ok=True)
+    stages = backproj_stages(jobs, pixel_scale, backproj_max_side, slot_rois, lazy)
+    depth_results, resnet_results = model_stages(
+        stages, resnet_model,
+        depth_models if depth_models is not None else {depth_backend: (midas_model, midas_transform)},
+        depth_backend=depth_backend, slot_backends=slot_backends,
+        pixel_scale=pixel_scale, native_depth=native_depth,
+    )
+    return fuse_stages([job[0] for job in jobs], stages, depth_results, resnet_results)
+
+def backproj_stages(jobs, pixel_scale=1.0, backproj_max_side=0, slot_rois=None, lazy=False):
+    """
+    1단계: 이미지 로드 및 역투영 (OpenCV만 사용하므로 스레드 풀에서 실행 가능)
+    lazy인 슬롯 중 역투영만으로 결과가 확정되는 슬롯은 trace에 MiDaS/ResNet 'skipped' 표시
+    return: jobs와 같은 순서의 stage dict 리스트 (이미지 로드 실패 시 None)
+    """
+    stages = []
+    for target_image_path, reference_image_path, image_name in jobs:
+        target_img = _load_image(target_image_path)
+        reference_img = _load_image(reference_image_path)
+        if target_img is None or reference_img is None:
+            stages.append(None)
+        else:
+            with tracing.span('backproj', image=image_name, slot=extract_slot_name(image_name) if image_name else None):
+                stages.append(_backproj_stage(target_img, reference_img, image_name, pixel_scale,
+                                              backproj_max_side, slot_rois))
+
+    # 역투영만으로 결과가 확정되는 슬롯은 신경망 추론 대상에서 제외
+    if lazy:
+        lazy_flags = lazy if isinstance(lazy, (list, tuple)) else [lazy] * len(jobs)
+        for stage, flag in zip(stages, lazy_flags):
+            if stage is not None and flag and backproj_decides(stage['backproj_result']):
+                stage['trace'].update(midas='skipped', resnet='skipped')
+    return stages
+
+def model_stages(stages, resnet_model, depth_models, depth_backend=DEFAULT_DEPTH_BACKEND, slot_backends=None,
+                 pixel_scale=1.0, native_depth=False):
+    """
+    2~3단계: MiDaS 깊이 분석(백엔드별 배치)과 ResNet 분류(배치)
+    stages: 'target_img', 'food_mask', 'slot_name', 'slot_roi', 'trace'(, 'image_name')가 있는 dict 리스트 (None은 건너뜀)
+    depth_models: {백엔드명: (midas_model, midas_transform)}
+    return: ({stage 인덱스: 깊이 결과}, {stage 인덱스: ResNet 결과})
+    """
+    slot_backends = slot_backends or {}
+    valid = [
+        i for i, stage in enumerate(stages)
+        if stage is not None and stage['trace'].get('midas') != 'skipped'
+    ]
+
+    # 2. MiDaS 깊이 분석 (백엔드별 배치)
+    groups = {}
+    for i in valid:
+        backend = slot_backends.get(stages[i]['slot_name'], depth_backend)
+        if backend not in depth_models:
+            backend = depth_backend
+        groups.setdefault(backend, []).append(i)
+    depth_results = {}
+    for backend, indices in groups.items():
+        model, transform = depth_models.get(backend, (None, None))
+        if model is None or transform is None:
+            continue
+        batch = predict_depth_batch(
+            [stages[i]['target_img'] for i in indices], model, transform,
+            roi_masks=[stages[i]['food_mask'] for i in indices],
+            slot_names=[stages[i]['slot_name'] for i in indices],
+            backend=backend,
+            pixel_scale=pixel_scale,
+            native_resolution=native_depth,
+            slot_rois=[stages[i]['slot_roi'] for i in indices],
+            image_names=[stages[i].get('image_name') for i in indices],
+        )
+        depth_results.update(zip(indices, batch))
+
+    # 3. ResNet 분류 (배치)
+    resnet_results = {}
+    if resnet_model is not None and valid:
+        batch = predict_resnet_batch([stages[i]['target_img'] for i in valid], resnet_model)
+        resnet_results = dict(zip(valid, batch))
+    return depth_results, resnet_results
+
+def fuse_stages(target_image_paths, stages, depth_results, resnet_results):
+    """4~5단계: 슬롯별 가중치 조정 및 결과 융합 (model_stages 결과가 없는 슬롯은 기본값)"""
+    results = []
+    for i, (target_image_path, stage) in enumerate(zip(target_image_paths, stages)):
+        if stage is None:
+            results.append(None)
+            continue
+        trace = stage['trace']
+        depth_result = depth_results.get(i, (None, 0, None, 0, None, None))
+        if trace.get('resnet') == 'skipped':
+            resnet_result = None
+        else:
+            resnet_result = resnet_results.get(i, ('Q3', 0.5, 50.0))  # 기본값
+            trace.setdefault('midas', 'run' if i in depth_results else 'unavailable')
+            trace.setdefault('resnet', 'run' if i in resnet_results else 'unavailable')
+        with tracing.span('fusion', image=stage['image_name'], slot=stage['slot_name']):
+            results.append(_fuse_stage(target_image_path, stage, depth_result, resnet_result))
+    return results
 
 # 메인 함수
 def main():
@@ -755,6 +1173,7 @@ def main():
     parser.add_argument('--no-midas', action='store_true', help='MiDaS 모델 사용 안함')
     
     args = parser.parse_args()
+    seed_everything()
     
     # 장치 설정
     device = torch.device("cpu")
@@ -0,0 +1,360 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from .http_client import ImageHttpClient
+
+Decoder = Callable[[bytes], Optional[np.ndarray]]
+
+
+def content_digest(content: bytes) -> str:
+    """이미지 원본 바이트의 내용 해시"""
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def _url_digest(url: str) -> str:
+    return hashlib.blake2b(url.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _write_atomic(path: str, write: Callable[[Any], None]):
+    """임시 파일에 쓴 뒤 교체 (여러 프로세스가 같은 파일을 써도 깨진 파일이 보이지 않음)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class ImageDiskStore:
+    """
+    내용 주소 기반 디스크 저장소
+    - blobs/<해시 앞 2자리>/<해시>.jpg           : 원본 JPEG 바이트
+    - blobs/<해시 앞 2자리>/<해시>.<variant>.npy : 디코딩된 배열 (선택, mmap으로 로드)
+    - urls/<URL 해시 앞 2자리>/<URL 해시>.json    : URL → 내용 해시, ETag
+    blobs 전체 크기가 max_bytes를 넘으면 오래 사용하지 않은 파일부터 삭제
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._files: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self._scan()
+
+    def _scan(self):
+        """재시작 시 기존 파일을 mtime 순서로 LRU에 등록"""
+        blobs = os.path.join(self.root, "blobs")
+        found = []
+        for dirpath, _, filenames in os.walk(blobs):
+            for name in filenames:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                found.append((st.st_mtime, path, st.st_size))
+        with self._lock:
+            for _, path, size in sorted(found):
+                self._files[path] = size
+                self._bytes += size
+            self._evict()
+
+    def _blob_path(self, digest: str, suffix: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], f"{digest}{suffix}")
+
+    def _url_path(self, url: str) -> str:
+        key = _url_digest(url)
+        return os.path.join(self.root, "urls", key[:2], f"{key}.json")
+
+    def lookup_url(self, url: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._url_path(url), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get("url") == url else None
+
+    def save_url(self, url: str, digest: str, etag: Optional[str], checked_at: float):
+        body = json.dumps({"url": url, "digest": digest, "etag": etag, "checked_at": checked_at}).encode("utf-8")
+        _write_atomic(self._url_path(url), lambda f: f.write(body))
+
+    def read_blob(self, digest: str) -> Optional[bytes]:
+        path = self._blob_path(digest, ".jpg")
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except OSError:
+            self._forget(path)
+            return None
+        self._touch(path)
+        return content
+
+    def write_blob(self, digest: str, content: bytes):
+        path = self._blob_path(digest, ".jpg")
+        if path not in self._files:
+            _write_atomic(path, lambda f: f.write(content))
+            self._add(path, len(content))
+
+    def read_decoded(self, digest: str, variant: str) -> Optional[np.ndarray]:
+        path = self._blob_path(digest, f".{variant}.npy")
+        if path not in self._files:
+            return None
+        try:
+            img = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            self._forget(path)
+            return None
+        self._touch(path)
+        return img
+
+    def write_decoded(self, digest: str, variant: str, img: np.ndarray):
+        path = self._blob_path(digest, f".{variant}.npy")
+        if path not in self._files:
+            _write_atomic(path, lambda f: np.save(f, img, allow_pickle=False))
+            self._add(path, os.path.getsize(path))
+
+    def _touch(self, path: str):
+        with self._lock:
+            if path in self._files:
+                self._files.move_to_end(path)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _add(self, path: str, size: int):
+        with self._lock:
+            self._bytes += size - self._files.pop(path, 0)
+            self._files[path] = size
+            self._evict()
+
+    def _forget(self, path: str):
+        with self._lock:
+            self._bytes -= self._files.pop(path, 0)
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._files:
+            path, size = self._files.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+
+class ImageCache:
+    """
+    다운로드한 식판 이미지의 2단계 캐시
+    - 메모리: 디코딩된 배열 LRU (내용 해시 + 디코딩 방식 키, 바이트 예산)
+    - 디스크: URL → 내용 해시/ETag 인덱스 + 원본 JPEG (+ 선택적으로 mmap 가능한 디코딩 배열)
+    키오스크는 같은 S3 키에 식판 이미지를 덮어쓰므로 URL → 내용 해시 매핑은 그대로 믿지 않음
+    - revalidate=True(기본)이면 매번 ETag 조건부 요청으로 확인하고 304일 때만 캐시 사용
+      (ETag가 없으면 전체 다운로드 후 내용 해시가 같으면 디코딩 없이 캐시 배열 사용)
+    - revalidate=False이면 url_ttl초 동안만 네트워크 없이 URL 매핑을 신뢰
+    반환 배열은 여러 요청이 공유하므로 읽기 전용
+    """
+
+    def __init__(
+        self,
+        client: ImageHttpClient,
+        decode: Decoder,
+        variant: str = "color",
+        memory_max_bytes: int = 256 * 1024 * 1024,
+        disk_dir: str = "",
+        disk_max_bytes: int = 1024 * 1024 * 1024,
+        store_decoded: bool = False,
+        revalidate: bool = True,
+        url_ttl: float = 60.0,
+        max_urls: int = 4096,
+    ):
+        self.client = client
+        self.decode = decode
+        self.variant = variant
+        self.memory_max_bytes = memory_max_bytes
+        self.store_decoded = store_decoded
+        self.revalidate = revalidate
+        self.url_ttl = url_ttl
+        self.max_urls = max_urls
+        self.disk = ImageDiskStore(disk_dir, disk_max_bytes) if disk_dir else None
+        self._urls: "OrderedDict[str, Tuple[str, Optional[str], float]]" = OrderedDict()  # URL → (내용 해시, ETag, 확인 시각)
+        self._arrays: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+        self.disk_errors = 0
+
+    async def get(self, url: str) -> np.ndarray:
+        """URL의 디코딩된 이미지"""
+        img, _ = await self.fetch(url)
+        return img
+
+    async def fetch(self, url: str) -> Tuple[np.ndarray, str]:
+        """URL의 (디코딩된 이미지, 내용 해시) (같은 URL 동시 요청은 한 번만 다운로드)"""
+        future = self._inflight.get(url)
+        if future is not None:
+            return await asyncio.shield(future)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[url] = future
+        try:
+            result = await self._load(url)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # 대기자가 없으면 "exception was never retrieved" 경고 방지
+            future.exception()
+            raise
+        finally:
+            del self._inflight[url]
+
+    def _fresh(self, entry: Tuple[str, Optional[str], float]) -> bool:
+        """네트워크 확인 없이 URL 매핑을 믿어도 되는지"""
+        return not self.revalidate and time.time() - entry[2] <= self.url_ttl
+
+    async def _load(self, url: str) -> Tuple[np.ndarray, str]:
+        entry = self._urls.get(url)
+        if entry is None and self.disk is not None:
+            saved = await asyncio.to_thread(self.disk.lookup_url, url)
+            if saved is not None:
+                entry = (saved["digest"], saved.get("etag"), saved.get("checked_at", 0.0))
+
+        content = etag = None
+        if entry is not None and not self._fresh(entry):
+            if entry[1]:
+                status, body, etag = await self.client.fetch_conditional(url, entry[1])
+                if status == 304:
+                    self.revalidated += 1
+                    entry = (entry[0], entry[1], time.time())
+                else:
+                    content, entry = body, None
+            else:
+                # ETag가 없으면 변경 여부를 확인할 수 없으므로 다시 다운로드
+                entry = None
+
+        if entry is not None:
+            digest = entry[0]
+            img = self._memory_get(digest)
+            if img is not None:
+                self.memory_hits += 1
+                self._remember_url(url, digest, entry[1], entry[2])
+                return img, digest
+            if self.disk is not None:
+                img = await asyncio.to_thread(self._load_from_disk, digest)
+                if img is not None:
+                    self.disk_hits += 1
+                    self._memory_put(digest, img)
+                    self._remember_url(url, digest, entry[1], entry[2])
+                    return img, digest
+
+        if content is None:
+            _, content, etag = await self.client.fetch_conditional(url)
+        checked_at = time.time()
+        digest = content_digest(content)
+        # 받은 내용이 캐시에 있는 이미지와 같으면 디코딩 생략 (내용 해시 기준 적중)
+        img = self._memory_get(digest)
+        if img is not None:
+            self.memory_hits += 1
+        else:
+            self.misses += 1
+            img = self.decode(content)
+            if img is None:
+                raise ValueError("이미지 디코딩 실패")
+            img.flags.writeable = False
+            self._memory_put(digest, img)
+        self._remember_url(url, digest, etag, checked_at)
+        if self.disk is not None:
+            await asyncio.to_thread(self._save_to_disk, url, digest, etag, checked_at, content, img)
+        return img, digest
+
+    def _load_from_disk(self, digest: str) -> Optional[np.ndarray]:
+        if self.store_decoded:
+            img = self.disk.read_decoded(digest, self.variant)
+            if img is not None:
+                return img
+        content = self.disk.read_blob(digest)
+        if content is None:
+            return None
+        img = self.decode(content)
+        if img is None:
+            return None
+        img.flags.writeable = False
+        if self.store_decoded:
+            self._try_disk(self.disk.write_decoded, digest, self.variant, img)
+        return img
+
+    def _save_to_disk(self, url: str, digest: str, etag: Optional[str], checked_at: float, content: bytes,
+                      img: np.ndarray):
+        self._try_disk(self.disk.write_blob, digest, content)
+        self._try_disk(self.disk.save_url, url, digest, etag, checked_at)
+        if self.store_decoded:
+            self._try_disk(self.disk.write_decoded, digest, self.variant, img)
+
+    def _try_disk(self, fn, *args):
+        # 디스크 오류(용량 부족, 읽기 전용 등)는 캐시를 건너뛰고 요청은 계속 진행
+        try:
+            fn(*args)
+        except OSError:
+            self.disk_errors += 1
+
+    def _remember_url(self, url: str, digest: str, etag: Optional[str], checked_at: float):
+        self._urls[url] = (digest, etag, checked_at)
+        self._urls.move_to_end(url)
+        while len(self._urls) > self.max_urls:
+            self._urls.popitem(last=False)
+
+    def _memory_get(self, digest: str) -> Optional[np.ndarray]:
+        key = (digest, self.variant)
+        img = self._arrays.get(key)
+        if img is not None:
+            self._arrays.move_to_end(key)
+        return img
+
+    def _memory_put(self, digest: str, img: np.ndarray):
+        key = (digest, self.variant)
+        if key in self._arrays:
+            return
+        self._arrays[key] = img
+        self._bytes += img.nbytes
+        while self._bytes > self.memory_max_bytes and len(self._arrays) > 1:
+            _, old = self._arrays.popitem(last=False)
+            self._bytes -= old.nbytes
+            self.evictions += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'memory_entries': len(self._arrays),
+            'memory_bytes': self._bytes,
+            'disk_bytes': self.disk.nbytes if self.disk is not None else 0,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            'revalidated': self.revalidated,
+            'evictions': self.evictions + (self.disk.evictions if self.disk is not None else 0),
+            'disk_errors': self.disk_errors,
+        }
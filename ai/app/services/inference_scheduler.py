@@ -0,0 +1,239 @@
+import asyncio
+import contextvars
+import math
+import time
+from collections import Counter, deque
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, NamedTuple, Optional
+
+# (batch key, job 리스트, job별 옵션 리스트) → job과 같은 순서의 결과 리스트
+BatchRunner = Callable[[Hashable, List[Any], List[Any]], Awaitable[List[Any]]]
+
+
+class _Pending(NamedTuple):
+    job: Any
+    option: Any
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class InferenceScheduler:
+    """
+    여러 요청의 슬롯 분석 job을 모아 마이크로 배치로 실행하는 스케줄러
+    - 같은 key(키오스크, 축소 배율 등 배치 전체에 공통인 값)의 job만 한 배치로 묶음
+    - 가장 오래 기다린 job 기준 max_wait가 지나거나 max_batch_size개가 모이면 실행
+    - 동시에 실행하는 배치 수는 max_concurrency (워커 풀 크기)로 제한하며,
+      워커가 모두 바쁜 동안 쌓인 job은 다음 배치로 함께 실행
+    - 한가한 워커가 여러 개면 대기 job을 나눠 실행 (부하가 낮을 때 지연 시간 우선)
+    - 요청이 취소되면 아직 실행 전인 job은 배치에서 제외
+    - 배치 실행이 실패하면 job별로 다시 실행해 실패한 job의 요청만 실패 처리 (워커 풀이 망가진 경우 제외)
+    """
+
+    def __init__(self, run_batch: BatchRunner, max_batch_size: int = 8, max_wait: float = 0.015,
+                 max_concurrency: int = 3, wait_samples: int = 1024):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.max_concurrency = max_concurrency
+        self._queues: Dict[Hashable, Deque[_Pending]] = {}
+        # 세마포어는 스케줄러 수명 동안 하나만 사용 (디스패처를 다시 띄워도 실행 중인 배치가 같은 객체에 반환)
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._task: Optional[asyncio.Task] = None
+        self._running = set()
+        self._slot_debt = 0
+        self._waits: Deque[float] = deque(maxlen=wait_samples)
+        self.batch_sizes = Counter()
+        self.batches = 0
+        self.jobs = 0
+        self.dropped = 0
+        self.isolated = 0
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            # 이벤트 루프 안에서 처음 제출될 때 디스패처 생성 (스크립트/테스트에서도 같은 루프 사용)
+            # 빈 컨텍스트에서 생성: 처음 제출한 요청의 컨텍스트 변수(요청 trace 등)를 배치 실행이 물려받지 않도록
+            self._task = contextvars.Context().run(asyncio.ensure_future, self._dispatch_loop())
+
+    async def submit(self, job: Any, option: Any = None, key: Hashable = None) -> Any:
+        """job을 큐에 넣고 배치 실행 결과 중 해당 job의 결과를 반환"""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(key, deque()).append(_Pending(job, option, future, time.perf_counter()))
+        self._wakeup.set()
+        return await future
+
+    def _prune(self, queue: Deque[_Pending]):
+        # 대기 중 취소된 job 제거
+        while queue and queue[0].future.done():
+            queue.popleft()
+            self.dropped += 1
+
+    def _oldest_queue(self):
+        oldest = None
+        for key, queue in list(self._queues.items()):
+            self._prune(queue)
+            if not queue:
+                del self._queues[key]
+            elif oldest is None or queue[0].enqueued_at < oldest[1][0].enqueued_at:
+                oldest = (key, queue)
+        return oldest
+
+    async def _dispatch_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while True:
+                # 워커가 빌 때까지 대기 (그동안 들어온 job은 같은 배치에 합류)
+                await self._slots.acquire()
+                # 배치를 넘기지 못하고 빠져나가면(대기 job 없음, 모두 취소됨, 디스패처 취소) 슬롯 반환
+                handed_off = False
+                try:
+                    if self._slot_debt:
+                        # 동시 실행 수를 줄였을 때 쉬고 있던 슬롯도 회수
+                        self._slot_debt -= 1
+                        handed_off = True
+                        continue
+                    oldest = self._oldest_queue()
+                    if oldest is None:
+                        break
+                    key, queue = oldest
+                    # 배치 창: 가장 오래된 job 기준 max_wait까지 추가 job 대기
+                    deadline = queue[0].enqueued_at + self.max_wait
+                    while len(queue) < self.max_batch_size:
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            break
+                        self._wakeup.clear()
+                        try:
+                            await asyncio.wait_for(self._wakeup.wait(), remaining)
+                        except asyncio.TimeoutError:
+                            break
+                    # 한가한 워커 수만큼 나눠 실행 (모두 바쁠 때는 max_batch_size까지 한 배치)
+                    free = self.max_concurrency - len(self._running)
+                    limit = min(self.max_batch_size, math.ceil(len(queue) / max(1, free)))
+                    batch = []
+                    while queue and len(batch) < limit:
+                        pending = queue.popleft()
+                        if pending.future.done():
+                            self.dropped += 1
+                        else:
+                            batch.append(pending)
+                    if not queue:
+                        self._queues.pop(key, None)
+                    if not batch:
+                        continue
+                    task = asyncio.ensure_future(self._run(key, batch))
+                    handed_off = True
+                finally:
+                    if not handed_off:
+                        self._release_slot()
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+    async def _run(self, key: Hashable, batch: List[_Pending]):
+        now = time.perf_counter()
+        self._waits.extend(now - pending.enqueued_at for pending in batch)
+        self.batch_sizes[len(batch)] += 1
+        self.batches += 1
+        self.jobs += len(batch)
+        try:
+            await self._execute(key, batch)
+        except asyncio.CancelledError:
+            for pending in batch:
+                pending.future.cancel()
+            raise
+        finally:
+            self._release_slot()
+
+    async def _execute(self, key: Hashable, batch: List[_Pending]):
+        try:
+            results = await self.run_batch(key, [p.job for p in batch], [p.option for p in batch])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if len(batch) == 1 or isinstance(e, BrokenProcessPool):
+                # 워커 풀 자체가 망가진 경우는 job별로 다시 보내도 모두 실패하므로 그대로 전달
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+                return
+            # 한 job의 실패가 같은 배치에 묶인 다른 요청까지 실패시키지 않도록 job별로 다시 실행 (같은 워커 슬롯에서 순차)
+            self.isolated += 1
+            broken = None
+            for pending in batch:
+                if pending.future.done():
+                    continue
+                if broken is not None:
+                    pending.future.set_exception(broken)
+                    continue
+                try:
+                    result, = await self.run_batch(key, [pending.job], [pending.option])
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    if isinstance(e, BrokenProcessPool):
+                        broken = e
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+                else:
+                    if not pending.future.done():
+                        pending.future.set_result(result)
+        else:
+            for pending, result in zip(batch, results):
+                if not pending.future.done():
+                    pending.future.set_result(result)
+
+    def _release_slot(self):
+        # 동시 실행 수를 줄인 만큼은 반환하지 않고 소멸
+        if self._slot_debt:
+            self._slot_debt -= 1
+        else:
+            self._slots.release()
+
+    def resize(self, max_concurrency: int):
+        """동시 실행 배치 수 변경 (워커 풀 크기 변경 시, 줄이는 경우 실행 중인 배치가 끝나는 대로 반영)"""
+        max_concurrency = max(1, max_concurrency)
+        diff = max_concurrency - self.max_concurrency
+        self.max_concurrency = max_concurrency
+        if diff < 0:
+            self._slot_debt -= diff
+        else:
+            paid = min(diff, self._slot_debt)
+            self._slot_debt -= paid
+            for _ in range(diff - paid):
+                self._slots.release()
+
+    async def close(self):
+        """디스패처와 실행 중인 배치를 취소하고 대기 중인 job을 취소"""
+        tasks = [t for t in [self._task, *self._running] if t is not None and not t.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for queue in self._queues.values():
+            for pending in queue:
+                pending.future.cancel()
+        self._queues.clear()
+        self._task = None
+
+    def metrics(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+
+        def percentile(q):
+            return waits[min(len(waits) - 1, int(q * len(waits)))] * 1000 if waits else 0.0
+
+        return {
+            'queue_depth': sum(len(q) for q in self._queues.values()),
+            'running_batches': len(self._running),
+            'max_concurrency': self.max_concurrency,
+            'batches': self.batches,
+            'jobs': self.jobs,
+            'mean_batch_size': self.jobs / self.batches if self.batches else 0.0,
+            'batch_sizes': dict(sorted(self.batch_sizes.items())),
+            'wait_ms_mean': sum(waits) / len(waits) * 1000 if waits else 0.0,
+            'wait_ms_p50': percentile(0.5),
+            'wait_ms_p95': percentile(0.95),
+            'wait_ms_max': waits[-1] * 1000 if waits else 0.0,
+            'dropped': self.dropped,
+            'isolated_batches': self.isolated,
+        }
@@ -1,3 +1,4 @@
+import logging
 import json, time
 import os
 import asyncio
@@ -7,6 +8,8 @@ from openai import OpenAI
 
 from ..core.prompts import PromptTemplates
 from ..config import settings
+
+logger = logging.getLogger(__name__)
 openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
 
 # schema 정의부
@@ -124,8 +127,7 @@ class LLMService:
         )
 
         # 로깅
-        if settings.DEBUG:
-            print(f"[LLM] Initialized with model: {self.model_name}, temp: {self.temperature}")
+        logger.debug("[LLM] Initialized with model: %s, temp: %s", self.model_name, self.temperature)
     
     async def generate_structured_response(self, prompt: str,
                                            function_def: Dict[str, Any] = None, system_prompt: Optional[str] = None
@@ -150,10 +152,9 @@ class LLMService:
             {"role": "user",   "content": prompt}
         ]
 
-        if settings.DEBUG:
-            print(f"[LLM][generate_structured_response] Requesting structured response")
-            print(f"시스템 프롬프트: {system}")
-            print(f"사용자 프롬프트: {prompt}")
+        logger.debug("[LLM][generate_structured_response] Requesting structured response")
+        logger.debug("시스템 프롬프트: %s", system)
+        logger.debug("사용자 프롬프트: %s", prompt)
         
 
         # function calling을 위한 openai SDK 적용
@@ -166,25 +167,20 @@ class LLMService:
             function_call="auto"
         )
 
-        if settings.DEBUG:
-            print("[DEBUG] resp = :", resp)
+        logger.debug("[LLM] resp = %s", resp)
 
         message = resp.choices[0].message
 
-        if settings.DEBUG:
-            print("[DEBUG] function_call =", message.function_call)
-            print("[DEBUG] function_call.name =", message.function_call.name)
-            print("[DEBUG] function_call.arguments =", message.function_call.arguments)
+        # function_call이 없을 수 있으므로 name/arguments는 객체 repr로 함께 출력
+        logger.debug("[LLM] function_call = %s", message.function_call)
 
         if message.function_call:
             try:
-                if settings.DEBUG:
-                    print(f"원본 함수 호출 응답: {message.function_call.arguments}")
+                logger.debug("원본 함수 호출 응답: %s", message.function_call.arguments)
                 payload = json.loads(message.function_call.arguments)
                 if len(payload) == 0:
-                    if settings.DEBUG:
-                        print(f"[ERROR] 빈 응답이 반환되었습니다. 프롬프트 내용을 확인하세요.")
-                        return {}
+                    logger.error("[LLM] 빈 응답이 반환되었습니다. 프롬프트 내용을 확인하세요.")
+                    return {}
                 
                 # 함수 이름에 따라 처리
                 function_name = message.function_call.name
@@ -196,7 +192,7 @@ class LLMService:
                 else:
                     return payload
             except Exception as e:
-                print(f"[ERROR] 응답 처리 중 오류: {str(e)}")
+                logger.error("[LLM] 응답 처리 중 오류: %s", e)
                 raise
     
     async def generate_health_report(self,
@@ -216,8 +212,8 @@ class LLMService:
             nutrient=json.dumps(nutrient, ensure_ascii=False)
         )
 
-        if settings.DEBUG:
-            print(f"[LLM][generate_health_report] 건강 리포트 생성 요청")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[LLM][generate_health_report] 건강 리포트 생성 요청")
             start_time = time.time()
 
         try:
@@ -228,11 +224,10 @@ class LLMService:
                 system_prompt="당신은 학생 건강 분석 전문가입니다. 제공된 데이터를 분석하여 맞춤형 건강 리포트를 생성하세요."
             )
 
-            if settings.DEBUG:
+            if logger.isEnabledFor(logging.DEBUG):
                 elapsed = time.time() - start_time
-                print(f"[LLM] 건강 리포트 생성 완료 (소요시간: {elapsed:.2f}초)")
+                logger.debug("[LLM] 건강 리포트 생성 완료 (소요시간: %.2f초)", elapsed)
             
             return report
         except Exception as e:
-            if settings.DEBUG:
-                print(f"[ERROR] 건강 리포트 생성 중 오류 발생: {str(e)}")
\ No newline at end of file
+            logger.error("[LLM] 건강 리포트 생성 중 오류 발생: %s", e)
@@ -1,11 +1,13 @@
+import logging
 from typing import Dict, List, Any, Optional
 import time
 import random
-from ..config import settings
 from collections import defaultdict
 import statistics
 import asyncio
 
+logger = logging.getLogger(__name__)
+
 class MenuService:
     """메뉴 관리 서비스"""
 
@@ -14,13 +16,13 @@ class MenuService:
         pass
     
     def extract_menu_data(self, menu_data: Dict[str, Dict[str, Dict[str, Dict[str, Any]]]], menu_pool: Dict[str, str]) -> Dict[str, Any]:
-        if settings.DEBUG:
-            print(f"[MENU][extract_menu_data] Extracting menu data from {len(menu_data)} days of data")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[MENU][extract_menu_data] Extracting menu data from %s days of data", len(menu_data))
             start_time = time.time()
 
-        if settings.DEBUG:
+        if logger.isEnabledFor(logging.DEBUG):
             menu_count = len(menu_pool) if menu_pool else 0
-            print(f"[MENU][extract_menu_data] Organizing {menu_count} menus by category")
+            logger.debug("[MENU][extract_menu_data] Organizing %s menus by category", menu_count)
         
         """
         Spring에서 받은 날짜별 메뉴 데이터에서 유용한 정보 추출
@@ -74,10 +76,9 @@ class MenuService:
                 if "leftover" in menu_info:
                     leftover_stats[menu_name].append(menu_info["leftover"])
         
-        if settings.DEBUG:
-            print(f"[MENU][extract_menu_data] Collected data for {len(menu_nutrition)} menus with nutrition info")
-            print(f"[MENU][extract_menu_data] Found {len(nutrition_keys)} unique nutrition keys")
-            print(f"[MENU][extract_menu_data] Calculating average preferences and leftover rates")
+        logger.debug("[MENU][extract_menu_data] Collected data for %s menus with nutrition info", len(menu_nutrition))
+        logger.debug("[MENU][extract_menu_data] Found %s unique nutrition keys", len(nutrition_keys))
+        logger.debug("[MENU][extract_menu_data] Calculating average preferences and leftover rates")
 
         # 메뉴별 평균 선호도 계산
         for menu_name, values in preference_stats.items():
@@ -89,13 +90,13 @@ class MenuService:
             # 기본값 0.2
             menu_leftover[menu_name] = statistics.mean(values) if values else 0.2
 
-        if settings.DEBUG:
-            print(f"[MENU][extract_menu_data] Extraction completed with:")
-            print(f"  - {len(categorized_menus)} categories")
-            print(f"  - {len(menu_nutrition)} menus with nutrition data")
-            print(f"  - {len(menu_preference)} menus with preference data")
-            print(f"  - {len(menu_leftover)} menus with leftover data")
-            print(f"[MENU][extract_menu_data] Processing time: {time.time() - start_time:.4f} seconds")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[MENU][extract_menu_data] Extraction completed with:")
+            logger.debug("  - %s categories", len(categorized_menus))
+            logger.debug("  - %s menus with nutrition data", len(menu_nutrition))
+            logger.debug("  - %s menus with preference data", len(menu_preference))
+            logger.debug("  - %s menus with leftover data", len(menu_leftover))
+            logger.debug("[MENU][extract_menu_data] Processing time: %.4f seconds", time.time() - start_time)
     
         # 결과 반환
         return {
@@ -117,9 +118,8 @@ class MenuService:
         Returns:
             Dict: LLM 입력용 최적화된 데이터
         """
-        if settings.DEBUG:
-            print(f"[MENU][prepare_for_llm] Input menu_data keys: {menu_data.keys()}")
-            print(f"[MENU][prepare_for_llm] Input menu_pool size: {len(menu_pool)}")
+        logger.debug("[MENU][prepare_for_llm] Input menu_data keys: %s", menu_data.keys())
+        logger.debug("[MENU][prepare_for_llm] Input menu_pool size: %s", len(menu_pool))
 
         extracted_data = self.extract_menu_data(menu_data, menu_pool)
 
@@ -145,9 +145,8 @@ class MenuService:
                     if "menu_leftover" in extracted_data and menu in extracted_data["menu_leftover"]:
                         category_leftover[menu] = extracted_data["menu_leftover"][menu]
             except Exception as e:
-                if settings.DEBUG:
-                    print(f"[MENU][prepare_for_llm] Error accessing menu_leftover: {str(e)}")
-                    print(f"[MENU][prepare_for_llm] extracted_data structure: {extracted_data.keys()}")
+                logger.debug("[MENU][prepare_for_llm] Error accessing menu_leftover: %s", str(e))
+                logger.debug("[MENU][prepare_for_llm] extracted_data structure: %s", extracted_data.keys())
             
             if category_leftover:
                 sorted_items = sorted(category_leftover.items(), key=lambda x: x[1], reverse=True)
@@ -166,11 +165,9 @@ class MenuService:
         try:
             # 발견된 영양소 키 중 우선순위가 있는 것 먼저 포함, 나머지는 선택적 포함
             available_keys = set(extracted_data.get("nutrition_keys", []))
-            if settings.DEBUG:
-                print(f"[MENU][prepare_for_llm] Available nutrition keys: {available_keys}")
+            logger.debug("[MENU][prepare_for_llm] Available nutrition keys: %s", available_keys)
         except Exception as e:
-            if settings.DEBUG:
-                print(f"[MENU][prepare_for_llm] Error processing nutrition keys: {str(e)}")
+            logger.debug("[MENU][prepare_for_llm] Error processing nutrition keys: %s", str(e))
             # 오류 발생 시 기본값 사용
             available_keys = set()
         selected_keys = [k for k in priority_nutrients if k in available_keys]
@@ -272,9 +269,10 @@ class MenuService:
         menu_preference = menu_data.get("menu_preference", {})
 
         # 디버깅 출력
-        if settings.DEBUG:
-            print(f"[MENU][generate_alternatives] categorized_menus keys: {categorized_menus.keys() if categorized_menus else 'None'}")
-            print(f"[MENU][generate_alternatives] menu_preference keys count: {len(menu_preference) if menu_preference else 'None'}")
+        logger.debug("[MENU][generate_alternatives] categorized_menus keys: %s",
+                     categorized_menus.keys() if categorized_menus else 'None')
+        logger.debug("[MENU][generate_alternatives] menu_preference keys count: %s",
+                     len(menu_preference) if menu_preference else 'None')
 
         alternatives = {}
 
@@ -0,0 +1,293 @@
+# 잔반 분석 모델(ResNet, MiDaS) INT8 양자화 및 FP32 대비 정확도 리포트
+# ---------------------------------------------------------------
+# Usage example
+#   python -m app.services.quantize_models \
+#       --weights ./app/weights/new_opencv_ckpt_b84_e200.pth \
+#       --calib-dir ./crops/calib \
+#       --eval-dir ./crops/eval \
+#       --mode static \
+#       --report ./quantize_report.json
+# ---------------------------------------------------------------
+import argparse
+import glob
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, Any, List, Optional
+
+import cv2
+import numpy as np
+from PIL import Image
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    QuantFormat,
+    QuantType,
+    quantize_dynamic,
+    quantize_static,
+)
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+from .custom_model import (
+    RESNET_PREPROCESS,
+    analyze_food_image_custom,
+    preprocess_image_for_midas,
+)
+
+logger = logging.getLogger(__name__)
+
+QUANTIZE_MODES = ("none", "dynamic", "static")
+
+
+def quantized_model_path(fp32_path: str, mode: str) -> str:
+    """FP32 ONNX 경로로부터 INT8 모델 경로 생성 (예: resnet.onnx -> resnet.static.int8.onnx)"""
+    root, ext = os.path.splitext(fp32_path)
+    return f"{root}.{mode}.int8{ext}"
+
+
+def load_calibration_images(calib_dir: str, limit: int = 32) -> List[np.ndarray]:
+    """식판 crop 이미지 폴더에서 캘리브레이션용 이미지 로드"""
+    paths = sorted(
+        glob.glob(os.path.join(calib_dir, "*.jpg")) +
+        glob.glob(os.path.join(calib_dir, "*.png"))
+    )[:limit]
+    images = [cv2.imread(p) for p in paths]
+    return [img for img in images if img is not None]
+
+
+def resnet_input(img: np.ndarray) -> np.ndarray:
+    """ResNet 입력 텐서 (1x3x224x224)"""
+    pil = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    return RESNET_PREPROCESS(pil).unsqueeze(0).numpy()
+
+
+def make_midas_input(midas_transform) -> Callable[[np.ndarray], np.ndarray]:
+    """MiDaS 입력 텐서 (1x3x256x256) 생성 함수"""
+    def _midas_input(img: np.ndarray) -> np.ndarray:
+        return midas_transform(preprocess_image_for_midas(img)).unsqueeze(0).numpy()
+    return _midas_input
+
+
+class TrayCropCalibrationReader(CalibrationDataReader):
+    """정적 양자화용 캘리브레이션 데이터 (식판 crop 이미지)"""
+
+    def __init__(self, images: List[np.ndarray], to_input: Callable[[np.ndarray], np.ndarray],
+                 input_name: str = "input"):
+        self._inputs = [{input_name: to_input(img)} for img in images]
+        self._iter = iter(self._inputs)
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        return next(self._iter, None)
+
+    def rewind(self):
+        self._iter = iter(self._inputs)
+
+
+def quantize_onnx_model(
+    fp32_path: str,
+    int8_path: str,
+    mode: str,
+    calibration_reader: Optional[CalibrationDataReader] = None,
+) -> bool:
+    """
+    FP32 ONNX 모델을 INT8로 양자화
+    mode: 'dynamic' (가중치만 INT8, 캘리브레이션 불필요)
+          'static'  (가중치+활성값 INT8, calibration_reader 필요)
+    """
+    # 여러 워커가 동시에 양자화할 수 있으므로 임시 파일에 쓴 뒤 교체
+    tmp_path = f"{int8_path}.{os.getpid()}.tmp"
+    prep_path = f"{int8_path}.{os.getpid()}.prep.onnx"
+    try:
+        # 양자화 전처리 (shape 추론 + 그래프 최적화), 실패 시 원본 모델 사용
+        try:
+            quant_pre_process(fp32_path, prep_path)
+            src_path = prep_path
+        except Exception as e:
+            logger.warning("ONNX 양자화 전처리 건너뜀 (%s): %s", os.path.basename(fp32_path), e)
+            src_path = fp32_path
+
+        if mode == "dynamic":
+            quantize_dynamic(
+                src_path,
+                tmp_path,
+                weight_type=QuantType.QInt8,
+            )
+        elif mode == "static":
+            if calibration_reader is None:
+                raise ValueError("정적 양자화에는 캘리브레이션 데이터가 필요합니다")
+            quantize_static(
+                src_path,
+                tmp_path,
+                calibration_reader,
+                quant_format=QuantFormat.QDQ,
+                per_channel=True,
+                activation_type=QuantType.QUInt8,
+                weight_type=QuantType.QInt8,
+            )
+        else:
+            raise ValueError(f"지원하지 않는 양자화 모드: {mode}")
+        os.replace(tmp_path, int8_path)
+        return True
+    except Exception as e:
+        logger.error("ONNX 양자화 실패 (%s, %s): %s", os.path.basename(fp32_path), mode, e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    finally:
+        if os.path.exists(prep_path):
+            os.remove(prep_path)
+
+
+def ensure_quantized_model(
+    fp32_path: str,
+    mode: str,
+    calib_dir: str = "",
+    to_input: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+) -> str:
+    """
+    양자화 모드에 맞는 ONNX 경로 반환 (필요 시 INT8 모델 생성)
+    양자화에 실패하면 FP32 경로를 그대로 반환합니다.
+    """
+    if mode == "none" or not os.path.exists(fp32_path):
+        return fp32_path
+    int8_path = quantized_model_path(fp32_path, mode)
+    if os.path.exists(int8_path):
+        return int8_path
+
+    reader = None
+    if mode == "static":
+        images = load_calibration_images(calib_dir) if calib_dir else []
+        if not images or to_input is None:
+            logger.warning("캘리브레이션 이미지가 없어 %s 정적 양자화를 건너뜁니다: %r", os.path.basename(fp32_path), calib_dir)
+            return fp32_path
+        reader = TrayCropCalibrationReader(images, to_input)
+
+    if quantize_onnx_model(fp32_path, int8_path, mode, reader):
+        logger.info("%s INT8 양자화 성공 (%s)", os.path.basename(fp32_path), mode)
+        return int8_path
+    return fp32_path
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.time()
+    result = fn(*args, **kwargs)
+    return result, time.time() - start
+
+
+def accuracy_delta_report(
+    images: List[np.ndarray],
+    image_names: List[str],
+    fp32_models: Dict[str, Any],
+    int8_models: Dict[str, Any],
+    midas_transform,
+) -> Dict[str, Any]:
+    """
+    동일 이미지에 대해 FP32 경로와 INT8 경로의 결과 차이를 계산
+    fp32_models/int8_models: {'resnet': session, 'midas': session}
+    """
+    per_image = []
+    fp32_time = int8_time = 0.0
+    for img, name in zip(images, image_names):
+        # 참조 이미지는 기존 서비스와 동일하게 중앙 20% crop 사용
+        h, w = img.shape[:2]
+        ch, cw = int(h * 0.2), int(w * 0.2)
+        reference = img[h//2 - ch//2:h//2 - ch//2 + ch, w//2 - cw//2:w//2 - cw//2 + cw]
+
+        fp32, t_fp32 = _timed(analyze_food_image_custom, img, reference,
+                              fp32_models['resnet'], fp32_models['midas'], midas_transform,
+                              image_name=name)
+        int8, t_int8 = _timed(analyze_food_image_custom, img, reference,
+                              int8_models['resnet'], int8_models['midas'], midas_transform,
+                              image_name=name)
+        fp32_time += t_fp32
+        int8_time += t_int8
+        if fp32 is None or int8 is None:
+            continue
+        per_image.append({
+            'image': name,
+            'resnet_class_fp32': fp32['resnet_result'][0],
+            'resnet_class_int8': int8['resnet_result'][0],
+            'resnet_prob_delta': float(abs(fp32['resnet_result'][1] - int8['resnet_result'][1])),
+            'food_volume_cm3_delta': float(abs(fp32['food_volume_cm3'] - int8['food_volume_cm3'])),
+            'final_percentage_delta': float(abs(fp32['final_percentage'] - int8['final_percentage'])),
+        })
+
+    n = len(per_image)
+    summary = {
+        'images': n,
+        'resnet_class_agreement': (
+            sum(r['resnet_class_fp32'] == r['resnet_class_int8'] for r in per_image) / n if n else None
+        ),
+        'mean_resnet_prob_delta': float(np.mean([r['resnet_prob_delta'] for r in per_image])) if n else None,
+        'mean_food_volume_cm3_delta': float(np.mean([r['food_volume_cm3_delta'] for r in per_image])) if n else None,
+        'mean_final_percentage_delta': float(np.mean([r['final_percentage_delta'] for r in per_image])) if n else None,
+        'max_final_percentage_delta': float(np.max([r['final_percentage_delta'] for r in per_image])) if n else None,
+        'fp32_seconds': fp32_time,
+        'int8_seconds': int8_time,
+        'speedup': fp32_time / int8_time if int8_time > 0 else None,
+    }
+    return {'summary': summary, 'per_image': per_image}
+
+
+def main():
+    import torch
+    from .analyze_service import convert_to_onnx, create_ort_session
+    from .custom_model import load_resnet_model, load_midas_model
+
+    parser = argparse.ArgumentParser(
+        description="ResNet/MiDaS INT8 양자화 후 FP32 대비 정확도 리포트 생성",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--weights", type=str, default="./app/weights/new_opencv_ckpt_b84_e200.pth",
+                        help="ResNet 가중치 경로")
+    parser.add_argument("--onnx-dir", type=str, default=None,
+                        help="ONNX 모델 폴더 (기본값: 가중치 폴더/onnx)")
+    parser.add_argument("--calib-dir", type=str, default="", help="캘리브레이션용 식판 crop 폴더")
+    parser.add_argument("--eval-dir", type=str, required=True, help="비교용 식판 crop 폴더")
+    parser.add_argument("--mode", type=str, default="dynamic", choices=QUANTIZE_MODES[1:])
+    parser.add_argument("--report", type=str, default="./quantize_report.json", help="리포트 저장 경로")
+    args = parser.parse_args()
+
+    onnx_dir = args.onnx_dir or os.path.join(os.path.dirname(args.weights), 'onnx')
+    os.makedirs(onnx_dir, exist_ok=True)
+    resnet_path = os.path.join(onnx_dir, 'resnet.onnx')
+    midas_path = os.path.join(onnx_dir, 'midas_dpt_large.onnx')
+
+    # FP32 ONNX 준비
+    midas_model, midas_transform = load_midas_model(device="cpu")
+    if not os.path.exists(resnet_path):
+        convert_to_onnx(load_resnet_model(args.weights, device="cpu"), torch.randn(1, 3, 224, 224), resnet_path)
+    if not os.path.exists(midas_path):
+        convert_to_onnx(midas_model, torch.randn(1, 3, 256, 256), midas_path, opset_version=14)
+
+    # INT8 양자화
+    resnet_int8 = ensure_quantized_model(resnet_path, args.mode, args.calib_dir, resnet_input)
+    midas_int8 = ensure_quantized_model(midas_path, args.mode, args.calib_dir, make_midas_input(midas_transform))
+
+    # 동일 이미지로 FP32 / INT8 비교
+    paths = sorted(
+        glob.glob(os.path.join(args.eval_dir, "*.jpg")) +
+        glob.glob(os.path.join(args.eval_dir, "*.png"))
+    )
+    images = [cv2.imread(p) for p in paths]
+    report = accuracy_delta_report(
+        images, paths,
+        fp32_models={'resnet': create_ort_session(resnet_path), 'midas': create_ort_session(midas_path)},
+        int8_models={'resnet': create_ort_session(resnet_int8), 'midas': create_ort_session(midas_int8)},
+        midas_transform=midas_transform,
+    )
+    report['mode'] = args.mode
+    report['models'] = {'resnet': resnet_int8, 'midas': midas_int8}
+
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    summary = report['summary']
+    print(f"[DONE] {summary['images']} images, speedup x{summary['speedup'] or 0:.2f}, "
+          f"class agreement {summary['resnet_class_agreement']}, "
+          f"mean final delta {summary['mean_final_percentage_delta']}")
+    print(f"[DONE] report saved to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from .custom_model import ReferenceModel, reference_key
+
+ReferenceKey = Tuple[str, str, str]
+
+
+class _Entry:
+    """참조 저장소 항목 (참조 crop, 내용 해시, 워커가 만든 역투영 참조 모델)"""
+    __slots__ = ('image', 'content_key', 'model', 'created_at', 'last_access')
+
+    def __init__(self, image: np.ndarray):
+        self.image = image
+        self.content_key = reference_key(image)
+        self.model: Optional[ReferenceModel] = None
+        self.created_at = self.last_access = time.monotonic()
+
+    @property
+    def nbytes(self) -> int:
+        return self.image.nbytes + (self.model.nbytes if self.model is not None else 0)
+
+
+class ReferenceStore:
+    """
+    요청/학생 단위 참조 이미지 저장소
+    - 키: (학생 ID, 카테고리, 식전 이미지 URL) → 다른 학생의 동시 요청끼리 덮어쓰지 않음
+    - 메모리 예산(max_bytes)을 넘으면 오래 사용하지 않은 항목부터 제거
+    - ttl_seconds가 지난 항목은 조회 시/저장 시 제거
+    - 워커가 만든 ReferenceModel을 붙여 두면 이후 워커에는 이미지 대신 모델만 전달
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 600.0):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[ReferenceKey, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(scope: Any, category: str, source_url: str) -> ReferenceKey:
+        """참조 키 생성 (scope: 학생 ID 등 요청 주체)"""
+        return (str(scope), category, source_url)
+
+    def put(self, key: ReferenceKey, image: np.ndarray) -> np.ndarray:
+        """
+        참조 crop 저장
+        crop_center 결과는 원본 이미지의 view이므로 복사해서 원본 이미지를 붙잡지 않도록 함
+        """
+        image = image.copy() if image.base is not None else image
+        entry = _Entry(image)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            self._evict()
+        return image
+
+    def get(self, key: ReferenceKey) -> Optional[np.ndarray]:
+        """참조 crop 조회 (없거나 만료되면 None)"""
+        entry = self._lookup(key)
+        return entry.image if entry is not None else None
+
+    def handoff(self, key: ReferenceKey) -> Optional[Union[ReferenceModel, np.ndarray]]:
+        """
+        워커에 전달할 참조 조회
+        역투영 참조 모델이 있으면 모델(히스토그램만 직렬화)을, 없으면 참조 crop을 반환
+        """
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        return entry.model if entry.model is not None else entry.image
+
+    def attach_model(self, key: ReferenceKey, model: Optional[ReferenceModel]):
+        """워커가 계산한 ReferenceModel을 같은 내용의 참조 항목에 연결"""
+        if model is None:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.content_key != model.key or entry.model is not None:
+                return
+            entry.model = model
+            self._bytes += model.nbytes
+            self._evict()
+
+    def discard(self, key: ReferenceKey):
+        with self._lock:
+            self._remove(key)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    def _lookup(self, key: ReferenceKey) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.monotonic()
+            if entry is not None and now - entry.created_at > self.ttl_seconds:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry.last_access = now
+            self._entries.move_to_end(key)
+            return entry
+
+    def _remove(self, key: ReferenceKey):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.nbytes
+
+    def _evict(self):
+        # 만료 항목 우선 제거 후 메모리 예산을 넘으면 LRU 순서로 제거
+        now = time.monotonic()
+        for key in [k for k, e in self._entries.items() if now - e.created_at > self.ttl_seconds]:
+            self._remove(key)
+            self.expirations += 1
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
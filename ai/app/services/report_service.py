@@ -1,6 +1,8 @@
+import logging
 from typing import Dict, Any
 from .llm_service import LLMService
-from ..config import settings
+
+logger = logging.getLogger(__name__)
 
 class ReportService:
     def __init__(self):
@@ -15,8 +17,7 @@ class ReportService:
         """
         학생 식사 정보를 분석하여 건강 리포트를 생성합니다.
         """
-        if settings.DEBUG:
-            print("[ReportService] 건강 리포트 생성 시작")
+        logger.debug("[ReportService] 건강 리포트 생성 시작")
             
         # LLM 서비스를 통해 건강 리포트 생성
         report = await self.llm_service.generate_health_report(
@@ -28,9 +29,8 @@ class ReportService:
         )
         
         # 디버깅 출력 추가
-        if settings.DEBUG:
-            print("[REPORT] 건강 리포트 생성 완료")
-            print("[REPORT][DEBUG] 리포트 타입:", type(report))
-            print("[REPORT][DEBUG] 리포트 값:", report)
+        logger.debug("[REPORT] 건강 리포트 생성 완료")
+        logger.debug("[REPORT][DEBUG] 리포트 타입: %s", type(report))
+        logger.debug("[REPORT][DEBUG] 리포트 값: %s", report)
         
         return report
\ No newline at end of file
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    student_id TEXT,
+    model_version TEXT NOT NULL,
+    leftover_rate TEXT NOT NULL,
+    details TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS slots (
+    key TEXT PRIMARY KEY,
+    model_version TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_created_at ON results (created_at);
+CREATE INDEX IF NOT EXISTS slots_created_at ON slots (created_at);
+"""
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ResultStore:
+    """
+    잔반 분석 결과 저장소 (SQLite)
+    - results: (학생 ID, 식전/식후 이미지 내용 해시, 키오스크, 모델 버전) → 응답 잔반율과 슬롯별 상세(식전/식후 양, 분기별 잔반율)
+    - slots: (식전 이미지 내용 해시, 키오스크, 모델 버전) → 식전 슬롯 분석 요약 (다른 식후 이미지와 다시 비교할 때 재사용)
+    - 키오스크는 같은 S3 키(URL)에 매 식사 이미지를 덮어쓰므로 URL이 아니라 내용 해시(ImageCache.fetch)로 키 생성
+    - 모델 버전이 키에 들어가므로 가중치/설정이 바뀌면 이전 결과는 조회되지 않고 ttl_seconds 후 삭제
+    - WAL 모드라 여러 uvicorn 워커 프로세스가 같은 파일을 공유 가능
+    - DB 오류는 요청을 실패시키지 않고 미적중으로 처리 (errors로 집계)
+    """
+
+    def __init__(self, path: str, model_version: str, ttl_seconds: float = 7 * 24 * 3600,
+                 prune_interval: float = 3600.0):
+        self.path = path
+        self.model_version = model_version
+        self.ttl_seconds = ttl_seconds
+        self.prune_interval = prune_interval
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._pruned_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.slot_hits = 0
+        self.slot_misses = 0
+        self.writes = 0
+        self.pruned = 0
+        self.errors = 0
+
+    def make_key(self, student_id: Any, before_digests: Dict[str, str], after_digests: Dict[str, str],
+                 kiosk_id: Optional[str] = None) -> str:
+        """요청 결과 키 (카테고리별 식전/식후 이미지 내용 해시, 슬롯 순서와 무관)"""
+        return _digest(json.dumps({
+            'student': str(student_id),
+            'before': before_digests,
+            'after': after_digests,
+            'kiosk': kiosk_id,
+            'version': self.model_version,
+        }, sort_keys=True))
+
+    def slot_key(self, before_digest: str, kiosk_id: Optional[str] = None) -> str:
+        """식전 슬롯 결과 키 (식판 이미지 내용 단위이므로 학생 ID는 포함하지 않음)"""
+        return _digest(json.dumps([before_digest, kiosk_id, self.model_version]))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """저장된 요청 결과 {'leftoverRate', 'details'} (없거나 만료되면 None)"""
+        row = self._fetch_one(
+            "SELECT leftover_rate, details FROM results WHERE key = ? AND model_version = ? AND created_at >= ?",
+            (key, self.model_version, time.time() - self.ttl_seconds),
+        )
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return {'leftoverRate': json.loads(row[0]), 'details': json.loads(row[1])}
+
+    def get_slots(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """저장된 식전 슬롯 요약 {키: 요약} (없는 키는 빠짐)"""
+        keys = list(keys)
+        if not keys:
+            return {}
+        rows = self._fetch_all(
+            f"SELECT key, result FROM slots WHERE key IN ({', '.join('?' * len(keys))}) "
+            f"AND model_version = ? AND created_at >= ?",
+            (*keys, self.model_version, time.time() - self.ttl_seconds),
+        )
+        found = {key: json.loads(result) for key, result in rows}
+        with self._lock:
+            self.slot_hits += len(found)
+            self.slot_misses += len(keys) - len(found)
+        return found
+
+    def put(self, key: str, student_id: Any, leftover_rate: Dict[str, float], details: Dict[str, Any],
+            slots: Optional[Dict[str, Dict[str, Any]]] = None):
+        """요청 결과와 새로 분석한 식전 슬롯 요약을 한 트랜잭션으로 저장"""
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, str(student_id), self.model_version, json.dumps(leftover_rate),
+                         json.dumps(details, ensure_ascii=False), now),
+                    )
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO slots VALUES (?, ?, ?, ?)",
+                        [(slot_key, self.model_version, json.dumps(result, ensure_ascii=False), now)
+                         for slot_key, result in (slots or {}).items()],
+                    )
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+                self.writes += 1
+                if now - self._pruned_at > self.prune_interval:
+                    self._prune(now)
+        except sqlite3.Error as e:
+            self._error("put", e)
+
+    def _prune(self, now: float):
+        # 만료 항목 삭제 (모델 버전이 바뀐 이전 결과도 만료 시 함께 정리)
+        self._pruned_at = now
+        cutoff = now - self.ttl_seconds
+        deleted = self._conn.execute("DELETE FROM results WHERE created_at < ?", (cutoff,)).rowcount
+        deleted += self._conn.execute("DELETE FROM slots WHERE created_at < ?", (cutoff,)).rowcount
+        self.pruned += deleted
+
+    def _fetch_one(self, sql: str, params: tuple):
+        try:
+            with self._lock:
+                return self._conn.execute(sql, params).fetchone()
+        except sqlite3.Error as e:
+            self._error("read", e)
+            return None
+
+    def _fetch_all(self, sql: str, params: tuple):
+        try:
+            with self._lock:
+                return self._conn.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            self._error("read", e)
+            return []
+
+    def _error(self, op: str, e: Exception):
+        with self._lock:
+            self.errors += 1
+        logger.warning("[RESULT_STORE] %s failed (%s): %s", op, self.path, e)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            slot_lookups = self.slot_hits + self.slot_misses
+            return {
+                'model_version': self.model_version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'slot_hits': self.slot_hits,
+                'slot_misses': self.slot_misses,
+                'slot_hit_rate': self.slot_hits / slot_lookups if slot_lookups else 0.0,
+                'writes': self.writes,
+                'pruned': self.pruned,
+                'errors': self.errors,
+            }
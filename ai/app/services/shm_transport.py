@@ -0,0 +1,123 @@
+import contextlib
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 배열 시작 위치 정렬 (캐시 라인 단위)
+_ALIGN = 64
+
+
+def ensure_resource_tracker():
+    """
+    워커 풀 생성 전에 호출: resource tracker를 먼저 띄워 두면 워커가 부모의 tracker를 물려받음
+    (워커가 자체 tracker를 띄우면 attach한 세그먼트를 종료 시 누수로 보고하고 unlink를 시도함)
+    """
+    resource_tracker.ensure_running()
+
+
+class SharedImage(NamedTuple):
+    """워커에 전달되는 공유 메모리 이미지 핸들 (세그먼트 이름 + 위치/형태만 직렬화)"""
+    segment: str
+    offset: int
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+class SharedImageBatch:
+    """
+    이벤트 루프(부모 프로세스) 쪽 공유 메모리 소유자
+    - 한 배치의 이미지들을 하나의 세그먼트에 순서대로 복사하고 핸들을 발급
+    - close()에서 세그먼트를 닫고 unlink (워커 호출이 끝난 뒤 반드시 호출)
+    """
+
+    def __init__(self, images: Sequence[np.ndarray]):
+        offsets = []
+        total = 0
+        for img in images:
+            offsets.append(total)
+            total += -(-img.nbytes // _ALIGN) * _ALIGN
+        self._shm = shared_memory.SharedMemory(create=True, size=max(total, 1))
+        self.nbytes = total
+        self.handles: List[SharedImage] = []
+        dst = None
+        try:
+            for img, offset in zip(images, offsets):
+                dst = np.ndarray(img.shape, dtype=img.dtype, buffer=self._shm.buf, offset=offset)
+                dst[...] = img
+                self.handles.append(SharedImage(self._shm.name, offset, img.shape, img.dtype.str))
+        except Exception:
+            # 세그먼트 버퍼를 참조하는 배열을 먼저 놓아야 close()에서 BufferError가 나지 않음
+            dst = None
+            self.close()
+            raise
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def close(self):
+        if self._shm is None:
+            return
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def share_jobs(jobs: List[Tuple[Any, Any, str]]) -> Tuple[Optional[SharedImageBatch], List[Tuple[Any, Any, str]]]:
+    """
+    (target, reference, image_name) 작업 목록의 ndarray를 공유 메모리 핸들로 교체
+    ndarray가 아닌 값(경로, ReferenceModel 등)은 그대로 전달
+    return: (소유 배치 또는 None, 핸들로 바뀐 작업 목록)
+    """
+    images = [x for job in jobs for x in job[:2] if isinstance(x, np.ndarray)]
+    if not images:
+        return None, jobs
+    batch = SharedImageBatch(images)
+    handles = iter(batch.handles)
+    shared = [
+        tuple(next(handles) if isinstance(x, np.ndarray) else x for x in job[:2]) + (job[2],)
+        for job in jobs
+    ]
+    return batch, shared
+
+
+@contextlib.contextmanager
+def attached_jobs(jobs: List[Tuple[Any, Any, str]]) -> Iterator[List[Tuple[Any, Any, str]]]:
+    """
+    워커 쪽: 핸들을 공유 메모리 위의 읽기 전용 ndarray로 복원 (복사 없음)
+    with 블록이 끝나면 세그먼트를 닫음 (unlink는 소유자인 부모 프로세스가 담당)
+    """
+    segments: Dict[str, shared_memory.SharedMemory] = {}
+
+    def resolve(x):
+        if not isinstance(x, SharedImage):
+            return x
+        shm = segments.get(x.segment)
+        if shm is None:
+            # 풀 워커는 부모의 resource tracker를 공유하므로 (ensure_resource_tracker) 등록 해제가 필요 없음
+            shm = segments[x.segment] = shared_memory.SharedMemory(name=x.segment)
+        arr = np.ndarray(x.shape, dtype=np.dtype(x.dtype), buffer=shm.buf, offset=x.offset)
+        arr.flags.writeable = False
+        return arr
+
+    resolved = [tuple(resolve(x) for x in job[:2]) + (job[2],) for job in jobs]
+    try:
+        yield resolved
+    finally:
+        resolved.clear()
+        for shm in segments.values():
+            try:
+                shm.close()
+            except BufferError:
+                # 결과가 공유 배열을 참조하고 있으면 GC 시점에 닫힘
+                pass
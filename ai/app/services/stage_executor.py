@@ -0,0 +1,85 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import Executor
+from typing import Any, Callable, Deque, Dict, Optional
+
+
+class StageExecutor:
+    """
+    파이프라인 단계 하나의 실행기
+    - executor: 단계를 실행할 풀 (OpenCV 단계는 스레드 풀, 신경망 단계는 모델 프로세스 풀)
+    - max_concurrency: 단계별 동시 실행 제한 (제한을 넘는 호출은 이벤트 루프에서 대기)
+    - 큐 길이/실행 중 수/대기·실행 시간 지표를 단계별로 집계
+    단계마다 따로 제한하므로 가벼운 단계가 무거운 단계(DPT_Large 등) 뒤에 줄 서지 않음
+    """
+
+    def __init__(self, name: str, executor: Executor, max_concurrency: int, samples: int = 1024):
+        self.name = name
+        self.executor = executor
+        self.max_concurrency = max(1, max_concurrency)
+        self._condition: Optional[asyncio.Condition] = None
+        self._queued = 0
+        self._running = 0
+        self._waits: Deque[float] = deque(maxlen=samples)
+        self._runs: Deque[float] = deque(maxlen=samples)
+        self.calls = 0
+        self.errors = 0
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """동시 실행 제한 안에서 executor로 fn(*args) 실행"""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        enqueued = time.perf_counter()
+        self._queued += 1
+        try:
+            async with self._condition:
+                await self._condition.wait_for(lambda: self._running < self.max_concurrency)
+                self._running += 1
+        finally:
+            self._queued -= 1
+        started = time.perf_counter()
+        self._waits.append(started - enqueued)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._runs.append(time.perf_counter() - started)
+            self.calls += 1
+            async with self._condition:
+                self._running -= 1
+                self._condition.notify()
+
+    def resize(self, max_concurrency: int):
+        """동시 실행 제한 변경 (줄이는 경우 실행 중인 호출이 끝나는 대로 반영)"""
+        self.max_concurrency = max(1, max_concurrency)
+        if self._condition is not None:
+            asyncio.ensure_future(self._notify_all())
+
+    async def _notify_all(self):
+        async with self._condition:
+            self._condition.notify_all()
+
+    def metrics(self) -> Dict[str, Any]:
+        def summary(samples):
+            values = sorted(samples)
+            if not values:
+                return {'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+            return {
+                'mean': sum(values) / len(values) * 1000,
+                'p50': values[min(len(values) - 1, int(0.5 * len(values)))] * 1000,
+                'p95': values[min(len(values) - 1, int(0.95 * len(values)))] * 1000,
+                'max': values[-1] * 1000,
+            }
+
+        return {
+            'max_concurrency': self.max_concurrency,
+            'queue_depth': self._queued,
+            'running': self._running,
+            'calls': self.calls,
+            'errors': self.errors,
+            'wait_ms': summary(self._waits),
+            'run_ms': summary(self._runs),
+        }
@@ -0,0 +1,158 @@
+import logging
+import os
+import re
+import threading
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 키오스크 ID는 폴더 이름으로 쓰이므로 허용 문자 제한 (경로 조작 방지, '.'/'..'/숨김 폴더가 되지 않도록 첫 글자는 '.' 불가)
+KIOSK_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-][A-Za-z0-9_.-]{0,63}$')
+
+
+class SlotRoi:
+    """
+    키오스크 한 대의 슬롯 하나에 대한 사전 계산 아티팩트
+    - roi: 유효 픽셀 마스크 (식판 칸 안쪽, 벽/테두리 제외)
+    - empty_mask: 빈 식판 ROI 이미지 crop (once_make_masks 입력 그대로, 없으면 None)
+    - empty_z_plane: 빈 식판 깊이 맵의 ROI 평균 (depth_backend 기준, 없으면 None)
+    마스크는 업로드 해상도 기준이며 at()으로 분석 이미지 크기에 맞춰 사용 (크기별 캐시)
+    """
+    __slots__ = ('roi', 'empty_mask', 'empty_z_plane', 'depth_backend', '_resized')
+
+    def __init__(self, roi: np.ndarray, empty_mask: Optional[np.ndarray] = None,
+                 empty_z_plane: Optional[float] = None, depth_backend: Optional[str] = None):
+        self.roi = roi.astype(bool)
+        self.empty_mask = empty_mask
+        self.empty_z_plane = empty_z_plane
+        self.depth_backend = depth_backend
+        self._resized: Dict[Tuple[int, int], Tuple[np.ndarray, Tuple[int, int, int, int]]] = {}
+
+    def _resize(self, shape: Tuple[int, int]):
+        entry = self._resized.get(shape)
+        if entry is None:
+            h, w = shape
+            roi = self.roi
+            if roi.shape != (h, w):
+                roi = cv2.resize(roi.astype(np.uint8), (w, h), interpolation=cv2.INTER_NEAREST).astype(bool)
+            roi.flags.writeable = False
+            ys, xs = np.nonzero(roi.any(axis=1))[0], np.nonzero(roi.any(axis=0))[0]
+            bbox = (ys[0], ys[-1] + 1, xs[0], xs[-1] + 1) if ys.size else (0, h, 0, w)
+            entry = self._resized[shape] = (roi, bbox)
+        return entry
+
+    def at(self, shape: Tuple[int, int]) -> np.ndarray:
+        """shape(h, w) 크기의 유효 픽셀 마스크 (읽기 전용)"""
+        return self._resize(tuple(shape[:2]))[0]
+
+    def bbox(self, shape: Tuple[int, int]) -> Tuple[int, int, int, int]:
+        """shape(h, w) 크기에서 유효 픽셀을 감싸는 (y0, y1, x0, x1)"""
+        return self._resize(tuple(shape[:2]))[1]
+
+    def z_plane_for(self, backend: str) -> Optional[float]:
+        """빈 식판 깊이 z_plane (캡처한 깊이 백엔드와 같을 때만)"""
+        return self.empty_z_plane if backend == self.depth_backend else None
+
+
+def save_slot_roi(path: str, roi: np.ndarray, empty_mask: Optional[np.ndarray] = None,
+                  empty_depth: Optional[np.ndarray] = None, depth_backend: Optional[str] = None):
+    """슬롯 아티팩트를 <kiosk>/<slot>.npz 로 저장 (once_make_masks에서 사용)"""
+    arrays = {'roi': roi.astype(np.uint8)}
+    if empty_mask is not None:
+        arrays['empty_mask'] = empty_mask
+    if empty_depth is not None:
+        arrays['empty_depth'] = empty_depth.astype(np.float32)
+        arrays['depth_backend'] = np.array(depth_backend or "")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez_compressed(path, **arrays)
+
+
+def load_slot_roi(path: str) -> SlotRoi:
+    with np.load(path, allow_pickle=False) as data:
+        roi = data['roi'] > 0
+        empty_mask = data['empty_mask'] if 'empty_mask' in data else None
+        empty_z_plane = depth_backend = None
+        if 'empty_depth' in data:
+            empty_depth = data['empty_depth']
+            if empty_depth.shape != roi.shape:
+                raise ValueError(f"빈 식판 깊이 맵 크기가 ROI와 다릅니다: {path} {empty_depth.shape} != {roi.shape}")
+            if roi.any():
+                empty_z_plane = float(np.nanmean(empty_depth[roi]))
+            depth_backend = str(data['depth_backend']) or None
+    if not roi.any():
+        raise ValueError(f"유효 픽셀이 없는 ROI입니다: {path}")
+    return SlotRoi(roi, empty_mask, empty_z_plane, depth_backend)
+
+
+class TrayRoiRegistry:
+    """
+    키오스크(카메라)별 슬롯 ROI 번들 레지스트리
+    root/<kiosk_id>/<slot_name>.npz 를 처음 요청될 때 한 번 로드해 워커 수명 동안 재사용
+    root가 비어 있거나 번들이 없는 키오스크는 빈 dict (ROI 없이 기존 방식으로 분석)
+    폴더가 있는 키오스크만 캐시 (요청의 임의 kioskId로 캐시가 늘어나지 않고, 나중에 추가된 번들도 로드)
+    """
+
+    def __init__(self, root: str = "", default_kiosk: str = "default"):
+        self.root = root
+        self.default_kiosk = default_kiosk
+        self._bundles: Dict[str, Dict[str, SlotRoi]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, kiosk_id: Optional[str] = None) -> Dict[str, SlotRoi]:
+        """키오스크의 {slot_name: SlotRoi} (kiosk_id가 없으면 기본 키오스크)"""
+        kiosk_id = kiosk_id or self.default_kiosk
+        if not self.root or not KIOSK_ID_PATTERN.match(kiosk_id):
+            return {}
+        with self._lock:
+            bundle = self._bundles.get(kiosk_id)
+            if bundle is None:
+                bundle = self._load(kiosk_id)
+                if bundle is None:
+                    return {}
+                self._bundles[kiosk_id] = bundle
+            return bundle
+
+    def _load(self, kiosk_id: str) -> Optional[Dict[str, SlotRoi]]:
+        kiosk_dir = os.path.join(self.root, kiosk_id)
+        if not os.path.isdir(kiosk_dir):
+            return None
+        bundle = {}
+        for name in sorted(os.listdir(kiosk_dir)):
+            slot_name, ext = os.path.splitext(name)
+            if ext != ".npz":
+                continue
+            try:
+                bundle[slot_name] = load_slot_roi(os.path.join(kiosk_dir, name))
+            except (OSError, ValueError, KeyError) as e:
+                # 잘못된 슬롯 파일은 건너뛰고 해당 슬롯은 ROI 없이 분석
+                logger.warning("[TRAY_ROI] %s/%s 로드 실패: %s", kiosk_id, name, e)
+        return bundle
+
+    def fingerprint(self) -> Dict[str, list]:
+        """키오스크별 슬롯 번들 파일 (이름, 크기, mtime) 목록 (once_make_masks로 다시 만들면 값이 바뀜)"""
+        result = {}
+        for kiosk_id in self.kiosks():
+            kiosk_dir = os.path.join(self.root, kiosk_id)
+            files = []
+            for name in sorted(os.listdir(kiosk_dir)):
+                if not name.endswith(".npz"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(kiosk_dir, name))
+                except OSError:
+                    continue
+                files.append([name, st.st_size, st.st_mtime_ns])
+            result[kiosk_id] = files
+        return result
+
+    def kiosks(self):
+        """root 아래 번들이 있는 키오스크 ID 목록"""
+        if not self.root or not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if KIOSK_ID_PATTERN.match(name) and os.path.isdir(os.path.join(self.root, name))
+        )
@@ -0,0 +1,174 @@
+import logging
+import math
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PoolConfig(NamedTuple):
+    """워커 프로세스 수 x 워커당 연산 스레드(intra-op) 수"""
+    workers: int
+    threads: int
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_quota() -> Optional[float]:
+    """
+    컨테이너 cgroup CPU 할당량 (코어 수, 제한이 없으면 None)
+    - cgroup v2: cpu.max ("<quota> <period>" 또는 "max <period>")
+    - cgroup v1: cpu.cfs_quota_us / cpu.cfs_period_us (quota -1이면 제한 없음)
+    """
+    # cgroup v2: 자신이 속한 cgroup 경로 우선, 없으면 루트 (컨테이너 안에서는 보통 루트)
+    paths = ["/sys/fs/cgroup/cpu.max"]
+    for line in (_read("/proc/self/cgroup") or "").splitlines():
+        if line.startswith("0::") and line[3:] not in ("", "/"):
+            paths.insert(0, f"/sys/fs/cgroup{line[3:]}/cpu.max")
+    for path in paths:
+        value = _read(path)
+        if value:
+            quota, _, period = value.partition(" ")
+            if quota == "max":
+                return None
+            try:
+                return int(quota) / int(period or 100000)
+            except ValueError:
+                return None
+
+    for base in ("/sys/fs/cgroup/cpu", "/sys/fs/cgroup/cpu,cpuacct"):
+        quota, period = _read(f"{base}/cpu.cfs_quota_us"), _read(f"{base}/cpu.cfs_period_us")
+        if quota is not None and period is not None:
+            try:
+                quota, period = int(quota), int(period)
+            except ValueError:
+                return None
+            return quota / period if quota > 0 and period > 0 else None
+    return None
+
+
+def available_cpus() -> float:
+    """이 프로세스가 실제로 쓸 수 있는 코어 수 (CPU affinity와 cgroup 할당량 중 작은 값)"""
+    try:
+        cpus = float(len(os.sched_getaffinity(0)))
+    except AttributeError:
+        cpus = float(os.cpu_count() or 1)
+    quota = cgroup_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, quota)
+    return max(cpus, 1.0)
+
+
+def plan_pool(cpus: float, workers: int = 0, threads: int = 0, max_workers: int = 0) -> PoolConfig:
+    """
+    코어 예산으로 워커 수 x 스레드 수 결정 (0이면 자동)
+    - 코어 예산은 할당량의 정수 부분 (1.5코어 → 1, 초과 구독 방지)
+    - 워커 수를 먼저 채우고 (워커마다 모델을 따로 로드하므로 max_workers로 메모리 상한),
+      남는 코어는 워커당 intra-op 스레드로 분배
+    - 지정한 값도 워커 수는 min(max_workers, 코어 예산), 스레드 수는 코어 예산으로 제한
+      (설정/POST /ai/analyze-pool로 큰 값을 보내도 모델을 로드하는 프로세스가 폭증하지 않도록)
+    """
+    if workers < 0 or threads < 0:
+        raise ValueError(f"워커/스레드 수는 0(자동) 이상이어야 합니다: workers={workers}, threads={threads}")
+    budget = max(1, math.floor(cpus))
+    limit = min(max_workers, budget) if max_workers > 0 else budget
+    workers = min(workers, limit)
+    threads = min(threads, budget)
+    if workers and threads:
+        return PoolConfig(workers, threads)
+    if threads:
+        return PoolConfig(max(1, min(limit, budget // threads)), threads)
+    if not workers:
+        workers = limit
+    return PoolConfig(workers, max(1, budget // workers))
+
+
+class ResizableProcessPool(Executor):
+    """
+    실행 중에 워커 수/스레드 수를 바꿀 수 있는 프로세스 풀
+    - resize()는 새 설정으로 풀을 만들어 이후 submit을 넘기고,
+      이전 풀은 이미 제출된 작업을 끝낸 뒤 종료 (진행 중인 요청은 그대로 완료)
+    - 워커가 비정상 종료되어 풀이 깨지면 다음 submit에서 같은 설정으로 새 풀을 만들어 복구
+    - initializer에는 initargs 뒤에 워커당 스레드 수가 추가 인자로 전달됨
+    - on_replace: 풀이 교체(크기 변경/복구)된 뒤 호출되는 콜백 (워밍업 재실행 등)
+    """
+
+    def __init__(self, config: PoolConfig, initializer: Callable[..., Any], initargs: Tuple = (),
+                 on_replace: Optional[Callable[[], Any]] = None):
+        self._initializer = initializer
+        self._initargs = tuple(initargs)
+        self._lock = threading.Lock()
+        self.on_replace = on_replace
+        self.resizes = 0
+        self.restarts = 0
+        self.config = config
+        self._executor = self._create(config)
+
+    def _create(self, config: PoolConfig) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=config.workers,
+            initializer=self._initializer,
+            initargs=(*self._initargs, config.threads),
+        )
+
+    @property
+    def max_workers(self) -> int:
+        return self.config.workers
+
+    @property
+    def generation(self) -> int:
+        """풀이 교체될 때마다 증가 (워밍업 대상 풀 식별용)"""
+        return self.resizes + self.restarts
+
+    def submit(self, fn, /, *args, **kwargs):
+        with self._lock:
+            try:
+                return self._executor.submit(fn, *args, **kwargs)
+            except BrokenProcessPool:
+                # 워커 비정상 종료(OOM 등)로 깨진 풀은 새로 만들고, 깨진 풀의 작업은 이미 실패 처리됨
+                logger.warning("[WORKER_POOL] Process pool broken, restarting %d workers", self.config.workers)
+                self._executor.shutdown(wait=False)
+                self._executor = self._create(self.config)
+                self.restarts += 1
+                future = self._executor.submit(fn, *args, **kwargs)
+        self._replaced()
+        return future
+
+    def _replaced(self):
+        if self.on_replace is not None:
+            self.on_replace()
+
+    def resize(self, config: PoolConfig) -> PoolConfig:
+        """새 설정으로 풀 교체 (같은 설정이면 유지), 이전 설정 반환"""
+        with self._lock:
+            previous = self.config
+            if config == previous:
+                return previous
+            old, self._executor, self.config = self._executor, self._create(config), config
+            self.resizes += 1
+        old.shutdown(wait=False)
+        self._replaced()
+        return previous
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self._lock:
+            executor = self._executor
+        executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'workers': self.config.workers,
+            'threads_per_worker': self.config.threads,
+            'available_cpus': available_cpus(),
+            'resizes': self.resizes,
+            'restarts': self.restarts,
+        }
@@ -1,9 +1,11 @@
+import logging
 from typing import Dict, Any
 import time
 
 from ..services.llm_service import LLMService, waste_plan_fn, nutrition_plan_fn, integration_plan_fn
 from ..core.prompts import PromptTemplates
-from ..config import settings
+
+logger = logging.getLogger(__name__)
 
 class WastePlanAgent:
     """잔반율 기반 식단 생성 에이전트"""  
@@ -24,11 +26,10 @@ class WastePlanAgent:
         start_time = time.time()
         leftover_data = state.get("leftover_data", {})
         menu_pool = state.get("menu_pool", [])
-        if settings.DEBUG:
-            print(f"[AGENT][WastePlanAgent] Extracted data:")
-            print(f"  - Leftover data: {len(leftover_data)} items")
-            print(f"  - Menu pool: {len(menu_pool)} items")
-            print(f"[AGENT][WastePlanAgent] Generating prompt")
+        logger.debug("[AGENT][WastePlanAgent] Extracted data:")
+        logger.debug("  - Leftover data: %s items", len(leftover_data))
+        logger.debug("  - Menu pool: %s items", len(menu_pool))
+        logger.debug("[AGENT][WastePlanAgent] Generating prompt")
 
         # 프롬프트 생성
         prompt = PromptTemplates.waste_based_templates(
@@ -37,15 +38,13 @@ class WastePlanAgent:
             holidays=holidays
         )
 
-        if settings.DEBUG:
-            print(f"[AGENT][WastePlanAgent] Calling LLM with prompt of length {len(prompt)}")
+        logger.debug("[AGENT][WastePlanAgent] Calling LLM with prompt of length %s", len(prompt))
         
         # LLM 호출
         waste_plan = await self.llm_service.generate_structured_response(prompt, function_def=waste_plan_fn)
 
-        if settings.DEBUG:
-            print(f"[AGENT][WastePlanAgent] Received waste plan with {len(waste_plan)} days")
-            print(f"[AGENT][WastePlanAgent] Processing time: {time.time() - start_time:.4f} seconds")
+        logger.debug("[AGENT][WastePlanAgent] Received waste plan with %s days", len(waste_plan))
+        logger.debug("[AGENT][WastePlanAgent] Processing time: %.4f seconds", time.time() - start_time)
 
         # 결과 반환
         return {"waste_plan": waste_plan}
@@ -1,11 +1,14 @@
 # LangGraph 워크플로우 정의 (식단 에이전트)
+import logging
 import asyncio
-import time, json
+import time
 
 from typing import Dict, Any
 
 from .agents import WastePlanAgent, NutritionPlanAgent, IntegrationAgent
-from ..config import settings
+from ..core.logger import lazy_json
+
+logger = logging.getLogger(__name__)
 
 class MenuPlanningWorkflow:
     """식단 계획 워크플로우"""
@@ -26,12 +29,13 @@ class MenuPlanningWorkflow:
             Dict: 최종 결과
         """
         # 디버그 로그
-        if settings.DEBUG:
-            print(f"[WORKFLOW] Starting workflow with input state keys: {', '.join(init_state.keys())}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[WORKFLOW] Starting workflow with input state keys: %s", ', '.join(init_state.keys()))
             start_time = time.time()
             if "menu_pool" in init_state:
                 total_menus = sum(len(menus) for menus in init_state["menu_pool"].values())
-                print(f"[WORKFLOW] Menu pool contains {total_menus} menus in {len(init_state['menu_pool'])} categories")
+                logger.debug("[WORKFLOW] Menu pool contains %s menus in %s categories",
+                             total_menus, len(init_state['menu_pool']))
         
         # 1. 병렬로 잔반율 기반 식단과 영양소 기반 식단 생성
         waste_task = asyncio.create_task(self.waste_agent.process(init_state, holidays))
@@ -39,48 +43,44 @@ class MenuPlanningWorkflow:
         waste_task = asyncio.create_task(self.waste_agent.process(init_state, holidays))
         nutrition_task = asyncio.create_task(self.nutrition_agent.process(init_state, holidays))
 
-        if settings.DEBUG:
-            print(f"[WORKFLOW] Starting parallel execution of waste and nutrition agents")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[WORKFLOW] Starting parallel execution of waste and nutrition agents")
             waste_start_time = time.time()
 
         # 병렬 실행 대기
         waste_result, nutrition_result = await asyncio.gather(waste_task, nutrition_task)
 
         # 결과 출력 (디버깅용)
-        if settings.DEBUG:
-            print("\n=== WASTE PLAN RESULT ===")
-            print(json.dumps(waste_result, ensure_ascii=False, indent=2))
-            print("\n=== NUTRITION PLAN RESULT ===")
-            print(json.dumps(nutrition_result, ensure_ascii=False, indent=2))
+        # 계획 JSON은 DEBUG 레벨에서만 직렬화
+        logger.debug("[WORKFLOW] === WASTE PLAN RESULT ===\n%s", lazy_json(waste_result, indent=2))
+        logger.debug("[WORKFLOW] === NUTRITION PLAN RESULT ===\n%s", lazy_json(nutrition_result, indent=2))
 
-        if settings.DEBUG:
+        if logger.isEnabledFor(logging.DEBUG):
             waste_duration = time.time() - waste_start_time
-            print(f"[WORKFLOW] Parallel execution completed in {waste_duration:.4f} seconds")
+            logger.debug("[WORKFLOW] Parallel execution completed in %.4f seconds", waste_duration)
             if "waste_plan" in waste_result:
-                print(f"[WORKFLOW] Waste agent generated plan with {len(waste_result['waste_plan'])} days")
+                logger.debug("[WORKFLOW] Waste agent generated plan with %s days", len(waste_result['waste_plan']))
             if "nutrition_plan" in nutrition_result:
-                print(f"[WORKFLOW] Nutrition agent generated plan with {len(nutrition_result['nutrition_plan'])} days")
+                logger.debug("[WORKFLOW] Nutrition agent generated plan with %s days", len(nutrition_result['nutrition_plan']))
 
         # 2. 상태 업데이터
         state = {**init_state, **waste_result, **nutrition_result}
 
         # 디버그 로그
-        if settings.DEBUG:
-            print(f"[WORKFLOW] Intermediate state after agents : {state.keys()}")
+        logger.debug("[WORKFLOW] Intermediate state after agents : %s", state.keys())
         
         # 3. 통합 에이전트 실행
         final_result = await self.integration_agent.process(state, holidays)
         
-        if settings.DEBUG:
-            print(f"final_reuslt: {final_result}")
+        logger.debug("[WORKFLOW] final_reuslt: %s", final_result)
 
         # 4. 최종 상태 업데이트
         state.update(final_result)
 
         # 디버그 로그
-        if settings.DEBUG:
+        if logger.isEnabledFor(logging.DEBUG):
             total_duration = time.time() - start_time
-            print(f"[WORKFLOW] Workflow completed in {total_duration:.4f} seconds")
-            print(f"[WORKFLOW] Final state has {len(state)} keys")
+            logger.debug("[WORKFLOW] Workflow completed in %.4f seconds", total_duration)
+            logger.debug("[WORKFLOW] Final state has %s keys", len(state))
             
         return state
\ No newline at end of file
@@ -1,8 +1,10 @@
 # 식단 통합 로직
+import logging
 import time
 from typing import Dict, List, Any
 from ..services.menu_service import MenuService
-from ..config import settings
+
+logger = logging.getLogger(__name__)
 
 class MenuIntegrator:
     """메뉴 통합 로직"""
@@ -18,9 +20,11 @@ class MenuIntegrator:
 
     async def integrate_plans(self, waste_plan: Dict[str, List[str]], nutrition_plan: Dict[str, List[str]],
                               menu_pool: Dict[str, List[str]]) -> Dict[str, Any]:
-        if settings.DEBUG:
-            print(f"[INTEGRATOR] Starting integration of {len(waste_plan)} days from waste plan and {len(nutrition_plan)} days from nutrition plan")
-            print(f"[INTEGRATOR] Menu pool contains {sum(len(menus) for menus in menu_pool.values())} menus in {len(menu_pool)} categories")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[INTEGRATOR] Starting integration of %s days from waste plan and %s days from nutrition plan",
+                         len(waste_plan), len(nutrition_plan))
+            logger.debug("[INTEGRATOR] Menu pool contains %s menus in %s categories",
+                         sum(len(menus) for menus in menu_pool.values()), len(menu_pool))
             start_time = time.time()
         """
         잔반 기반 식단과 영양 기반 식단 통합
@@ -32,23 +36,22 @@ class MenuIntegrator:
         Returns:
             Dict: 통합된 식단과 메트릭
         """
-        if settings.DEBUG:
-            print(f"[INTEGRATOR] Validating and enriching integrated plan")
+        logger.debug("[INTEGRATOR] Validating and enriching integrated plan")
         
         # 통합 식단 검증
         validated_plan = await self.menu_service.validate_menu_plan_async(waste_plan, menu_pool)
 
-        if settings.DEBUG:
+        if logger.isEnabledFor(logging.DEBUG):
             validation_duration = time.time() - start_time
-            print(f"[INTEGRATOR] Validation completed in {validation_duration:.4f} seconds")
-            print(f"[INTEGRATOR] Validated plan has {len(validated_plan)} days")
+            logger.debug("[INTEGRATOR] Validation completed in %.4f seconds", validation_duration)
+            logger.debug("[INTEGRATOR] Validated plan has %s days", len(validated_plan))
 
         # 대체 메뉴 생성
         alternatives = await self.generate_alternatives(validated_plan, menu_pool)
 
-        if settings.DEBUG:
+        if logger.isEnabledFor(logging.DEBUG):
             total_duration = time.time() - start_time
-            print(f"[INTEGRATOR] Integration process completed in {total_duration:.4f} seconds")
+            logger.debug("[INTEGRATOR] Integration process completed in %.4f seconds", total_duration)
     
         return {
             "integrated_plan": validated_plan,
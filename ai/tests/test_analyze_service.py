@@ -0,0 +1,168 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.services.analyze_service import AnalyzeService, analysis_version, validate_settings
+from app.services.result_store import ResultStore
+from app.services.tray_roi import save_slot_roi
+
+BEFORE = {"rice": "https://s3/kiosk_before_rice.jpg", "soup": "https://s3/kiosk_before_soup.jpg"}
+AFTER = {"rice": "https://s3/kiosk_after_rice.jpg", "soup": "https://s3/kiosk_after_soup.jpg"}
+
+
+class FakeImageCache:
+    """URL → 내용 (키오스크처럼 같은 URL에 덮어쓸 수 있음)"""
+
+    def __init__(self):
+        self.contents = {url: url for url in [*BEFORE.values(), *AFTER.values()]}
+
+    async def fetch(self, url):
+        await asyncio.sleep(0)
+        content = self.contents[url]
+        return np.zeros((2, 2, 3), np.uint8), f"digest:{content}"
+
+
+def make_service(tmp_path, delay=0.05, fail=False):
+    service = AnalyzeService.__new__(AnalyzeService)
+    service.image_cache = FakeImageCache()
+    service.result_store = ResultStore(str(tmp_path / "results.sqlite3"), "test")
+    service._inflight = {}
+    service.inflight_joins = 0
+    service.calls = []
+
+    async def analyze(before_images, after_images, student_info, kiosk_id=None, stored_before=None, images=None):
+        service.calls.append(dict(stored_before or {}))
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError("worker crashed")
+        before = {category: {"backproj_percentage": 90.0, "food_volume_cm3": 10.0, "resnet_result": None,
+                             "trace": {}} for category in before_images}
+        rate = {category: float(len(service.calls)) for category in after_images}
+        return rate, {"leftover": rate}, before
+
+    service._analyze_leftover = analyze
+    return service
+
+
+def analyze(service, student_id=1):
+    return service.analyze_leftover_images(BEFORE, AFTER, {"id": student_id, "name": "student"})
+
+
+def test_concurrent_identical_requests_share_one_analysis(tmp_path):
+    service = make_service(tmp_path)
+
+    async def run():
+        return await asyncio.gather(*[analyze(service) for _ in range(3)])
+
+    results = asyncio.run(run())
+    assert len(service.calls) == 1
+    assert service.inflight_joins == 2
+    assert all(r["leftoverRate"] == {"rice": 1.0, "soup": 1.0} for r in results)
+    assert service._inflight == {}
+
+
+def test_repeated_request_is_served_from_store(tmp_path):
+    service = make_service(tmp_path)
+    asyncio.run(analyze(service))
+    result = asyncio.run(analyze(service))
+    assert len(service.calls) == 1
+    assert result["leftoverRate"] == {"rice": 1.0, "soup": 1.0}
+    # 다른 학생은 다른 결과 키
+    asyncio.run(analyze(service, student_id=2))
+    assert len(service.calls) == 2
+
+
+def test_overwritten_image_at_same_url_is_reanalysed(tmp_path):
+    service = make_service(tmp_path)
+    asyncio.run(analyze(service))
+    # 다음 식사: 키오스크가 같은 S3 키에 새 식후 이미지를 덮어씀
+    service.image_cache.contents[AFTER["rice"]] = "next meal"
+    result = asyncio.run(analyze(service))
+    assert len(service.calls) == 2
+    assert result["leftoverRate"] == {"rice": 2.0, "soup": 2.0}
+    # 식전 이미지 내용은 같으므로 저장된 식전 슬롯 결과를 재사용
+    assert set(service.calls[1]) == {"rice", "soup"}
+
+    service.image_cache.contents[BEFORE["soup"]] = "next tray"
+    asyncio.run(analyze(service))
+    assert set(service.calls[2]) == {"rice"}
+
+
+def test_cancelled_request_keeps_analysis_for_retry(tmp_path):
+    service = make_service(tmp_path, delay=0.1)
+
+    async def run():
+        first = asyncio.ensure_future(analyze(service))
+        await asyncio.sleep(0.02)
+        first.cancel()
+        return await analyze(service)
+
+    result = asyncio.run(run())
+    assert len(service.calls) == 1
+    assert service.inflight_joins == 1
+    assert result["leftoverRate"] == {"rice": 1.0, "soup": 1.0}
+
+
+def test_failures_reach_every_waiter_and_are_not_stored(tmp_path):
+    service = make_service(tmp_path, fail=True)
+
+    async def run():
+        return await asyncio.gather(analyze(service), analyze(service), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(service.calls) == 1
+    with pytest.raises(RuntimeError):
+        asyncio.run(analyze(service))
+    assert len(service.calls) == 2
+    assert service.result_store.metrics()["writes"] == 0
+
+
+@pytest.mark.parametrize("reduction", [0, 3, 16])
+def test_invalid_decode_reduction_is_rejected(monkeypatch, reduction):
+    monkeypatch.setattr(settings, "DECODE_REDUCTION", reduction)
+    with pytest.raises(ValueError):
+        validate_settings()
+
+
+def test_default_settings_are_valid():
+    validate_settings()
+
+
+@pytest.mark.parametrize("mode", ["int8", "Dynamic", ""])
+def test_invalid_quantize_mode_is_rejected(monkeypatch, mode):
+    monkeypatch.setattr(settings, "QUANTIZE_MODE", mode)
+    with pytest.raises(ValueError, match="QUANTIZE_MODE"):
+        validate_settings()
+
+
+def test_analysis_version_tracks_tray_roi_bundles(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "RESULT_STORE_MODEL_VERSION", "")
+    monkeypatch.setattr(settings, "TRAY_ROI_DIR", str(tmp_path))
+    path = tmp_path / "kiosk-1" / "rice.npz"
+    save_slot_roi(str(path), np.ones((4, 4), np.uint8))
+    version = analysis_version(str(tmp_path / "weights.pth"), {settings.DEPTH_BACKEND})
+    assert version == analysis_version(str(tmp_path / "weights.pth"), {settings.DEPTH_BACKEND})
+    # once_make_masks가 같은 경로에 번들을 다시 만든 경우
+    save_slot_roi(str(path), np.ones((4, 4), np.uint8))
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 1_000_000))
+    assert analysis_version(str(tmp_path / "weights.pth"), {settings.DEPTH_BACKEND}) != version
+
+
+def test_import_does_not_reseed_global_rngs():
+    # 이미 import된 모듈로는 확인할 수 없으므로 새 인터프리터에서 확인
+    code = (
+        "import numpy as np, random\n"
+        "np.random.seed(1); random.seed(1); expected = (np.random.rand(), random.random())\n"
+        "np.random.seed(1); random.seed(1)\n"
+        "import app.services.analyze_service\n"
+        "assert (np.random.rand(), random.random()) == expected\n"
+    )
+    env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "x")}
+    subprocess.run([sys.executable, "-c", code], check=True, env=env,
+                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
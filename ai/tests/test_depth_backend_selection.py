@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from app.benchmarks.depth_backends import select_backends
+from app.services.custom_model import DEFAULT_DEPTH_BACKEND, load_depth_backend_selection
+
+
+def write_selection(tmp_path, selection):
+    path = tmp_path / "depth_backends.json"
+    path.write_text(json.dumps({"selection": selection}), encoding="utf-8")
+    return str(path)
+
+
+def test_missing_file_selects_nothing(tmp_path):
+    assert load_depth_backend_selection("") == {}
+    assert load_depth_backend_selection(str(tmp_path / "none.json")) == {}
+
+
+def test_default_backend_selection_is_allowed(tmp_path):
+    selection = {"rice": DEFAULT_DEPTH_BACKEND, "soup": DEFAULT_DEPTH_BACKEND}
+    assert load_depth_backend_selection(write_selection(tmp_path, selection)) == selection
+
+
+@pytest.mark.parametrize("backend", ["DPT_Hybrid", "MiDaS_small"])
+def test_uncalibrated_backend_is_refused(tmp_path, backend):
+    with pytest.raises(ValueError, match="z_plane"):
+        load_depth_backend_selection(write_selection(tmp_path, {"rice": backend}))
+
+
+def test_uncalibrated_default_backend_is_allowed(tmp_path):
+    path = write_selection(tmp_path, {"rice": "MiDaS_small"})
+    assert load_depth_backend_selection(path, default_backend="MiDaS_small") == {"rice": "MiDaS_small"}
+
+
+def test_unknown_backend_is_refused(tmp_path):
+    with pytest.raises(ValueError):
+        load_depth_backend_selection(write_selection(tmp_path, {"rice": "DPT_Tiny"}))
+
+
+def test_benchmark_skips_uncalibrated_backends():
+    def rows(latency, volume):
+        return [{"image": "rice_1.jpg", "slot": "rice", "latency_ms": latency, "volume_pct": volume}]
+
+    results = {DEFAULT_DEPTH_BACKEND: rows(900.0, 40.0), "MiDaS_small": rows(50.0, 40.0)}
+    selection, per_slot = select_backends(results, DEFAULT_DEPTH_BACKEND, tolerance=1.0)
+    assert selection == {"rice": DEFAULT_DEPTH_BACKEND}
+    assert "MiDaS_small" in per_slot["rice"]
@@ -0,0 +1,95 @@
+import asyncio
+
+import numpy as np
+
+from app.services.image_cache import ImageCache
+
+
+class FakeObjectStore:
+    """ETag 조건부 요청을 지원하는 S3 흉내 (같은 키에 덮어쓰면 ETag가 바뀜)"""
+
+    def __init__(self, etags=True):
+        self.objects = {}
+        self.etags = etags
+        self.requests = []
+
+    def put(self, url, content):
+        version = self.objects.get(url, (None, 0))[1] + 1
+        self.objects[url] = (content, version)
+
+    async def fetch_conditional(self, url, etag=None):
+        self.requests.append((url, etag))
+        content, version = self.objects[url]
+        current = f'"v{version}"' if self.etags else None
+        if etag is not None and etag == current:
+            return 304, b"", etag
+        return 200, content, current
+
+
+def decode(content):
+    return np.frombuffer(content, dtype=np.uint8).copy()
+
+
+def make_cache(store, tmp_path=None, **kwargs):
+    return ImageCache(store, decode, disk_dir=str(tmp_path) if tmp_path else "", **kwargs)
+
+
+def test_overwritten_object_is_refetched(tmp_path):
+    store = FakeObjectStore()
+    cache = make_cache(store, tmp_path)
+    store.put("u", b"\x01\x01")
+    first = asyncio.run(cache.get("u"))
+    store.put("u", b"\x02\x02")
+    second = asyncio.run(cache.get("u"))
+    assert first.tolist() == [1, 1]
+    assert second.tolist() == [2, 2]
+    # 같은 디스크 폴더로 새로 만든 캐시도 이전 이미지를 돌려주지 않음
+    store.put("u", b"\x03\x03")
+    assert asyncio.run(make_cache(store, tmp_path).get("u")).tolist() == [3, 3]
+
+
+def test_unchanged_object_is_revalidated_without_download(tmp_path):
+    store = FakeObjectStore()
+    cache = make_cache(store, tmp_path)
+    store.put("u", b"\x01\x01")
+    asyncio.run(cache.get("u"))
+    img, digest = asyncio.run(cache.fetch("u"))
+    assert img.tolist() == [1, 1]
+    assert store.requests[-1] == ("u", '"v1"')
+    assert cache.revalidated == 1 and cache.misses == 1
+    assert asyncio.run(cache.fetch("u"))[1] == digest
+
+
+def test_without_etag_same_content_skips_decode():
+    store = FakeObjectStore(etags=False)
+    cache = make_cache(store)
+    store.put("u", b"\x01\x01")
+    asyncio.run(cache.get("u"))
+    asyncio.run(cache.get("u"))
+    assert len(store.requests) == 2
+    assert cache.misses == 1 and cache.memory_hits == 1
+    store.put("u", b"\x05")
+    assert asyncio.run(cache.get("u")).tolist() == [5]
+
+
+def test_url_ttl_without_revalidation():
+    store = FakeObjectStore()
+    store.put("u", b"\x01")
+    cache = make_cache(store, revalidate=False, url_ttl=60.0)
+    asyncio.run(cache.get("u"))
+    store.put("u", b"\x02")
+    # TTL 안에서는 네트워크 없이 캐시 사용
+    assert asyncio.run(cache.get("u")).tolist() == [1]
+    assert len(store.requests) == 1
+    cache.url_ttl = 0.0
+    assert asyncio.run(cache.get("u")).tolist() == [2]
+
+
+def test_content_digest_changes_with_content():
+    store = FakeObjectStore()
+    cache = make_cache(store)
+    store.put("u", b"\x01")
+    _, first = asyncio.run(cache.fetch("u"))
+    store.put("u", b"\x02")
+    _, second = asyncio.run(cache.fetch("u"))
+    assert first != second
@@ -0,0 +1,196 @@
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.services.inference_scheduler import InferenceScheduler
+
+
+class FakeRunner:
+    """run_batch 대역: 호출된 배치와 동시 실행 수를 기록하고 job * 10을 반환"""
+
+    def __init__(self, delay=0.01, fail_on=None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.batches = []
+        self.active = 0
+        self.peak = 0
+        self.gate = None
+
+    async def __call__(self, key, jobs, options):
+        self.batches.append((key, list(jobs)))
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            if self.gate is not None:
+                await self.gate.wait()
+            await asyncio.sleep(self.delay)
+            if self.fail_on is not None and self.fail_on in jobs:
+                raise RuntimeError(f"bad job {self.fail_on}")
+            return [job * 10 for job in jobs]
+        finally:
+            self.active -= 1
+
+
+def test_dispatch_groups_jobs_by_key_up_to_max_batch_size():
+    runner = FakeRunner()
+    scheduler = InferenceScheduler(runner, max_batch_size=4, max_wait=0.02, max_concurrency=1)
+
+    async def run():
+        jobs = [scheduler.submit(i, key="a") for i in range(5)] + [scheduler.submit(i, key="b") for i in range(5, 7)]
+        results = await asyncio.gather(*jobs)
+        await scheduler.close()
+        return results
+
+    assert asyncio.run(run()) == [i * 10 for i in range(7)]
+    assert sorted(job for _, jobs in runner.batches for job in jobs) == list(range(7))
+    for key, jobs in runner.batches:
+        assert len(jobs) <= 4
+        assert all((job < 5) == (key == "a") for job in jobs)
+    metrics = scheduler.metrics()
+    assert metrics["jobs"] == 7 and metrics["batches"] == len(runner.batches) < 7
+
+
+def test_cancelled_job_is_dropped_before_dispatch():
+    runner = FakeRunner()
+    scheduler = InferenceScheduler(runner, max_batch_size=4, max_wait=0, max_concurrency=1)
+
+    async def run():
+        runner.gate = asyncio.Event()
+        first = asyncio.ensure_future(scheduler.submit(1))
+        await asyncio.sleep(0.01)
+        # 워커가 바쁜 동안 대기 중인 job 취소
+        second = asyncio.ensure_future(scheduler.submit(2))
+        third = asyncio.ensure_future(scheduler.submit(3))
+        await asyncio.sleep(0.01)
+        second.cancel()
+        runner.gate.set()
+        results = await asyncio.gather(first, third)
+        await scheduler.close()
+        return results
+
+    assert asyncio.run(run()) == [10, 30]
+    assert [jobs for _, jobs in runner.batches] == [[1], [3]]
+    assert scheduler.metrics()["dropped"] == 1
+
+
+def test_resize_changes_concurrent_batches():
+    runner = FakeRunner(delay=0.02)
+    scheduler = InferenceScheduler(runner, max_batch_size=1, max_wait=0, max_concurrency=1)
+
+    async def run():
+        await asyncio.gather(*[scheduler.submit(i) for i in range(4)])
+        assert runner.peak == 1
+        scheduler.resize(3)
+        runner.peak = 0
+        await asyncio.gather(*[scheduler.submit(i) for i in range(6)])
+        assert runner.peak == 3
+        # 줄이는 경우 실행 중인 배치가 끝나면 반영
+        scheduler.resize(1)
+        runner.peak = 0
+        await asyncio.gather(*[scheduler.submit(i) for i in range(4)])
+        assert runner.peak == 1
+        await scheduler.close()
+
+    asyncio.run(run())
+    assert scheduler.metrics()["max_concurrency"] == 1
+
+
+def test_failed_batch_only_fails_the_bad_job():
+    runner = FakeRunner(fail_on=2)
+    scheduler = InferenceScheduler(runner, max_batch_size=8, max_wait=0.05, max_concurrency=1)
+
+    async def run():
+        results = await asyncio.gather(*[scheduler.submit(i) for i in range(4)], return_exceptions=True)
+        await scheduler.close()
+        return results
+
+    results = asyncio.run(run())
+    assert results[0] == 0 and results[1] == 10 and results[3] == 30
+    assert isinstance(results[2], RuntimeError)
+    # 배치 1번 + job별 재실행 4번
+    assert [jobs for _, jobs in runner.batches] == [[0, 1, 2, 3], [0], [1], [2], [3]]
+    assert scheduler.metrics()["isolated_batches"] == 1
+
+
+def test_single_job_failure_is_not_retried():
+    runner = FakeRunner(fail_on=1)
+    scheduler = InferenceScheduler(runner, max_batch_size=8, max_wait=0, max_concurrency=1)
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await scheduler.submit(1)
+        await scheduler.close()
+
+    asyncio.run(run())
+    assert len(runner.batches) == 1
+    assert scheduler.metrics()["isolated_batches"] == 0
+
+
+def test_close_cancels_queued_jobs():
+    runner = FakeRunner()
+    scheduler = InferenceScheduler(runner, max_batch_size=1, max_wait=0, max_concurrency=1)
+
+    async def run():
+        runner.gate = asyncio.Event()
+        tasks = [asyncio.ensure_future(scheduler.submit(i)) for i in range(3)]
+        await asyncio.sleep(0.01)
+        await scheduler.close()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
+
+
+class BrokenPoolRunner(FakeRunner):
+    """첫 호출부터(또는 retry_breaks이면 job별 재실행에서) 워커 풀이 망가진 경우"""
+
+    def __init__(self, retry_breaks=False):
+        super().__init__(fail_on=2)
+        self.retry_breaks = retry_breaks
+
+    async def __call__(self, key, jobs, options):
+        self.batches.append((key, list(jobs)))
+        await asyncio.sleep(self.delay)
+        if len(jobs) > 1 and not self.retry_breaks:
+            raise BrokenProcessPool("pool died")
+        if len(jobs) > 1:
+            raise RuntimeError("bad job")
+        raise BrokenProcessPool("pool died")
+
+
+@pytest.mark.parametrize("retry_breaks, calls", [(False, 1), (True, 2)])
+def test_broken_pool_is_not_retried_per_job(retry_breaks, calls):
+    runner = BrokenPoolRunner(retry_breaks)
+    scheduler = InferenceScheduler(runner, max_batch_size=8, max_wait=0.05, max_concurrency=1)
+
+    async def run():
+        results = await asyncio.gather(*[scheduler.submit(i) for i in range(4)], return_exceptions=True)
+        await scheduler.close()
+        return results
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, BrokenProcessPool) for r in results)
+    assert len(runner.batches) == calls
+
+
+def test_restarted_dispatcher_keeps_slot_count():
+    runner = FakeRunner(delay=0.02)
+    scheduler = InferenceScheduler(runner, max_batch_size=1, max_wait=0, max_concurrency=2)
+
+    async def run():
+        await asyncio.gather(*[scheduler.submit(i) for i in range(4)])
+        # 디스패처가 배치 창 대기 중에 취소돼도 잡고 있던 슬롯은 반환
+        scheduler.max_wait = 1.0
+        pending = asyncio.ensure_future(scheduler.submit(99))
+        await asyncio.sleep(0.01)
+        await scheduler.close()
+        assert pending.cancelled()
+        scheduler.max_wait = 0
+        runner.peak = 0
+        await asyncio.gather(*[scheduler.submit(i) for i in range(6)])
+        assert runner.peak == 2
+        await scheduler.close()
+
+    asyncio.run(run())
+    assert scheduler._slots._value == 2
@@ -0,0 +1,59 @@
+import time
+
+from app.services.result_store import ResultStore
+
+
+def make_store(tmp_path, version="v1", **kwargs):
+    return ResultStore(str(tmp_path / "results.sqlite3"), version, **kwargs)
+
+
+def test_key_depends_on_content_not_order(tmp_path):
+    store = make_store(tmp_path)
+    key = store.make_key(1, {"rice": "a", "soup": "b"}, {"rice": "c", "soup": "d"}, "k1")
+    assert key == store.make_key(1, {"soup": "b", "rice": "a"}, {"soup": "d", "rice": "c"}, "k1")
+    # 같은 URL이라도 이미지 내용(해시)이 바뀌면 다른 키
+    assert key != store.make_key(1, {"rice": "a", "soup": "b"}, {"rice": "c", "soup": "X"}, "k1")
+    assert key != store.make_key(2, {"rice": "a", "soup": "b"}, {"rice": "c", "soup": "d"}, "k1")
+    assert key != store.make_key(1, {"rice": "a", "soup": "b"}, {"rice": "c", "soup": "d"}, "k2")
+    assert key != make_store(tmp_path, "v2").make_key(1, {"rice": "a", "soup": "b"}, {"rice": "c", "soup": "d"}, "k1")
+    assert store.slot_key("a", "k1") != store.slot_key("b", "k1")
+    assert store.slot_key("a", "k1") != store.slot_key("a", "k2")
+
+
+def test_put_get_round_trip(tmp_path):
+    store = make_store(tmp_path)
+    slot_key = store.slot_key("a")
+    store.put("key", 1, {"rice": 12.5}, {"before": {"rice": {"backproj": 90.0}}}, {slot_key: {"food_volume_cm3": 3.0}})
+    assert store.get("key") == {"leftoverRate": {"rice": 12.5}, "details": {"before": {"rice": {"backproj": 90.0}}}}
+    assert store.get_slots([slot_key, "missing"]) == {slot_key: {"food_volume_cm3": 3.0}}
+    assert store.get("missing") is None
+    metrics = store.metrics()
+    assert (metrics["hits"], metrics["misses"], metrics["slot_hits"], metrics["slot_misses"]) == (1, 1, 1, 1)
+    # 다시 연 저장소(재시작)에서도 조회
+    store.close()
+    assert make_store(tmp_path).get("key")["leftoverRate"] == {"rice": 12.5}
+
+
+def test_ttl_expires_and_prunes(tmp_path, monkeypatch):
+    store = make_store(tmp_path, ttl_seconds=10.0, prune_interval=0.0)
+    store.put("old", 1, {"rice": 1.0}, {}, {store.slot_key("a"): {}})
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert store.get("old") is None
+    assert store.get_slots([store.slot_key("a")]) == {}
+    store.put("new", 1, {"rice": 2.0}, {})
+    assert store.metrics()["pruned"] == 2
+    assert store.get("new")["leftoverRate"] == {"rice": 2.0}
+
+
+def test_model_version_mismatch_is_a_miss(tmp_path):
+    make_store(tmp_path, "v1").put("key", 1, {"rice": 1.0}, {})
+    assert make_store(tmp_path, "v2").get("key") is None
+
+
+def test_database_errors_are_misses(tmp_path):
+    store = make_store(tmp_path)
+    store.close()
+    assert store.get("key") is None
+    store.put("key", 1, {"rice": 1.0}, {})
+    assert store.metrics()["errors"] == 2
@@ -0,0 +1,47 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import router
+from app.config import settings
+
+
+class FakeAnalyzeService:
+    def __init__(self):
+        self.resizes = []
+
+    def resize_pool(self, workers=0, threads=0):
+        self.resizes.append((workers, threads))
+        return {"workers": workers, "threads_per_worker": threads}
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(router)
+    app.state.analyze_service = FakeAnalyzeService()
+    return TestClient(app)
+
+
+def test_pool_resize_is_disabled_without_admin_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "ANALYZE_POOL_ADMIN_TOKEN", "")
+    response = client.post("/ai/analyze-pool", json={"workers": 2}, headers={"X-Admin-Token": ""})
+    assert response.status_code == 404
+    assert client.app.state.analyze_service.resizes == []
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Admin-Token": "wrong"}])
+def test_pool_resize_requires_matching_token(client, monkeypatch, headers):
+    monkeypatch.setattr(settings, "ANALYZE_POOL_ADMIN_TOKEN", "secret")
+    response = client.post("/ai/analyze-pool", json={"workers": 2}, headers=headers)
+    assert response.status_code == 403
+    assert client.app.state.analyze_service.resizes == []
+
+
+def test_pool_resize_with_admin_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "ANALYZE_POOL_ADMIN_TOKEN", "secret")
+    response = client.post("/ai/analyze-pool", json={"workers": 2, "threads": 1},
+                           headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert client.app.state.analyze_service.resizes == [(2, 1)]
+
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from app.services import shm_transport
+from app.services.shm_transport import SharedImageBatch
+
+
+@pytest.fixture
+def segments(monkeypatch):
+    created = []
+    original = shm_transport.shared_memory.SharedMemory
+
+    def record(*args, **kwargs):
+        shm = original(*args, **kwargs)
+        created.append(shm.name)
+        return shm
+
+    monkeypatch.setattr(shm_transport.shared_memory, "SharedMemory", record)
+    return created
+
+
+class OversizedImage:
+    """nbytes와 실제 크기가 다른 배열 (세그먼트보다 큰 배열을 만들다 실패)"""
+    nbytes = 0
+    shape = (1 << 24,)
+    dtype = np.dtype(np.uint8)
+
+
+def assert_unlinked(names):
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shm_transport.shared_memory.SharedMemory(name=name)
+
+
+def test_round_trip():
+    images = [np.arange(12, dtype=np.uint8).reshape(2, 2, 3), np.ones((3, 5), np.float32)]
+    with SharedImageBatch(images) as batch:
+        for img, handle in zip(images, batch.handles):
+            shm = shm_transport.shared_memory.SharedMemory(name=handle.segment)
+            view = np.ndarray(handle.shape, dtype=np.dtype(handle.dtype), buffer=shm.buf, offset=handle.offset)
+            assert np.array_equal(view, img)
+            del view
+            shm.close()
+
+
+@pytest.mark.parametrize("images", [
+    # 첫 이미지에서 실패 (복사한 배열이 없는 상태)
+    [OversizedImage()],
+    # 복사한 배열이 세그먼트를 참조하는 상태에서 실패
+    [np.zeros((2, 2), np.uint8), OversizedImage()],
+])
+def test_copy_failure_releases_segment(segments, images):
+    with pytest.raises(TypeError):
+        SharedImageBatch(images)
+    assert len(segments) == 1
+    assert_unlinked(segments)
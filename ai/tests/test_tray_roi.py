@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.services.tray_roi import KIOSK_ID_PATTERN, TrayRoiRegistry, save_slot_roi
+
+
+@pytest.mark.parametrize("kiosk_id", ["kiosk-1", "A_2", "cam.v2", "default", "x" * 64])
+def test_valid_kiosk_ids(kiosk_id):
+    assert KIOSK_ID_PATTERN.match(kiosk_id)
+
+
+@pytest.mark.parametrize("kiosk_id", [".", "..", ".hidden", "", "a/b", "../etc", "x" * 65])
+def test_invalid_kiosk_ids(kiosk_id):
+    assert not KIOSK_ID_PATTERN.match(kiosk_id)
+
+
+def save_bundle(root, kiosk_id):
+    roi = np.zeros((4, 4), np.uint8)
+    roi[1:3, 1:3] = 1
+    save_slot_roi(os.path.join(root, kiosk_id, "rice.npz"), roi)
+
+
+def test_registry_caches_only_existing_kiosks(tmp_path):
+    save_bundle(tmp_path, "kiosk-1")
+    registry = TrayRoiRegistry(str(tmp_path))
+    assert set(registry.get("kiosk-1")) == {"rice"}
+    for kiosk_id in ["unknown", "other", "..", "."]:
+        assert registry.get(kiosk_id) == {}
+    assert set(registry._bundles) == {"kiosk-1"}
+    # 나중에 추가된 키오스크 번들도 로드
+    save_bundle(tmp_path, "unknown")
+    assert set(registry.get("unknown")) == {"rice"}
+    assert registry.kiosks() == ["kiosk-1", "unknown"]
+
+
+def test_dot_directories_are_not_listed(tmp_path):
+    save_bundle(tmp_path, "kiosk-1")
+    os.makedirs(tmp_path / ".cache")
+    assert TrayRoiRegistry(str(tmp_path)).kiosks() == ["kiosk-1"]
+
+
+def test_fingerprint_changes_when_bundle_is_regenerated(tmp_path):
+    save_bundle(tmp_path, "kiosk-1")
+    registry = TrayRoiRegistry(str(tmp_path))
+    before = registry.fingerprint()
+    assert [name for name, _, _ in before["kiosk-1"]] == ["rice.npz"]
+    path = tmp_path / "kiosk-1" / "rice.npz"
+    save_bundle(tmp_path, "kiosk-1")
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 1_000_000))
+    assert registry.fingerprint() != before
+    assert TrayRoiRegistry("").fingerprint() == {}
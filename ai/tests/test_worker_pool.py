@@ -0,0 +1,29 @@
+import pytest
+from pydantic import ValidationError
+
+from app.api.models import PoolResizeRequest
+from app.services.worker_pool import PoolConfig, plan_pool
+
+
+def test_auto_plan_fills_workers_then_threads():
+    assert plan_pool(8, max_workers=4) == PoolConfig(4, 2)
+    assert plan_pool(1.5) == PoolConfig(1, 1)
+    assert plan_pool(8, threads=4, max_workers=4) == PoolConfig(2, 4)
+
+
+def test_explicit_workers_are_capped():
+    assert plan_pool(8, 500, 0, 4) == PoolConfig(4, 2)
+    assert plan_pool(8, 500, 500, 4) == PoolConfig(4, 8)
+    assert plan_pool(2, 3, 0, 0) == PoolConfig(2, 1)
+    assert plan_pool(8, 2, 2, 4) == PoolConfig(2, 2)
+
+
+def test_negative_values_are_rejected():
+    with pytest.raises(ValueError):
+        plan_pool(4, -1)
+
+
+def test_resize_request_bounds():
+    with pytest.raises(ValidationError):
+        PoolResizeRequest(workers=500)
+    assert PoolResizeRequest(workers=4, threads=2).workers == 4